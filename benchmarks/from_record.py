@@ -0,0 +1,32 @@
+"""Benchmark from_record against from_dict for the hot API models.
+
+Run from the repository root:
+
+    python -m benchmarks.from_record
+"""
+import timeit
+
+from inatcog.base_classes import EstablishmentMeans, User
+from inatcog.tests.test_base_classes import MEANS, USER
+
+NUMBER = 1000
+REPEAT = 5
+
+
+def main():
+    """Print the best time of each constructor per model."""
+    for (cls, record) in ((EstablishmentMeans, MEANS), (User, USER)):
+        slow = min(
+            timeit.repeat(lambda: cls.from_dict(record), number=NUMBER, repeat=REPEAT)
+        )
+        fast = min(
+            timeit.repeat(lambda: cls.from_record(record), number=NUMBER, repeat=REPEAT)
+        )
+        print(
+            f"{cls.__name__}: from_dict {slow:.4f}s, from_record {fast:.4f}s "
+            f"({slow / fast:.1f}x) for {NUMBER} records"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,9 @@ from time import time
 from typing import Union
 from aiolimiter import AsyncLimiter
 import aiohttp
-from .common import LOG
+from .common import LOG, ExpiringCache
 from .base_classes import API_BASE_URL
+from .maps import BOUNDS_TTL, MAX_CACHED_BOUNDS
 
 
 class INatAPI:
@@ -12,6 +13,7 @@ class INatAPI:
 
     def __init__(self):
         self.request_time = time()
+        self.bounds_cache = ExpiringCache(MAX_CACHED_BOUNDS, BOUNDS_TTL)
         self.places_cache = {}
         self.projects_cache = {}
         self.users_cache = {}
@@ -0,0 +1,105 @@
+"""Module to handle 4-letter bird banding codes."""
+import csv
+import io
+from typing import Iterator, Optional, Tuple
+
+# The IBP list of alpha codes for North American birds, in CSV format, has
+# (among others) these columns:
+# - https://www.birdpop.org/pages/birdSpeciesCodes.php
+CODE_COLUMN = "SPEC"
+NAME_COLUMN = "SCINAME"
+
+
+def parse_code_list(text: str) -> Iterator[Tuple[str, str]]:
+    """Parse an AOU/IBP code list.
+
+    Parameters
+    ----------
+    text: str
+        CSV text with a header row, having at least the IBP `SPEC` (4-letter
+        code) and `SCINAME` (scientific name) columns.
+
+    Yields
+    ------
+    tuple
+        Each (code, scientific name) in the list.
+    """
+    reader = csv.DictReader(io.StringIO(text))
+    if not {CODE_COLUMN, NAME_COLUMN}.issubset(reader.fieldnames or []):
+        raise ValueError(
+            f"Code list must have `{CODE_COLUMN}` and `{NAME_COLUMN}` columns."
+        )
+    for row in reader:
+        code = (row[CODE_COLUMN] or "").strip().upper()
+        name = (row[NAME_COLUMN] or "").strip()
+        if len(code) == 4 and name:
+            yield (code, name)
+
+
+class INatCodeTable:
+    """Lookup helper for 4-letter bird banding codes.
+
+    Codes map to taxon ids so they can be resolved without an
+    autocomplete query. The table is filled by importing a code list, and
+    also learns each code matched by the API for next time.
+    """
+
+    def __init__(self, cog):
+        self.cog = cog
+        self._codes = None
+
+    async def get_codes(self):
+        """Get all codes, loaded from config on first use."""
+        if self._codes is None:
+            self._codes = await self.cog.config.bird_codes()
+        return self._codes
+
+    async def get_code(self, code: str) -> Optional[dict]:
+        """Get code entry with `name` and `taxon_id` (if resolved), if known.
+
+        A `taxon_id` of 0 means the name couldn't be resolved to a taxon.
+        """
+        return (await self.get_codes()).get(code.upper())
+
+    async def set_code(self, code: str, taxon_id: int = None, name: str = None):
+        """Add or update a code entry, writing it through to config."""
+        codes = await self.get_codes()
+        code = code.upper()
+        entry = dict(codes.get(code) or {})
+        if taxon_id is not None:
+            entry["taxon_id"] = taxon_id
+        if name:
+            entry["name"] = name
+        if codes.get(code) == entry:
+            return
+        codes[code] = entry
+        await self.cog.config.bird_codes.set(codes)
+
+    async def import_codes(self, text: str, resolve=None):
+        """Import an AOU/IBP code list, replacing the current table.
+
+        Parameters
+        ----------
+        text: str
+            The code list; see `parse_code_list()`.
+        resolve: callable, optional
+            Gets taxon_id for a scientific name without using the API,
+            or None. Codes left unresolved are resolved on first use.
+
+        Returns
+        -------
+        tuple
+            Count of codes imported and of those resolved to taxon ids.
+        """
+        codes = {}
+        resolved = 0
+        for (code, name) in parse_code_list(text):
+            entry = {"name": name}
+            taxon_id = resolve(name) if resolve else None
+            if taxon_id:
+                entry["taxon_id"] = taxon_id
+                resolved += 1
+            codes[code] = entry
+        self._codes = codes
+        await self.cog.config.bird_codes.set(codes)
+        return (len(codes), resolved)
@@ -1,17 +1,22 @@
 """Module for inat command group."""
 
 import asyncio
+import csv
 import pprint
+import sqlite3
+from zipfile import BadZipFile
 from typing import Optional, Union
 import discord
 from redbot.core import checks, commands
 from redbot.core.utils.menus import menu, DEFAULT_CONTROLS
 
 from inatcog.base_classes import WWW_BASE_URL
+from inatcog.codes import parse_code_list
 from inatcog.converters import InheritableBoolConverter
 from inatcog.embeds import make_embed
 from inatcog.inat_embeds import INatEmbeds, INatEmbed
 from inatcog.interfaces import MixinMeta
+from inatcog.taxon_store import TAXONOMY_DWCA_URL, import_taxonomy_dwca
 
 
 class CommandsInat(INatEmbeds, MixinMeta):
@@ -52,6 +57,7 @@ class CommandsInat(INatEmbeds, MixinMeta):
 
         if prefixes:
             await config.bot_prefixes.set(prefixes)
+            self.listener_settings.invalidate(ctx.guild)
         else:
             prefixes = await config.bot_prefixes()
 
@@ -125,6 +131,7 @@ class CommandsInat(INatEmbeds, MixinMeta):
 
         config = self.config.guild(ctx.guild)
         await config.bot_prefixes.clear()
+        self.listener_settings.invalidate(ctx.guild)
 
         await ctx.send("Server ignored bot prefixes cleared.")
 
@@ -147,6 +154,7 @@ class CommandsInat(INatEmbeds, MixinMeta):
 
         config = self.config.channel(ctx.channel)
         await config.autoobs.set(state)
+        self.listener_settings.invalidate(ctx.guild, ctx.channel)
 
         if state is None:
             server_state = await self.config.guild(ctx.guild).autoobs()
@@ -171,6 +179,7 @@ class CommandsInat(INatEmbeds, MixinMeta):
 
         config = self.config.guild(ctx.guild)
         await config.autoobs.set(state)
+        self.listener_settings.invalidate(ctx.guild)
         await ctx.send(
             f"Server observation auto-preview is {'on' if state else 'off'}."
         )
@@ -220,6 +229,7 @@ class CommandsInat(INatEmbeds, MixinMeta):
 
         config = self.config.channel(ctx.channel)
         await config.dot_taxon.set(state)
+        self.listener_settings.invalidate(ctx.guild, ctx.channel)
 
         if state is None:
             server_state = await self.config.guild(ctx.guild).dot_taxon()
@@ -246,6 +256,7 @@ class CommandsInat(INatEmbeds, MixinMeta):
 
         config = self.config.guild(ctx.guild)
         await config.dot_taxon.set(state)
+        self.listener_settings.invalidate(ctx.guild)
         await ctx.send(f"Server .taxon. lookup is {'on' if state else 'off'}.")
         return
 
@@ -253,6 +264,86 @@ class CommandsInat(INatEmbeds, MixinMeta):
     async def inat_show(self, ctx):
         """Show iNat settings."""
 
+    @inat.group(name="taxonomy", invoke_without_command=True)
+    @checks.is_owner()
+    async def inat_taxonomy(self, ctx):
+        """Show or import the offline taxonomy store (owner).
+
+        When the store is imported, taxon names are matched locally first,
+        and only live fields (counts, photos, etc.) are fetched from iNat.
+        """
+        if self.taxon_store.available():
+            count = await self.taxon_store.run(self.taxon_store.taxa_count)
+            await ctx.send(f"Offline taxonomy store has {count} taxa.")
+        else:
+            await ctx.send(
+                "Offline taxonomy store is not imported. "
+                f"Import it with `{ctx.clean_prefix}inat taxonomy import`."
+            )
+
+    @inat_taxonomy.command(name="import")
+    @checks.is_owner()
+    async def inat_taxonomy_import(self, ctx, url: str = TAXONOMY_DWCA_URL):
+        """Import the offline taxonomy store from the iNat taxonomy DwC-A (owner).
+
+        The archive is large, so the download & import may take a while.
+        """
+        db_path = self.taxon_store.path
+        archive_path = db_path.with_name("taxonomy.dwca.zip")
+        await ctx.send(f"Downloading: <{url}>")
+        async with ctx.typing():
+            async with self.api.session.get(url) as response:
+                if response.status != 200:
+                    await ctx.send(f"Download failed: {response.status}")
+                    return
+                with open(archive_path, "wb") as archive:
+                    async for chunk in response.content.iter_chunked(1 << 16):
+                        archive.write(chunk)
+            await ctx.send("Importing ...")
+            try:
+                count = await self.bot.loop.run_in_executor(
+                    None, import_taxonomy_dwca, archive_path, db_path
+                )
+            except (BadZipFile, KeyError, OSError, sqlite3.Error, ValueError) as err:
+                await ctx.send(f"Import failed: {err}")
+                return
+            finally:
+                archive_path.unlink()
+            self.taxon_store.close()
+        await ctx.send(f"Offline taxonomy store imported with {count} taxa.")
+
+    @inat_taxonomy.command(name="codes")
+    @checks.is_owner()
+    async def inat_taxonomy_codes(self, ctx, url: str):
+        """Import 4-letter bird codes from an IBP code list CSV (owner).
+
+        The list must have `SPEC` (code) and `SCINAME` (scientific name)
+        columns, as in the IBP alpha code lists:
+        - https://www.birdpop.org/pages/birdSpeciesCodes.php
+
+        Codes are resolved to taxa via the offline taxonomy store if it is
+        imported, else on first use. Codes matched by iNat are also learned
+        as they are used.
+        """
+        async with ctx.typing():
+            async with self.api.session.get(url) as response:
+                if response.status != 200:
+                    await ctx.send(f"Download failed: {response.status}")
+                    return
+                text = await response.text()
+            try:
+                names = [name for (_code, name) in parse_code_list(text)]
+                taxon_ids = await self.taxon_store.run(
+                    self.taxon_store.get_taxon_ids, names
+                )
+                (count, resolved) = await self.code_table.import_codes(
+                    text, resolve=taxon_ids.get
+                )
+            except (csv.Error, ValueError) as err:
+                await ctx.send(f"Import failed: {err}")
+                return
+        await ctx.send(f"Imported {count} bird codes ({resolved} resolved to taxa).")
+
     @inat.command(name="inspect")
     async def inat_inspect(self, ctx, message_id: int):
         """Inspect a message and show any iNat embed contents."""
@@ -286,7 +377,19 @@ class CommandsInat(INatEmbeds, MixinMeta):
             title="Embed attributes", description=attributes_inspect
         )
 
-        embeds = [inat_embed, description_embed, inat_inspect_embed, attributes_embed]
+        state = await self.embed_states.get(message.id)
+        state_inspect = (
+            f"```py\n{pprint.pformat(state.to_dict() if state else None)}\n```"
+        )
+        state_embed = make_embed(title="Stored embed state", description=state_inspect)
+
+        embeds = [
+            inat_embed,
+            description_embed,
+            inat_inspect_embed,
+            attributes_embed,
+            state_embed,
+        ]
 
         await menu(ctx, embeds, DEFAULT_CONTROLS)
 
@@ -340,6 +443,30 @@ class CommandsInat(INatEmbeds, MixinMeta):
         prefixes = await config.bot_prefixes()
         await ctx.send(f"Other bot prefixes are: {repr(list(prefixes))}")
 
+    @inat_show.command(name="metrics")
+    @checks.is_owner()
+    async def show_metrics(self, ctx):
+        """Show lock and cache metrics (owner)."""
+        embed = make_embed(title="Metrics")
+        for (name, locks) in (
+            ("Reaction locks", self.reaction_locks),
+            ("Predicate locks", self.predicate_locks),
+        ):
+            stats = locks.stats()
+            embed.add_field(
+                name=name,
+                value="\n".join(f"{key}: {value}" for (key, value) in stats.items()),
+            )
+        embed.add_field(
+            name="Cached messages", value=len(self.message_cache), inline=False
+        )
+        embed.add_field(
+            name="Stored embed states",
+            value=len(await self.embed_states.get_states()),
+            inline=False,
+        )
+        await ctx.send(embed=embed)
+
     @inat_set.command(name="home")
     @checks.admin_or_permissions(manage_messages=True)
     async def set_home(self, ctx, home: str):
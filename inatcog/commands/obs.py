@@ -1,18 +1,27 @@
 """Module for obs command group."""
 
-import re
 from typing import Optional
+import urllib.parse
 
+import discord
 from redbot.core import checks, commands
 from redbot.core.commands import BadArgument
+from redbot.core.utils.menus import menu, DEFAULT_CONTROLS
 
-from inatcog.base_classes import PAT_OBS_LINK, WWW_BASE_URL
+from inatcog.base_classes import FilteredTaxon, WWW_BASE_URL
 from inatcog.converters import ContextMemberConverter, NaturalCompoundQueryConverter
-from inatcog.embeds import apologize, make_embed
-from inatcog.inat_embeds import INatEmbeds
+from inatcog.counts import TaxonCounts, get_observers
+from inatcog.embeds import (
+    apologize,
+    make_embed,
+    paginate,
+    MAX_EMBED_DESCRIPTION_LEN,
+)
+from inatcog.inat_embeds import INatEmbeds, format_taxon_title
 from inatcog.interfaces import MixinMeta
+from inatcog.links import find_link
 from inatcog.obs import get_obs_fields, maybe_match_obs
-from inatcog.taxa import PAT_TAXON_LINK
+from inatcog.taxa import TAXON_COUNTS_HEADER, format_user_counts_link
 
 
 class CommandsObs(INatEmbeds, MixinMeta):
@@ -50,10 +59,8 @@ class CommandsObs(INatEmbeds, MixinMeta):
         id_or_link = None
         if query.isnumeric():
             id_or_link = query
-        else:
-            mat = re.search(PAT_OBS_LINK, query)
-            if mat and mat["url"]:
-                id_or_link = query
+        elif find_link(query, "obs"):
+            id_or_link = query
         if id_or_link:
             obs, url = await maybe_match_obs(self, ctx, id_or_link, id_permitted=True)
             # Note: if the user specified an invalid or deleted id, a url is still
@@ -108,20 +115,140 @@ class CommandsObs(INatEmbeds, MixinMeta):
         ,tab fish from canada by me
              -> per user (self listed; others react to add)
                 but only fish from canada are tabulated
+        ,tab birds from home per family
+             -> per family (all families, most observed first)
         ```
         """
         if query.controlled_term:
             await apologize(ctx, "I can't tabulate that yet.")
             return
 
+        if query.per:
+            try:
+                filtered_taxon = await self.taxon_query.query_taxon(ctx, query)
+                async with ctx.typing():
+                    embeds = await self.make_obs_per_rank_embeds(
+                        filtered_taxon, query.per
+                    )
+            except (BadArgument, LookupError) as err:
+                await apologize(ctx, err.args[0])
+                return
+            await menu(ctx, embeds, DEFAULT_CONTROLS)
+            return
+
         try:
             filtered_taxon = await self.taxon_query.query_taxon(ctx, query)
-            msg = await ctx.send(embed=await self.make_obs_counts_embed(filtered_taxon))
-            self.add_obs_reaction_emojis(msg)
+            await self.send_obs_counts_embed(ctx, filtered_taxon)
         except (BadArgument, LookupError) as err:
             await apologize(ctx, err.args[0])
             return
 
+    @tabulate.command(name="members")
+    @checks.bot_has_permissions(embed_links=True)
+    async def tabulate_members(
+        self,
+        ctx,
+        role: Optional[discord.Role] = None,
+        *,
+        query: Optional[NaturalCompoundQueryConverter] = None,
+    ):
+        """Tabulate observations by all known members, or by a role.
+
+        • Every member of the server whose iNat login is known (see
+          `[p]user list`) is counted, or only those with the role, if given.
+        • Members are listed by most observations, then most species.
+        • Members without matching observations are not listed.
+        • A taxon and/or `from` place may be given to count only
+          those observations.
+        e.g.
+        ```
+        [p]tab members fish from home
+             -> per member
+        [p]tab members @Birders birds
+             -> per member with the Birders role
+        ```
+        """
+        if not ctx.guild:
+            return
+        if query and (
+            query.user or query.unobserved_by or query.controlled_term or query.per
+        ):
+            await apologize(ctx, "I can't tabulate that yet.")
+            return
+
+        try:
+            if query:
+                filtered_taxon = await self.taxon_query.query_taxon(ctx, query)
+            else:
+                filtered_taxon = FilteredTaxon(None, None, None, None)
+            members = await self.user_table.get_members_by_inat_user_id(
+                ctx.guild, role
+            )
+            if not members:
+                raise LookupError(
+                    "No iNat logins are known for "
+                    + (f"members with role: {role.name}" if role else "members")
+                )
+            (taxon, _user, place, _unobserved_by) = filtered_taxon
+            kwargs = {}
+            if taxon:
+                kwargs["taxon_id"] = taxon.taxon_id
+            if place:
+                kwargs["place_id"] = place.place_id
+            # All of the members' counts are got in a query per 500 members:
+            observers = await get_observers(self, list(members), **kwargs)
+        except (BadArgument, LookupError) as err:
+            await apologize(ctx, err.args[0])
+            return
+
+        observers.sort(
+            key=lambda observer: (
+                -observer["observation_count"],
+                -observer["species_count"],
+            )
+        )
+        place_id = place.place_id if place else None
+        rows = [
+            format_user_counts_link(
+                TaxonCounts(observer["observation_count"], observer["species_count"]),
+                observer["user_id"],
+                observer["user"]["login"],
+                taxon,
+                place_id,
+            )
+            + members[observer["user_id"]].mention
+            for observer in observers
+            if observer["user_id"] in members
+        ]
+        if not rows:
+            await apologize(ctx, "No observations by these members.")
+            return
+
+        title = "Observations"
+        if taxon:
+            title += f" of {format_taxon_title(taxon)}"
+        if place:
+            title += f" from {place.display_name}"
+        title += f" by {role.name}" if role else " by members"
+        url = f"{WWW_BASE_URL}/observations?{urllib.parse.urlencode(kwargs)}"
+        pages = paginate(
+            rows,
+            max_items=20,
+            max_len=MAX_EMBED_DESCRIPTION_LEN - len(TAXON_COUNTS_HEADER) - 1,
+        )
+        embeds = []
+        for index, page in enumerate(pages, start=1):
+            embed = make_embed(
+                title=f"{title} (page {index} of {len(pages)})",
+                url=url,
+                description="\n".join([TAXON_COUNTS_HEADER, *page]),
+            )
+            embed.set_footer(
+                text=f"{len(rows)} of {len(members)} members have observations"
+            )
+            embeds.append(embed)
+        await menu(ctx, embeds, DEFAULT_CONTROLS)
+
     @tabulate.command()
     async def maverick(self, ctx, *, query: Optional[NaturalCompoundQueryConverter]):
         """Show maverick identifications.
@@ -171,10 +298,10 @@ class CommandsObs(INatEmbeds, MixinMeta):
            -> an embed summarizing the observation link
         ```
         """
-        mat = re.search(PAT_OBS_LINK, query)
-        if mat:
-            obs_id = int(mat["obs_id"])
-            url = mat["url"]
+        link = find_link(query, "obs", "taxon")
+        if link and link.kind == "obs":
+            obs_id = link.id
+            url = link.url
 
             home = await self.get_home(ctx)
             results = (
@@ -188,9 +315,8 @@ class CommandsObs(INatEmbeds, MixinMeta):
                 await self.maybe_send_sound_url(ctx.channel, obs.sounds[0])
             return
 
-        mat = re.search(PAT_TAXON_LINK, query)
-        if mat:
-            query = await NaturalCompoundQueryConverter.convert(ctx, mat["taxon_id"])
+        if link:
+            query = await NaturalCompoundQueryConverter.convert(ctx, str(link.id))
             await (self.bot.get_command("taxon")(ctx, query=query))
             return
 
@@ -5,8 +5,7 @@ from redbot.core.utils.menus import menu, DEFAULT_CONTROLS
 
 from inatcog.base_classes import WWW_BASE_URL
 from inatcog.checks import known_inat_user
-from inatcog.common import grouper
-from inatcog.embeds import apologize, make_embed
+from inatcog.embeds import apologize, make_embed, paginate
 from inatcog.inat_embeds import INatEmbeds
 from inatcog.interfaces import MixinMeta
 from inatcog.places import RESERVED_PLACES
@@ -37,8 +36,7 @@ class CommandsPlace(INatEmbeds, MixinMeta):
         if not ctx.guild:
             return
 
-        config = self.config.guild(ctx.guild)
-        places = await config.places()
+        places = (await self.place_table.get_abbrevs(ctx.guild)).abbrevs
         abbrev_lowered = abbrev.lower()
         if abbrev_lowered in RESERVED_PLACES:
             await ctx.send(
@@ -52,8 +50,7 @@ class CommandsPlace(INatEmbeds, MixinMeta):
             )
             return
 
-        places[abbrev_lowered] = place_number
-        await config.places.set(places)
+        await self.place_table.add_abbrev(ctx.guild, abbrev_lowered, place_number)
         await ctx.send("Place abbreviation added.")
 
     @place.command(name="list")
@@ -63,8 +60,7 @@ class CommandsPlace(INatEmbeds, MixinMeta):
         if not ctx.guild:
             return
 
-        config = self.config.guild(ctx.guild)
-        places = await config.places()
+        places = (await self.place_table.get_abbrevs(ctx.guild)).abbrevs
         result_pages = []
         for abbrev in places:
             # Only lookup cached places. Uncached places will just be shown by number.
@@ -78,9 +74,7 @@ class CommandsPlace(INatEmbeds, MixinMeta):
             else:
                 place_str = f"{abbrev}: [{place_id}]({WWW_BASE_URL}/places/{place_id})"
             result_pages.append(place_str)
-        pages = [
-            "\n".join(filter(None, results)) for results in grouper(result_pages, 10)
-        ]
+        pages = ["\n".join(results) for results in paginate(result_pages)]
         if pages:
             pages_len = len(pages)  # Causes enumeration (works against lazy load).
             embeds = [
@@ -102,14 +96,12 @@ class CommandsPlace(INatEmbeds, MixinMeta):
         if not ctx.guild:
             return
 
-        config = self.config.guild(ctx.guild)
-        places = await config.places()
+        places = (await self.place_table.get_abbrevs(ctx.guild)).abbrevs
         abbrev_lowered = abbrev.lower()
 
         if abbrev_lowered not in places:
             await ctx.send("Place abbreviation not defined.")
             return
 
-        del places[abbrev_lowered]
-        await config.places.set(places)
+        await self.place_table.remove_abbrev(ctx.guild, abbrev_lowered)
         await ctx.send("Place abbreviation removed.")
@@ -6,9 +6,8 @@ from redbot.core.utils.menus import menu, DEFAULT_CONTROLS
 
 from inatcog.base_classes import WWW_BASE_URL
 from inatcog.checks import known_inat_user
-from inatcog.common import grouper
 from inatcog.converters import ContextMemberConverter
-from inatcog.embeds import apologize, make_embed
+from inatcog.embeds import apologize, make_embed, paginate
 from inatcog.inat_embeds import INatEmbeds
 from inatcog.interfaces import MixinMeta
 from inatcog.places import RESERVED_PLACES
@@ -39,8 +38,7 @@ class CommandsProject(INatEmbeds, MixinMeta):
         if not ctx.guild:
             return
 
-        config = self.config.guild(ctx.guild)
-        projects = await config.projects()
+        projects = (await self.project_table.get_abbrevs(ctx.guild)).abbrevs
         abbrev_lowered = abbrev.lower()
         if abbrev_lowered in RESERVED_PLACES:
             await ctx.send(
@@ -54,8 +52,7 @@ class CommandsProject(INatEmbeds, MixinMeta):
             )
             return
 
-        projects[abbrev_lowered] = project_number
-        await config.projects.set(projects)
+        await self.project_table.add_abbrev(ctx.guild, abbrev_lowered, project_number)
         await ctx.send("Project abbreviation added.")
 
     @project.command(name="list")
@@ -65,8 +62,7 @@ class CommandsProject(INatEmbeds, MixinMeta):
         if not ctx.guild:
             return
 
-        config = self.config.guild(ctx.guild)
-        projects = await config.projects()
+        projects = (await self.project_table.get_abbrevs(ctx.guild)).abbrevs
         result_pages = []
         for abbrev in projects:
             # Only lookup cached projects. Uncached projects will just be shown by number.
@@ -80,9 +76,7 @@ class CommandsProject(INatEmbeds, MixinMeta):
             else:
                 proj_str = f"{abbrev}: [{proj_id}]({WWW_BASE_URL}/projects/{proj_id})"
             result_pages.append(proj_str)
-        pages = [
-            "\n".join(filter(None, results)) for results in grouper(result_pages, 10)
-        ]
+        pages = ["\n".join(results) for results in paginate(result_pages)]
         if pages:
             pages_len = len(pages)  # Causes enumeration (works against lazy load).
             embeds = [
@@ -104,16 +98,14 @@ class CommandsProject(INatEmbeds, MixinMeta):
         if not ctx.guild:
             return
 
-        config = self.config.guild(ctx.guild)
-        projects = await config.projects()
+        projects = (await self.project_table.get_abbrevs(ctx.guild)).abbrevs
         abbrev_lowered = abbrev.lower()
 
         if abbrev_lowered not in projects:
             await ctx.send("Project abbreviation not defined.")
             return
 
-        del projects[abbrev_lowered]
-        await config.projects.set(projects)
+        await self.project_table.remove_abbrev(ctx.guild, abbrev_lowered)
         await ctx.send("Project abbreviation removed.")
 
     @project.command(name="stats")
@@ -1,24 +1,22 @@
 """Module for search command group."""
 
 from math import ceil
-import re
 from typing import Optional
 import urllib.parse
 
 from redbot.core import checks, commands
 from redbot.core.utils.menus import menu, DEFAULT_CONTROLS
-from inatcog.common import grouper
 from inatcog.converters import NaturalCompoundQueryConverter
-from inatcog.places import PAT_PLACE_LINK
-from inatcog.projects import PAT_PROJECT_LINK
-from inatcog.taxa import format_taxon_name, PAT_TAXON_LINK
-from inatcog.users import PAT_USER_LINK
-
-from inatcog.base_classes import (
-    PAT_OBS_LINK,
-    WWW_BASE_URL,
+from inatcog.links import find_link
+from inatcog.taxa import format_taxon_name
+
+from inatcog.base_classes import WWW_BASE_URL
+from inatcog.embeds import (
+    apologize,
+    make_embed,
+    paginate,
+    MAX_EMBED_DESCRIPTION_LEN,
 )
-from inatcog.embeds import apologize, make_embed
 from inatcog.inat_embeds import INatEmbeds
 from inatcog.interfaces import MixinMeta
 from inatcog.obs import get_obs_fields
@@ -34,12 +32,14 @@ class CommandsSearch(INatEmbeds, MixinMeta):
             await menu(ctx, pages, controls, message, page, 0.1)
 
         async def display_selected(result):
-            mat = re.search(PAT_OBS_LINK, result)
-            if mat:
+            link = find_link(result)
+            if not link:
+                return
+            if link.kind == "obs":
                 home = await self.get_home(ctx)
                 results = (
                     await self.api.get_observations(
-                        mat["obs_id"], include_new_projects=1, preferred_place_id=home
+                        link.id, include_new_projects=1, preferred_place_id=home
                     )
                 )["results"]
                 obs = get_obs_fields(results[0]) if results else None
@@ -55,35 +55,28 @@ class CommandsSearch(INatEmbeds, MixinMeta):
                 else:
                     await apologize(ctx, "Not found")
                     return
-            mat = re.search(PAT_TAXON_LINK, result)
-            if mat:
+            if link.kind == "taxon":
                 query = await NaturalCompoundQueryConverter.convert(
-                    ctx, mat["taxon_id"]
+                    ctx, link.id_or_slug
                 )
                 await (self.bot.get_command("taxon")(ctx, query=query))
                 return
-            mat = re.search(PAT_USER_LINK, result)
-            if mat:
-                await ctx.send(
-                    f"{WWW_BASE_URL}/people/{mat['user_id'] or mat['login']}"
-                )
+            if link.kind == "user":
+                await ctx.send(f"{WWW_BASE_URL}/people/{link.id_or_slug}")
                 return
-            mat = re.search(PAT_PROJECT_LINK, result)
-            if mat:
-                await (self.bot.get_command("project")(ctx, query=mat["project_id"]))
+            if link.kind == "project":
+                await (self.bot.get_command("project")(ctx, query=link.id_or_slug))
                 return
-            mat = re.search(PAT_PLACE_LINK, result)
-            if mat:
-                await (self.bot.get_command("place")(ctx, query=mat["place_id"]))
+            if link.kind == "place":
+                await (self.bot.get_command("place")(ctx, query=link.id_or_slug))
 
         async def select_result_reaction(
             ctx, pages, controls, message, page, timeout, reaction
         ):
             number = buttons.index(reaction)
-            selected_result_offset = number + page * per_embed_page
-            if selected_result_offset > len(results) - 1:
+            if number > len(result_groups[page]) - 1:
                 return
-            result = results[number + page * per_embed_page]
+            result = result_groups[page][number]
             await display_selected(result)
             await menu(ctx, pages, controls, message, page, timeout)
 
@@ -163,14 +156,16 @@ class CommandsSearch(INatEmbeds, MixinMeta):
         for button in buttons:
             controls[button] = select_result_reaction
 
-        pages = []
-        for group in grouper(results, per_embed_page):
-            lines = [
-                " ".join((buttons[i], result))
-                for i, result in enumerate(filter(None, group), 0)
-            ]
-            page = "\n".join(lines)
-            pages.append(page)
+        # Leave room for the button & blank prefixed to each result:
+        result_groups = paginate(
+            results,
+            max_items=per_embed_page,
+            max_len=MAX_EMBED_DESCRIPTION_LEN - 2 * per_embed_page,
+        )
+        pages = [
+            "\n".join(" ".join((buttons[i], result)) for i, result in enumerate(group))
+            for group in result_groups
+        ]
 
         if pages:
             pages_len = len(pages)  # Causes enumeration (works against lazy load).
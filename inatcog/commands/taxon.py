@@ -11,6 +11,7 @@ from inatcog.embeds import apologize, make_embed
 from inatcog.inat_embeds import INatEmbeds
 from inatcog.interfaces import MixinMeta
 from inatcog.taxa import format_taxon_name, get_taxon
+from inatcog.taxon_query import format_failed_terms
 
 
 class CommandsTaxon(INatEmbeds, MixinMeta):
@@ -169,12 +170,14 @@ class CommandsTaxon(INatEmbeds, MixinMeta):
             return
 
         try:
-            taxa = await self.taxon_query.query_taxa(ctx, taxa_list)
+            (taxa, failed) = await self.taxon_query.query_taxa(ctx, taxa_list)
         except LookupError as err:
             await apologize(ctx, err.args[0])
             return
 
         await ctx.send(embed=await self.make_related_embed(ctx, taxa))
+        if failed:
+            await apologize(ctx, format_failed_terms(failed))
 
     @commands.command(aliases=["img", "photo"])
     @checks.bot_has_permissions(embed_links=True)
@@ -217,9 +220,11 @@ class CommandsTaxon(INatEmbeds, MixinMeta):
             return
 
         try:
-            taxa = await self.taxon_query.query_taxa(ctx, taxa_list)
+            (taxa, failed) = await self.taxon_query.query_taxa(ctx, taxa_list)
         except LookupError as err:
             await apologize(ctx, err.args[0])
             return
 
         await ctx.send(embed=await self.make_map_embed(taxa))
+        if failed:
+            await apologize(ctx, format_failed_terms(failed))
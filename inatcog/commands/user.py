@@ -10,13 +10,13 @@ from redbot.core.utils.menus import menu, DEFAULT_CONTROLS
 
 from inatcog.base_classes import User
 from inatcog.checks import known_inat_user
-from inatcog.common import DEQUOTE, grouper
+from inatcog.common import DEQUOTE
 from inatcog.converters import ContextMemberConverter, QuotedContextMemberConverter
-from inatcog.embeds import apologize, make_embed
+from inatcog.embeds import apologize, make_embed, paginate
 from inatcog.inat_embeds import INatEmbeds
 from inatcog.interfaces import MixinMeta
+from inatcog.links import find_link
 from inatcog.projects import UserProject
-from inatcog.users import PAT_USER_LINK
 
 
 class CommandsUser(INatEmbeds, MixinMeta):
@@ -89,8 +89,8 @@ class CommandsUser(INatEmbeds, MixinMeta):
             await ctx.send("iNat user already known.")
             return
 
-        mat_link = re.search(PAT_USER_LINK, inat_user)
-        match = mat_link and (mat_link["user_id"] or mat_link["login"])
+        link = find_link(inat_user, "user")
+        match = link and link.id_or_slug
         if match:
             user_query = match
         else:
@@ -347,7 +347,7 @@ class CommandsUser(INatEmbeds, MixinMeta):
             if not filter_role or filter_role in dmember.roles
         ]
 
-        pages = ["\n".join(filter(None, names)) for names in grouper(all_names, 10)]
+        pages = ["\n".join(names) for names in paginate(all_names)]
 
         if pages:
             pages_len = len(pages)  # Causes enumeration (works against lazy load).
@@ -1,11 +1,18 @@
 """Module for common code."""
+import asyncio
 import logging
 import re
+from bisect import bisect_left, insort
+from collections import OrderedDict
 from functools import wraps
-from itertools import zip_longest
+from itertools import islice, zip_longest
+from time import monotonic
+from typing import Dict, Hashable, Optional
 
 DEQUOTE = re.compile(r'^"?(.*?)"?$')
 LOG = logging.getLogger("red.dronefly.inatcog")
+# Most locks kept by a LockRegistry before idle ones are evicted.
+MAX_LOCKS = 1000
 
 
 def make_decorator(function):
@@ -22,6 +29,167 @@ def make_decorator(function):
     return wrap_make_decorator
 
 
+class AbbrevIndex:
+    """Abbreviations (e.g. of a guild's places) matched exactly or by prefix.
+
+    Parameters
+    ----------
+    abbrevs: dict
+        The lowercase abbreviations and the id each one stands for.
+    """
+
+    def __init__(self, abbrevs: Dict[str, int]):
+        self.abbrevs = dict(abbrevs)
+        self._sorted = sorted(self.abbrevs)
+
+    def match(self, query: str) -> Optional[int]:
+        """Get id for the abbreviation that is, or alone starts with, query."""
+        query = query.lower()
+        if query in self.abbrevs:
+            return self.abbrevs[query]
+        i = bisect_left(self._sorted, query)
+        matches = [
+            abbrev for abbrev in self._sorted[i : i + 2] if abbrev.startswith(query)
+        ]
+        return self.abbrevs[matches[0]] if len(matches) == 1 else None
+
+    def set(self, abbrev: str, value: int):
+        """Add or replace abbreviation."""
+        abbrev = abbrev.lower()
+        if abbrev not in self.abbrevs:
+            insort(self._sorted, abbrev)
+        self.abbrevs[abbrev] = value
+
+    def remove(self, abbrev: str):
+        """Remove abbreviation."""
+        abbrev = abbrev.lower()
+        del self.abbrevs[abbrev]
+        self._sorted.remove(abbrev)
+
+
+def lock_busy(lock: asyncio.Lock) -> bool:
+    """Lock is held, or will be by a task waiting for it.
+
+    Between a release and the next waiter waking up to acquire it, a lock
+    isn't `locked()`, but still has the waiter.
+    """
+    return lock.locked() or bool(getattr(lock, "_waiters", None))
+
+
+class LockRegistry:
+    """Locks by key (e.g. message or user id), made on demand.
+
+    When there are more than `max_locks`, the least recently used locks that
+    aren't held or waited for are evicted, so the registry doesn't grow for the life of
+    the bot.
+
+    Attributes
+    ----------
+    created: int
+        Count of locks made.
+    contended: int
+        Count of times a lock was got while already held.
+    evicted: int
+        Count of idle locks evicted.
+    """
+
+    def __init__(self, max_locks: int = MAX_LOCKS):
+        self.max_locks = max_locks
+        self._locks = OrderedDict()
+        self.created = 0
+        self.contended = 0
+        self.evicted = 0
+
+    def __contains__(self, key: Hashable):
+        return key in self._locks
+
+    def __len__(self):
+        return len(self._locks)
+
+    def get(self, key: Hashable) -> asyncio.Lock:
+        """Get the lock for the key, making it if needed."""
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+            self.created += 1
+            self._evict()
+        else:
+            self._locks.move_to_end(key)
+            if lock.locked():
+                self.contended += 1
+        return lock
+
+    def _evict(self):
+        excess = len(self._locks) - self.max_locks
+        if excess <= 0:
+            return
+        # Only the least recently used are scanned, as far as needed. The
+        # newest lock is about to be used, so is never evicted:
+        idle = []
+        for key in islice(self._locks, len(self._locks) - 1):
+            if not lock_busy(self._locks[key]):
+                idle.append(key)
+                if len(idle) == excess:
+                    break
+        for key in idle:
+            del self._locks[key]
+        self.evicted += len(idle)
+
+    def held(self) -> int:
+        """Count of locks held now."""
+        return sum(1 for lock in self._locks.values() if lock.locked())
+
+    def stats(self) -> Dict[str, int]:
+        """Counts of locks for metrics."""
+        return {
+            "locks": len(self._locks),
+            "held": self.held(),
+            "created": self.created,
+            "contended": self.contended,
+            "evicted": self.evicted,
+        }
+
+
+class ExpiringCache:
+    """Values by key, kept for at most `ttl` seconds.
+
+    When there are more than `max_items`, the least recently used are
+    forgotten first. Expired values are forgotten when next got, or when
+    they reach the least recently used end.
+    """
+
+    def __init__(self, max_items: int, ttl: float):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._items = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key: Hashable):
+        """Get the value for the key, or None if not cached or expired."""
+        item = self._items.get(key)
+        if item is None:
+            return None
+        (cached_at, value) = item
+        if monotonic() - cached_at > self.ttl:
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value):
+        """Cache the value for the key."""
+        now = monotonic()
+        self._items[key] = (now, value)
+        self._items.move_to_end(key)
+        while self._items:
+            (cached_at, _value) = next(iter(self._items.values()))
+            if len(self._items) <= self.max_items and now - cached_at <= self.ttl:
+                break
+            self._items.popitem(last=False)
+
+
 def grouper(iterable, n, fillvalue=None):
     "Collect data into fixed-length chunks or blocks"
     # grouper('ABCDEFG', 3, 'x') --> ABC DEF Gxx"
@@ -1,6 +1,5 @@
 """Module to handle controlled terms."""
-import re
-from typing import List, Optional
+from typing import Dict, FrozenSet, List, Optional
 from dataclasses import dataclass
 from dataclasses_json import DataClassJsonMixin
 
@@ -26,34 +25,77 @@ class ControlledTerm(DataClassJsonMixin):
     values: List[ControlledTermValue]
 
 
+def _prefix_index(items, label):
+    """Index items by every prefix of their lowercased labels, in order."""
+    index = {}
+    for item in items:
+        item_label = label(item).lower()
+        for i in range(len(item_label) + 1):
+            index.setdefault(item_label[:i], []).append(item)
+    return index
+
+
+class ControlledTermIndex:
+    """Controlled terms indexed for matching by prefixes of their labels.
+
+    Parameters
+    ----------
+    controlled_terms: list of ControlledTerm
+        The terms, e.g. from /v1/controlled_terms. As before, the first term
+        or value in the list with a label matching a prefix is preferred.
+    """
+
+    def __init__(self, controlled_terms: List[ControlledTerm]):
+        self.terms = _prefix_index(controlled_terms, lambda term: term.label)
+        self.values: Dict[int, Dict[str, List[ControlledTermValue]]] = {
+            term.id: _prefix_index(term.values, lambda value: value.label)
+            for term in controlled_terms
+        }
+        # Taxa each value applies to (with descendants), or None for all taxa:
+        self.taxon_ids: Dict[int, Optional[FrozenSet[int]]] = {
+            value.id: frozenset(value.taxon_ids) if value.taxon_ids else None
+            for term in controlled_terms
+            for value in term.values
+        }
+        self.excepted_taxon_ids: Dict[int, FrozenSet[int]] = {
+            value.id: frozenset(value.excepted_taxon_ids or [])
+            for term in controlled_terms
+            for value in term.values
+        }
+
+    def applies_to(self, value: ControlledTermValue, taxon) -> bool:
+        """Value applies to the taxon, per the taxa of the value."""
+        ancestor_ids = set(taxon.ancestor_ids)
+        taxon_ids = self.taxon_ids.get(value.id)
+        if taxon_ids is not None and not taxon_ids & ancestor_ids:
+            return False
+        return not self.excepted_taxon_ids.get(value.id, frozenset()) & ancestor_ids
+
+    def match(self, term_label: str, value_label: str, taxon=None):
+        """Match term and value matching term's label & value's label.
+
+        If a taxon is given, a value that applies to it is preferred.
+        """
+        terms = self.terms.get(term_label.lower())
+        if not terms:
+            raise LookupError(f'No controlled term matching "`{term_label}`"')
+        matched_term = terms[0]
+        values = self.values[matched_term.id].get(value_label.lower())
+        if not values:
+            raise LookupError(
+                f'No value matching "`{value_label}`" for controlled term: `{matched_term.label}`'
+            )
+        matched_value = values[0]
+        if taxon:
+            matched_value = next(
+                (value for value in values if self.applies_to(value, taxon)),
+                matched_value,
+            )
+        return (matched_term, matched_value)
+
+
 def match_controlled_term(
     controlled_terms: List[ControlledTerm], term_label: str, value_label: str
 ):
     """Match term and value matching term's label & value's label."""
-    matched_term = next(
-        iter(
-            [
-                term
-                for term in controlled_terms
-                if re.match(re.escape(term_label), term.label, re.I)
-            ]
-        ),
-        None,
-    )
-    if matched_term:
-        matched_value = next(
-            iter(
-                [
-                    value
-                    for value in matched_term.values
-                    if re.match(re.escape(value_label), value.label, re.I)
-                ]
-            ),
-            None,
-        )
-        if matched_value:
-            return (matched_term, matched_value)
-        raise LookupError(
-            f'No value matching "`{value_label}`" for controlled term: `{matched_term.label}`'
-        )
-    raise LookupError(f'No controlled term matching "`{term_label}`"')
+    return ControlledTermIndex(controlled_terms).match(term_label, value_label)
@@ -1,19 +1,43 @@
 """Converters for command arguments."""
-import argparse
 import re
-import shlex
-from typing import NamedTuple
+from functools import lru_cache
+from typing import List, NamedTuple, Union
 import discord
 from redbot.core.commands import BadArgument, Context, Converter, MemberConverter
 from .common import DEQUOTE
+from .links import find_link
 from .base_classes import (
     CompoundQuery,
-    PAT_OBS_LINK,
     SimpleQuery,
     RANK_EQUIVALENTS,
     RANK_KEYWORDS,
 )
 
+# Most distinct query arguments whose parse is remembered.
+QUERY_CACHE_SIZE = 1024
+
+# Options of the query language, and the field of the query each one sets.
+# In natural language queries, the bare words (e.g. `in`) are options too.
+QUERY_OPTIONS = {
+    "of": "main",
+    "in": "ancestor",
+    "by": "user",
+    "not-by": "unobserved_by",
+    "from": "place",
+    "rank": "rank",
+    "with": "controlled_term",
+    "per": "per",
+}
+
+# Words and quoted phrases, split as shlex.split(posix=False) would; i.e.
+# quotes only group words when they start a token.
+PAT_QUERY_TOKEN = re.compile(
+    r"""\s*(?:(?P<quoted>"[^"]*"|'[^']*')|(?P<word>[^\s"']\S*)|(?P<unclosed>["']))"""
+)
+PAT_PHRASE = re.compile(r'^"(.*)"$')
+# Tokens like these are values, not (unknown) options:
+PAT_NEGATIVE_NUMBER = re.compile(r"^-\d+$|^-\d*\.\d+$")
+
 
 class ContextMemberConverter(NamedTuple):
     """Context-aware member converter."""
@@ -89,164 +113,237 @@ class InheritableBoolConverter(Converter):
         raise BadArgument(f'{argument} is not a recognized boolean option or "inherit"')
 
 
-class NoExitParser(argparse.ArgumentParser):
-    """Handle default error as bad argument, not sys.exit."""
+def tokenize_query(argument: str) -> List[str]:
+    """Split query into words and quoted phrases, keeping the quotes."""
+    tokens = []
+    for mat in PAT_QUERY_TOKEN.finditer(argument):
+        if mat["unclosed"]:
+            raise BadArgument("No closing quotation")
+        tokens.append(mat["quoted"] or mat["word"])
+    return tokens
 
-    def error(self, message):
-        raise BadArgument("Query not understood") from None
 
+def _split_terms(text: str) -> List[str]:
+    """Split text into terms, grouping words in double quotes.
 
-class CompoundQueryConverter(CompoundQuery):
-    """Convert query via argparse."""
+    This is as shlex.split() would, except single quotes are just part of a
+    term, e.g. `bird's`.
+    """
+    terms = []
+    term = None
+    quoted = False
+    chars = iter(text)
+    for char in chars:
+        if char == "\\":
+            char = next(chars, None)
+            if char is None:
+                raise BadArgument("No escaped character")
+            if quoted and char not in '"\\':
+                char = "\\" + char
+        elif char == '"':
+            quoted = not quoted
+            term = term or ""
+            continue
+        elif char.isspace() and not quoted:
+            if term is not None:
+                terms.append(term)
+                term = None
+            continue
+        term = (term or "") + char
+    if quoted:
+        raise BadArgument("No closing quotation")
+    if term is not None:
+        terms.append(term)
+    return terms
 
-    @classmethod
-    async def convert(cls, ctx: Context, argument: str):
-        """Parse argument into compound taxon query."""
 
-        def detect_terms_phrases_code_id(terms_and_phrases: list):
-            """Detect terms, phrases, code, and id."""
-            ungroup_phrases = re.sub("'", "\\'", " ".join(list(terms_and_phrases)))
-            terms = list(
-                re.sub("\\\\'", "'", term) for term in shlex.split(ungroup_phrases)
-            )
-            phrases = [
-                mat[1].split()
-                for phrase in terms_and_phrases
-                if (mat := re.match(r'^"(.*)"$', phrase))
-            ]
-            code = None
-            id = None
-            if not phrases and len(terms) == 1:
-                if terms[0].isnumeric():
-                    id = terms[0]
-                elif len(terms[0]) == 4:
-                    code = terms[0].upper()
-            return terms, phrases, code, id
-
-        parser = NoExitParser(description="Taxon Query Syntax", add_help=False)
-        parser.add_argument("--of", nargs="+", dest="main", default=[])
-        parser.add_argument("--in", nargs="+", dest="ancestor", default=[])
-        parser.add_argument("--by", nargs="+", dest="user", default=[])
-        parser.add_argument("--not-by", nargs="+", dest="unobserved_by", default=[])
-        parser.add_argument("--from", nargs="+", dest="place", default=[])
-        parser.add_argument("--rank", dest="rank", default="")
-        parser.add_argument("--with", nargs="+", dest="controlled_term")
-        parser.add_argument("--per", nargs="+", dest="per", default=[])
+def _simple_query(tokens: List[str], ranks: List[str]):
+    """Make simple query from tokens, detecting terms, phrases, code, and id."""
+    terms = _split_terms(" ".join(tokens))
+    phrases = [
+        mat[1].split() for token in tokens if (mat := re.match(PAT_PHRASE, token))
+    ]
+    code = None
+    taxon_id = None
+    if not phrases and len(terms) == 1:
+        if terms[0].isnumeric():
+            taxon_id = terms[0]
+        elif len(terms[0]) == 4:
+            code = terms[0].upper()
+    if not terms:
+        return None
+    return SimpleQuery(
+        taxon_id=taxon_id, terms=terms, phrases=phrases, ranks=ranks, code=code
+    )
 
-        try:
-            vals = parser.parse_args(shlex.split(argument, posix=False))
-        except ValueError as err:
-            raise BadArgument(err.args[0])
-        ranks = []
-        if vals.rank:
-            parsed_ranks = shlex.shlex(vals.rank)
-            parsed_ranks.whitespace += ","
-            parsed_ranks.whitespace_split = True
-            ranks_with_equivalents = list(parsed_ranks)
-            ranks = list(
-                [
-                    RANK_EQUIVALENTS[rank] if rank in RANK_EQUIVALENTS else rank
-                    for rank in ranks_with_equivalents
-                ]
-            )
 
-        if (
-            vals.main
-            or vals.ancestor
-            or vals.user
-            or vals.place
-            or vals.rank
-            or vals.controlled_term
-            or vals.unobserved_by
-            or vals.per
-        ):
-            main = None
-            ancestor = None
-            if vals.main:
-                try:
-                    terms, phrases, code, id = detect_terms_phrases_code_id(vals.main)
-                except ValueError as err:
-                    raise BadArgument(err.args[0])
-                if id:
-                    if ranks:
-                        raise BadArgument(
-                            "Taxon IDs are unique. Retry without any ranks: `sp`, `genus`, etc."
-                        )
-                    if vals.ancestor:
-                        raise BadArgument(
-                            "Taxon IDs are unique. Retry without `in <taxon2>`."
-                        )
-                if terms:
-                    main = SimpleQuery(
-                        taxon_id=id,
-                        terms=terms,
-                        phrases=phrases,
-                        ranks=ranks,
-                        code=code,
-                    )
-            if vals.ancestor:
-                if not vals.main:
-                    raise BadArgument(
-                        "Missing `<taxon1>` for `<taxon1> in <taxon2>` search."
-                    )
-                try:
-                    terms, phrases, code, id = detect_terms_phrases_code_id(
-                        vals.ancestor
-                    )
-                except ValueError as err:
-                    raise BadArgument(err.args[0])
-                if terms:
-                    ancestor = SimpleQuery(
-                        taxon_id=id, terms=terms, phrases=phrases, ranks=[], code=code
-                    )
-            if vals.controlled_term:
-                term_name = vals.controlled_term[0]
-                term_value = " ".join(vals.controlled_term[1:])
-                controlled_term = [term_name, term_value]
-            else:
-                controlled_term = None
-            return cls(
-                main=main,
-                ancestor=ancestor,
-                user=" ".join(vals.user),
-                place=" ".join(vals.place),
-                controlled_term=controlled_term,
-                unobserved_by=" ".join(vals.unobserved_by),
-                per=" ".join(vals.per),
-            )
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def parse_compound_query(
+    argument: str, natural: bool = True
+) -> Union[CompoundQuery, str]:
+    """Parse argument into compound taxon query in a single pass.
+
+    Parameters
+    ----------
+    argument: str
+        The query, e.g. `--of fish --by me`, or in natural language (i.e.
+        without `--` and with ranks as words), `fish by me`.
+    natural: bool
+        Parse as a natural language query.
+
+    Returns
+    -------
+    CompoundQuery or str
+        The query, or the argument unchanged if it is an observation link
+        (natural) or empty (not natural).
 
+    Raises
+    ------
+    BadArgument
+        The query is not understood.
+
+    Notes
+    -----
+    Results are shared between callers with the same argument, so they
+    must not be modified. The converters return copies.
+    """
+    if natural:
+        if find_link(argument, "obs"):
+            return argument
+    tokens = tokenize_query(argument)
+
+    vals = {}
+    rank_words = []
+    option = None
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        lowered = token.lower()
+        i += 1
+        if natural and lowered == "not" and i < len(tokens):
+            if tokens[i].lower() == "by":
+                lowered = "not-by"
+                i += 1
+        if token.startswith("--") and token[2:] in QUERY_OPTIONS:
+            name = token[2:]
+        elif natural and lowered in QUERY_OPTIONS:
+            name = lowered
+        else:
+            name = None
+        if name:
+            if option and not vals[option]:
+                raise BadArgument("Query not understood")
+            # As with argparse, a repeated option replaces the earlier one:
+            option = QUERY_OPTIONS[name]
+            vals[option] = []
+        # A rank right after `per` is what to group by, not a rank filter:
+        elif (
+            natural
+            and lowered in RANK_KEYWORDS
+            and not (option == "per" and not vals[option])
+        ):
+            rank_words.append(lowered)
+        elif (
+            len(token) > 1
+            and token.startswith("-")
+            and not re.match(PAT_NEGATIVE_NUMBER, token)
+        ):
+            raise BadArgument("Query not understood")
+        elif option is None:
+            if not natural:
+                raise BadArgument("Query not understood")
+            option = "main"
+            vals[option] = [token]
+        elif option == "rank" and vals[option]:
+            # Only one value (which may be a comma-delimited list) is taken:
+            raise BadArgument("Query not understood")
+        else:
+            vals[option].append(token)
+    if any(not values for values in vals.values()):
+        raise BadArgument("Query not understood")
+    if natural and not vals:
+        raise BadArgument("Query not understood")
+    if not vals:
         return argument
 
+    ranks = []
+    for rank in re.split(r"[\s,]+", " ".join(vals.get("rank", []))) + rank_words:
+        rank = RANK_EQUIVALENTS.get(rank) or rank
+        if rank and rank not in ranks:
+            ranks.append(rank)
+    main = None
+    ancestor = None
+    if "main" in vals:
+        main = _simple_query(vals["main"], ranks)
+        if main and main.taxon_id:
+            if ranks:
+                raise BadArgument(
+                    "Taxon IDs are unique. Retry without any ranks: `sp`, `genus`, etc."
+                )
+            if "ancestor" in vals:
+                raise BadArgument("Taxon IDs are unique. Retry without `in <taxon2>`.")
+    if "ancestor" in vals:
+        if "main" not in vals:
+            raise BadArgument("Missing `<taxon1>` for `<taxon1> in <taxon2>` search.")
+        ancestor = _simple_query(vals["ancestor"], [])
+    if "controlled_term" in vals:
+        controlled_term = [
+            vals["controlled_term"][0],
+            " ".join(vals["controlled_term"][1:]),
+        ]
+    else:
+        controlled_term = None
+    return CompoundQuery(
+        main=main,
+        ancestor=ancestor,
+        user=" ".join(vals.get("user", [])),
+        place=" ".join(vals.get("place", [])),
+        controlled_term=controlled_term,
+        unobserved_by=" ".join(vals.get("unobserved_by", [])),
+        per=" ".join(vals.get("per", [])),
+    )
+
+
+def _copy_query(cls, query: Union[CompoundQuery, str]):
+    """Copy parsed query as cls, so the caller may modify it."""
+    if isinstance(query, str):
+        return query
+
+    def copy_simple_query(simple_query):
+        if not simple_query:
+            return None
+        return simple_query._replace(
+            terms=list(simple_query.terms),
+            phrases=[list(phrase) for phrase in simple_query.phrases],
+            ranks=list(simple_query.ranks),
+        )
+
+    return cls(
+        main=copy_simple_query(query.main),
+        ancestor=copy_simple_query(query.ancestor),
+        user=query.user,
+        place=query.place,
+        controlled_term=list(query.controlled_term)
+        if query.controlled_term
+        else None,
+        unobserved_by=query.unobserved_by,
+        per=query.per,
+    )
+
+
+class CompoundQueryConverter(CompoundQuery):
+    """Convert query via the query parser."""
+
+    @classmethod
+    async def convert(cls, ctx: Context, argument: str):
+        """Parse argument into compound taxon query."""
+        return _copy_query(cls, parse_compound_query(argument, natural=False))
+
 
 class NaturalCompoundQueryConverter(CompoundQueryConverter):
-    """Convert query with natural language filters via argparse."""
+    """Convert query with natural language filters via the query parser."""
 
     @classmethod
     async def convert(cls, ctx: Context, argument: str):
         """Parse argument into compound taxon query."""
-        mat = re.search(PAT_OBS_LINK, argument)
-        if mat and mat["url"]:
-            return argument
-        try:
-            arg_normalized = re.sub(r"not by", "not-by", argument, re.I)
-            args_normalized = shlex.split(arg_normalized, posix=False)
-        except ValueError as err:
-            raise BadArgument(err.args[0])
-        ranks = []
-        for arg in args_normalized:
-            arg_lowered = arg.lower()
-            if arg_lowered in RANK_KEYWORDS:
-                args_normalized.remove(arg_lowered)
-                ranks.append(arg_lowered)
-            # FIXME: determine programmatically from parser:
-            if arg_lowered in ["of", "in", "by", "not-by", "from", "rank", "with"]:
-                args_normalized[args_normalized.index(arg_lowered)] = f"--{arg_lowered}"
-        if not re.match(r"^--", args_normalized[0]):
-            args_normalized.insert(0, "--of")
-        if ranks:
-            args_normalized.append("--rank")
-            args_normalized += ranks
-        argument_normalized = " ".join(args_normalized)
-        return await super(NaturalCompoundQueryConverter, cls).convert(
-            ctx, argument_normalized
-        )
+        return _copy_query(cls, parse_compound_query(argument, natural=True))
@@ -0,0 +1,252 @@
+"""Module to get observation & species counts."""
+import asyncio
+from math import ceil
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, Union
+
+
+# The most results /v1/observations/observers returns per page, so the most
+# users whose counts are got per query.
+MAX_OBSERVERS_PER_QUERY = 500
+# The most results /v1/observations/species_counts returns per page, and the
+# most pages fetched for any one set of counts.
+SPECIES_COUNTS_PER_PAGE = 500
+MAX_SPECIES_COUNTS_PAGES = 10
+
+
+class TaxonCounts(NamedTuple):
+    """Observation & species counts matching the same query."""
+
+    observations: int
+    species: int
+
+
+async def get_taxon_counts(
+    cog, species: bool = True, **kwargs
+) -> Optional[TaxonCounts]:
+    """Get observation & species counts for observations matching the query.
+
+    Parameters
+    ----------
+    cog: INatCog
+        The cog whose API is queried.
+    species: bool, optional
+        Whether to count species too. If not, the species count is 0, and
+        only one query is made.
+    **kwargs
+        Observation query parameters, e.g. `taxon_id`, `user_id`, `place_id`.
+
+    Returns
+    -------
+    TaxonCounts
+        The counts, or None if the query failed.
+
+    Notes
+    -----
+    The two queries are independent, so they are made concurrently. Both are
+    still subject to the API rate limiter.
+    """
+    if not species:
+        observations = await cog.api.get_observations(per_page=0, **kwargs)
+        if not observations:
+            return None
+        return TaxonCounts(observations["total_results"], 0)
+    (observations, species_counts) = await asyncio.gather(
+        cog.api.get_observations(per_page=0, **kwargs),
+        cog.api.get_observations("species_counts", per_page=0, **kwargs),
+    )
+    if not observations or not species_counts:
+        return None
+    return TaxonCounts(observations["total_results"], species_counts["total_results"])
+
+
+async def get_observers(cog, users: List[Union[int, str]], **kwargs) -> List[dict]:
+    """Get observer records with counts for the users in as few queries as possible.
+
+    Parameters
+    ----------
+    cog: INatCog
+        The cog whose API is queried.
+    users: list
+        User ids or logins.
+    **kwargs
+        Other observation query parameters, e.g. `taxon_id`, `place_id`.
+
+    Returns
+    -------
+    list
+        The /v1/observations/observers records of users with matching
+        observations. Users without any are omitted.
+    """
+    batches = [
+        users[i : i + MAX_OBSERVERS_PER_QUERY]
+        for i in range(0, len(users), MAX_OBSERVERS_PER_QUERY)
+    ]
+    responses = await asyncio.gather(
+        *(
+            cog.api.get_observations(
+                "observers",
+                user_id=",".join(map(str, batch)),
+                per_page=len(batch),
+                **kwargs,
+            )
+            for batch in batches
+        )
+    )
+    if not all(responses):
+        raise LookupError("Observer counts not found.")
+    return [observer for response in responses for observer in response["results"]]
+
+
+async def get_observers_counts(
+    cog, users: List[Union[int, str]], **kwargs
+) -> Optional[Dict[str, TaxonCounts]]:
+    """Get observation & species counts for each of the users in one query.
+
+    Parameters
+    ----------
+    cog: INatCog
+        The cog whose API is queried.
+    users: list
+        User ids or logins.
+    **kwargs
+        Other observation query parameters, e.g. `taxon_id`, `place_id`.
+
+    Returns
+    -------
+    dict
+        The counts of each user with matching observations, by login, or None
+        if the query failed. Users without any are omitted.
+
+    Notes
+    -----
+    The species counts are as reported by /v1/observations/observers, i.e.
+    of distinct species observed, whereas `get_taxon_counts()` counts all
+    distinct leaf taxa observed.
+    """
+    try:
+        observers = await get_observers(cog, users, **kwargs)
+    except LookupError:
+        return None
+    return {
+        observer["user"]["login"]: TaxonCounts(
+            observer["observation_count"], observer["species_count"]
+        )
+        for observer in observers
+    }
+
+
+class RankCounts(NamedTuple):
+    """Observation & species counts grouped by the taxa at a rank."""
+
+    taxa: dict
+    counts: Dict[int, TaxonCounts]
+    ungrouped: TaxonCounts
+    complete: bool
+
+
+async def iter_species_counts(cog, **kwargs) -> AsyncIterator[dict]:
+    """Stream /v1/observations/species_counts responses, a page at a time.
+
+    At most MAX_SPECIES_COUNTS_PAGES pages are fetched, so compare the
+    records received with `total_results` to tell if all were.
+    """
+    page = 1
+    while page <= MAX_SPECIES_COUNTS_PAGES:
+        response = await cog.api.get_observations(
+            "species_counts", per_page=SPECIES_COUNTS_PER_PAGE, page=page, **kwargs
+        )
+        if not response or not response["results"]:
+            return
+        yield response
+        if page * SPECIES_COUNTS_PER_PAGE >= response["total_results"]:
+            return
+        page += 1
+
+
+async def get_rank_counts(cog, rank: str, **kwargs) -> RankCounts:
+    """Get observation & species counts grouped by the taxa at a rank.
+
+    All of the species counts matching the query are fetched in bulk, and
+    each leaf taxon's counts are added to its ancestor at the rank, carried
+    in the record's ancestor_ids. Which ancestors are at the rank is looked
+    up for the ancestors new in each page, locally if the taxonomy store is
+    imported. Otherwise, if that would take more queries than fetching all
+    taxa at the rank in the query's taxon up front, those are fetched
+    instead, if there are few enough; see
+    `INatTaxonQuery.get_taxa_at_rank_up_front()`.
+
+    Parameters
+    ----------
+    cog: INatCog
+        The cog whose API is queried.
+    rank: str
+        The rank to group by, e.g. `family`.
+    **kwargs
+        Other observation query parameters, e.g. `taxon_id`, `place_id`.
+
+    Returns
+    -------
+    RankCounts
+        The taxa at the rank by id and their counts, the counts of
+        leaf taxa above the rank (not in any group), and whether all
+        results were counted.
+    """
+    taxa = {}
+    by_ancestors = True
+    seen_ids = set()
+    group_obs = {}
+    group_species = {}
+    ungrouped_obs = ungrouped_species = 0
+    records_count = total_results = 0
+    async for response in iter_species_counts(cog, **kwargs):
+        records = response["results"]
+        first_page = not records_count
+        records_count += len(records)
+        total_results = response["total_results"]
+        if first_page and not cog.taxon_store.available():
+            # The ancestors of the first page are a guide to the rest:
+            pages = min(ceil(total_results / len(records)), MAX_SPECIES_COUNTS_PAGES)
+            ancestor_ids = {
+                ancestor_id
+                for record in records
+                for ancestor_id in record["taxon"]["ancestor_ids"]
+            }
+            taxa = await cog.taxon_query.get_taxa_at_rank_up_front(
+                rank, len(ancestor_ids) * pages, kwargs.get("taxon_id")
+            )
+            by_ancestors = taxa is None
+            taxa = taxa or {}
+        if by_ancestors:
+            new_ids = {
+                ancestor_id
+                for record in records
+                for ancestor_id in record["taxon"]["ancestor_ids"]
+            } - seen_ids
+            seen_ids |= new_ids
+            if new_ids:
+                taxa.update(await cog.taxon_query.get_taxa_at_rank(new_ids, rank))
+        for record in records:
+            group_id = next(
+                (
+                    ancestor_id
+                    for ancestor_id in record["taxon"]["ancestor_ids"]
+                    if ancestor_id in taxa
+                ),
+                None,
+            )
+            if group_id:
+                group_obs[group_id] = group_obs.get(group_id, 0) + record["count"]
+                group_species[group_id] = group_species.get(group_id, 0) + 1
+            else:
+                ungrouped_obs += record["count"]
+                ungrouped_species += 1
+    counts = {
+        group_id: TaxonCounts(group_obs[group_id], group_species[group_id])
+        for group_id in group_obs
+    }
+    return RankCounts(
+        {group_id: taxa[group_id] for group_id in counts},
+        counts,
+        TaxonCounts(ungrouped_obs, ungrouped_species),
+        records_count >= total_results,
+    )
@@ -0,0 +1,220 @@
+"""Module for the state of counts tables shown in embeds."""
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+from dataclasses_json import DataClassJsonMixin
+from .base_classes import Taxon
+from .counts import TaxonCounts
+from .taxa import (
+    format_place_counts_link,
+    format_user_counts_link,
+    TAXON_COUNTS_HEADER,
+    TAXON_NOTBY_HEADER,
+    TAXON_PLACES_HEADER,
+)
+
+# Most embed states kept; the least recently used are forgotten first. The
+# state of a message sent before that is parsed from its embed again.
+MAX_EMBED_STATES = 1000
+# Config group the state of each message is stored in, by message id.
+EMBED_STATE_GROUP = "EMBED_STATE"
+
+COUNTS_HEADERS = {
+    "users": TAXON_COUNTS_HEADER,
+    "not_by": TAXON_NOTBY_HEADER,
+    "places": TAXON_PLACES_HEADER,
+}
+
+
+@dataclass
+class CountsRow(DataClassJsonMixin):
+    """A user's or place's row in a counts table."""
+
+    id: int
+    name: str
+    observations: int
+    species: int
+
+    @property
+    def counts(self) -> TaxonCounts:
+        """Counts of the row."""
+        return TaxonCounts(self.observations, self.species)
+
+
+@dataclass
+class EmbedState(DataClassJsonMixin):
+    """What an embed with a counts table shows.
+
+    `kind` is the kind of counts table: `users`, `not_by` (users the
+    observations are unobserved by) or `places`, or None if the embed has no
+    table. User counts may be filtered by `place_id` and place counts by
+    `user_id`.
+    """
+
+    taxon_id: Optional[int] = None
+    place_id: Optional[int] = None
+    user_id: Optional[int] = None
+    kind: Optional[str] = None
+    rows: List[CountsRow] = field(default_factory=list)
+    total_observations: Optional[int] = None
+    total_species: Optional[int] = None
+
+    @property
+    def total(self) -> Optional[TaxonCounts]:
+        """Counts of the total row, if any."""
+        if self.total_observations is None:
+            return None
+        return TaxonCounts(self.total_observations, self.total_species or 0)
+
+    def get_row(self, row_id: int) -> Optional[CountsRow]:
+        """Get the row for the user or place id, if listed."""
+        return next((row for row in self.rows if row.id == row_id), None)
+
+
+def apply_row_changes(
+    rows: List[CountsRow], changes
+) -> Tuple[List[CountsRow], List[CountsRow]]:
+    """Apply changes to the rows of a counts table.
+
+    Parameters
+    ----------
+    rows: list of CountsRow
+        The rows of the table.
+    changes: list
+        Each (id, name, action) in the order made, where action is `add`,
+        `remove` or `toggle` (i.e. add if not listed, else remove).
+
+    Returns
+    -------
+    tuple
+        The new rows, and those of them added, whose counts are not known
+        yet.
+    """
+    rows = list(rows)
+    added = []
+    for (row_id, name, action) in changes:
+        row = next((row for row in rows if row.id == row_id), None)
+        if action == "toggle":
+            action = "remove" if row else "add"
+        if row and action == "remove":
+            rows.remove(row)
+            if row in added:
+                added.remove(row)
+        elif not row and action == "add":
+            row = CountsRow(row_id, name, 0, 0)
+            rows.append(row)
+            added.append(row)
+    return (rows, added)
+
+
+def format_counts_table(state: EmbedState, taxon: Taxon = None):
+    """Format the counts table of the state, or empty if it has no rows."""
+    if not state.rows:
+        return ""
+    total = state.total
+    if state.kind == "places":
+        lines = [
+            format_place_counts_link(row.counts, row.id, row.name, taxon, state.user_id)
+            for row in state.rows
+        ]
+        if total:
+            place_ids = ",".join(str(row.id) for row in state.rows)
+            lines.append(
+                format_place_counts_link(
+                    total, place_ids, "*total*", taxon, state.user_id
+                )
+            )
+    else:
+        unobserved = state.kind == "not_by"
+        lines = [
+            format_user_counts_link(
+                row.counts, row.id, row.name, taxon, state.place_id, unobserved
+            )
+            for row in state.rows
+        ]
+        if total:
+            logins = ",".join(row.name for row in state.rows)
+            lines.append(
+                format_user_counts_link(total, logins, "*total*", taxon, state.place_id)
+            )
+    return "\n".join([COUNTS_HEADERS[state.kind], *lines])
+
+
+def strip_counts_table(description: str):
+    """Strip the counts table, if any, from the end of an embed description."""
+    found = [
+        description.find(header)
+        for header in COUNTS_HEADERS.values()
+        if header in description
+    ]
+    if not found:
+        return description
+    description = description[: min(found)]
+    return description[:-1] if description.endswith("\n") else description
+
+
+def format_counts_description(description: str, state: EmbedState, taxon=None):
+    """Replace the counts table of an embed description with the state's."""
+    description = strip_counts_table(description)
+    table = format_counts_table(state, taxon)
+    return f"{description}\n{table}" if table else description
+
+
+class INatEmbedStateStore:
+    """Store of the state of embeds sent, by message id.
+
+    States are kept in least recently used order and each is written through
+    to its own config group, so the reactions on an embed are handled from
+    its state instead of by parsing its content.
+    """
+
+    def __init__(self, cog):
+        self.cog = cog
+        self._states = None
+        self._load_lock = asyncio.Lock()
+
+    def _group(self, message_id: int):
+        return self.cog.config.custom(EMBED_STATE_GROUP, str(message_id))
+
+    async def get_states(self):
+        """Get all states, loaded from config on first use."""
+        if self._states is None:
+            # Only loaded once, even if first used by several at once:
+            async with self._load_lock:
+                if self._states is None:
+                    await self._load()
+        return self._states
+
+    async def _load(self):
+        states = await self.cog.config.custom(EMBED_STATE_GROUP).all()
+        # Message ids increase with time, so the oldest are forgotten first:
+        self._states = OrderedDict(
+            (int(message_id), EmbedState.from_dict(states[message_id]["state"]))
+            for message_id in sorted(states, key=int)
+            if states[message_id].get("state")
+        )
+
+    async def get(self, message_id: int) -> Optional[EmbedState]:
+        """Get the state of a message's embed, if known."""
+        states = await self.get_states()
+        state = states.get(message_id)
+        if state is not None:
+            states.move_to_end(message_id)
+        return state
+
+    async def set(self, message_id: int, state: EmbedState):
+        """Set the state of a message's embed, writing it through to config."""
+        states = await self.get_states()
+        states[message_id] = state
+        states.move_to_end(message_id)
+        await self._group(message_id).state.set(state.to_dict())
+        while len(states) > MAX_EMBED_STATES:
+            (forgotten_id, _state) = states.popitem(last=False)
+            await self._group(forgotten_id).clear()
+
+    async def remove(self, message_id: int):
+        """Forget the state of a message's embed, e.g. if it was deleted."""
+        states = await self.get_states()
+        if states.pop(message_id, None) is not None:
+            await self._group(message_id).clear()
@@ -43,6 +43,87 @@ def format_items_for_embed(function, max_len=MAX_EMBED_NAME_LEN):
     return wrap_format_items_for_embed
 
 
+def fit_items(items, max_len, delimiter=", ", more_format="and %d more"):
+    """Fit as many items as possible within a length, summarizing the rest.
+
+    Parameters
+    ----------
+    items: list of str
+        The items to fit, in order.
+    max_len: int
+        The maximum length of the items when joined with the delimiter.
+    delimiter: str, optional
+        The delimiter the items will be joined with.
+    more_format: str, optional
+        Format of the summary of items that didn't fit. Must contain
+        exactly one %d, the count of items not shown.
+
+    Returns
+    -------
+    list of str
+        The items that fit, followed by the summary if any didn't fit.
+    """
+    items = list(items)
+    # Running length of the items fitted so far, each with its delimiter:
+    used = [0]
+    for item in items:
+        if used[-1] + len(item) > max_len:
+            break
+        used.append(used[-1] + len(item) + len(delimiter))
+    else:
+        return items
+
+    # Drop fitted items from the end until the summary fits:
+    fitted = len(used) - 1
+    while fitted and used[fitted] + len(more_format % (len(items) - fitted)) > max_len:
+        fitted -= 1
+    return items[:fitted] + [more_format % (len(items) - fitted)]
+
+
+def truncate_text(text, max_len, ellipsis="…"):
+    """Truncate text to a length, marking it with an ellipsis if truncated."""
+    if len(text) <= max_len:
+        return text
+    return text[: max_len - len(ellipsis)] + ellipsis
+
+
+def paginate(items, max_items=10, max_len=MAX_EMBED_DESCRIPTION_LEN, delimiter="\n"):
+    """Group items into pages within both an item count and a length.
+
+    Parameters
+    ----------
+    items: iterable of str
+        The items to group, in order.
+    max_items: int, optional
+        The most items on a page.
+    max_len: int, optional
+        The maximum length of a page's items when joined with the delimiter.
+        An item longer than this is put on a page by itself.
+    delimiter: str, optional
+        The delimiter each page's items will be joined with.
+
+    Returns
+    -------
+    list of list of str
+        The items of each page.
+    """
+    pages = []
+    page = []
+    page_len = 0
+    for item in items:
+        item_len = len(item) + (len(delimiter) if page else 0)
+        if page and (len(page) >= max_items or page_len + item_len > max_len):
+            pages.append(page)
+            page = []
+            page_len = 0
+            item_len = len(item)
+        page.append(item)
+        page_len += item_len
+    if page:
+        pages.append(page)
+    return pages
+
+
 def make_embed(**kwargs):
     """Make a standard embed for this cog."""
     return discord.Embed(color=EMBED_COLOR, **kwargs)
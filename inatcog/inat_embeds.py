@@ -2,9 +2,11 @@
 
 import asyncio
 import contextlib
+from dataclasses import replace
 from io import BytesIO
 import re
-from typing import Union
+from time import monotonic
+from typing import List, NamedTuple, Optional, Union
 from urllib.parse import parse_qs, urlencode, urlsplit
 import discord
 from discord import DMChannel, File
@@ -16,9 +18,9 @@ from .base_classes import (
     CompoundQuery,
     MEANS_LABEL_DESC,
     WWW_BASE_URL,
-    PAT_OBS_LINK,
     PAT_OBS_QUERY,
-    PAT_OBS_TAXON_LINK,
+    RANK_EQUIVALENTS,
+    RANK_LEVELS,
     Place,
     FilteredTaxon,
     Taxon,
@@ -26,33 +28,42 @@ from .base_classes import (
 )
 from .common import LOG
 from .converters import ContextMemberConverter
+from .embed_state import (
+    CountsRow,
+    EmbedState,
+    apply_row_changes,
+    format_counts_description,
+)
 from .embeds import (
     format_items_for_embed,
     make_embed,
     MAX_EMBED_DESCRIPTION_LEN,
     NoRoomInDisplay,
+    paginate,
+    truncate_text,
 )
 from .interfaces import MixinMeta
+from .links import find_link, match_link
 from .maps import INatMapURL
 from .projects import UserProject, ObserverStats
+from .counts import TaxonCounts, get_observers_counts, get_rank_counts, get_taxon_counts
 from .taxa import (
-    format_place_taxon_counts,
+    format_taxon_counts,
     format_taxon_name,
     format_taxon_names,
-    format_user_taxon_counts,
     get_taxon,
     get_taxon_fields,
     get_taxon_preferred_establishment_means,
+    has_species_counts,
     PAT_TAXON_LINK,
     TAXON_ID_LIFE,
-    TAXON_COUNTS_HEADER,
     TAXON_COUNTS_HEADER_PAT,
-    TAXON_PLACES_HEADER,
     TAXON_PLACES_HEADER_PAT,
-    TAXON_NOTBY_HEADER,
     TAXON_NOTBY_HEADER_PAT,
 )
 
+# Params of an obs link for a taxon, filtered by optional place and/or user.
+OBS_TAXON_PARAMS = {"taxon_id", "place_id", "user_id"}
 HIERARCHY_PAT = re.compile(r".*?(?=>)", re.DOTALL)
 NO_TAXONOMY_PAT = re.compile(r"(\n__.*)?$", re.DOTALL)
 SHORT_DATE_PAT = re.compile(
@@ -67,6 +78,24 @@ UNOBSERVED_BY_USER_ID_PAT = re.compile(
     r"\n\[[0-9 \(\)]+\]\(.*?[\?\&]unobserved_by_user_id=(?P<unobserved_by_user_id>\d+).*?\)",
 )
 USER_ID_PAT = re.compile(r"\n\[[0-9 \(\)]+\]\(.*?[\?\&]user_id=(?P<user_id>\d+).*?\)")
+# Any row of a counts table, including the total:
+COUNTS_ROW_PAT = re.compile(
+    r"(?:\n|^)\[(?P<observations>\d+)(?: \((?P<species>\d+)\))?\]"
+    r"\((?P<url>[^)\n]*)\) (?P<name>[^\n]*?) ?(?=\n|$)"
+)
+# Query parameter of the ids listed in each kind of counts table:
+COUNTS_ROW_ID_PARAMS = {
+    "users": "user_id",
+    "not_by": "unobserved_by_user_id",
+    "places": "place_id",
+}
+# Each user's species count (from the observers endpoint) is of distinct
+# species, including taxa above them not otherwise represented, whereas the
+# total (from species_counts) is of leaf taxa, so a row may exceed the total:
+USER_SPECIES_FOOTER = (
+    "User species counts include taxa above species not otherwise observed; "
+    "the total counts only the most specific taxa, so they may differ."
+)
 
 REACTION_EMOJI = {
     "self": "#️⃣",
@@ -84,6 +113,19 @@ NO_PARENT_TAXON_REACTION_EMOJIS = list(
 OBS_REACTION_EMOJIS = NO_PARENT_TAXON_REACTION_EMOJIS
 
 
+# Edits of a message's counts soon after the last are held back until this long
+# after it, gathering reactions made meanwhile into one edit, so a message
+# isn't edited faster than Discord allows.
+EDIT_WINDOW_SECONDS = 1
+
+
+class PendingEdit(NamedTuple):
+    """Changes to the counts in an embed waiting for the edit under way."""
+
+    changes: List[tuple]
+    waiters: List[asyncio.Future]
+
+
 class INatEmbed(discord.Embed):
     """Base class for INat embeds."""
 
@@ -103,6 +145,45 @@ class INatEmbed(discord.Embed):
         content["user_id"] = self.user_id()
         return content
 
+    def embed_state(self):
+        """Return the state of the embed, parsed from its content.
+
+        Only needed for embeds whose state is not in the store, e.g. if sent
+        before the state was stored or forgotten since.
+        """
+        if self.has_places():
+            kind = "places"
+        elif self.has_not_by_users():
+            kind = "not_by"
+        elif self.has_users():
+            kind = "users"
+        else:
+            kind = None
+        rows = []
+        total = None
+        if kind:
+            for mat in re.finditer(COUNTS_ROW_PAT, self.description):
+                counts = TaxonCounts(int(mat["observations"]), int(mat["species"] or 0))
+                if mat["name"] == "*total*":
+                    total = counts
+                    continue
+                params = parse_qs(urlsplit(mat["url"]).query)
+                row_id = params.get(COUNTS_ROW_ID_PARAMS[kind])
+                if not row_id:
+                    continue
+                # Only the login of a user; members may also be mentioned:
+                name = mat["name"] if kind == "places" else mat["name"].split()[0]
+                rows.append(CountsRow(int(row_id[0]), name, *counts))
+        return EmbedState(
+            taxon_id=self.taxon_id(),
+            place_id=self.place_id(),
+            user_id=self.user_id(),
+            kind=kind if rows else None,
+            rows=rows,
+            total_observations=total.observations if total else None,
+            total_species=total.species if total else None,
+        )
+
     def has_users(self):
         """Embed has a user counts table."""
         return bool(re.search(TAXON_COUNTS_HEADER_PAT, self.description or ""))
@@ -250,8 +331,7 @@ class INatEmbeds(MixinMeta):
             )
         else:
             embed = make_embed(url=last.url)
-            mat = re.search(PAT_OBS_LINK, last.url)
-            obs_id = int(mat["obs_id"])
+            obs_id = find_link(last.url, "obs").id
             LOG.info("Observation not found for link: %d", obs_id)
             embed.title = "No observation found for id: %d (deleted?)" % obs_id
 
@@ -290,49 +370,68 @@ class INatEmbeds(MixinMeta):
             embed.set_footer(text=sound.attribution)
             await channel.send(embed=embed, file=File(sound_io, filename=filename))
 
-    async def make_obs_counts_embed(self, arg):
+    async def make_counts_state(self, arg: FilteredTaxon) -> EmbedState:
+        """Return state of the counts table from place or by user."""
+        (taxon, user, place, unobserved_by) = arg
+        state = EmbedState(taxon_id=taxon.taxon_id if taxon else None)
+        kwargs = {}
+        if taxon:
+            kwargs["taxon_id"] = taxon.taxon_id
+        if user:
+            if unobserved_by and not place:
+                raise BadArgument("I can't tabulate that yet.")
+            if place:
+                state.place_id = kwargs["place_id"] = place.place_id
+            # A single user's counts are had in one query instead of two:
+            observers_counts = await get_observers_counts(
+                self, [user.user_id], **kwargs
+            )
+            if observers_counts is not None:
+                counts = observers_counts.get(user.login, TaxonCounts(0, 0))
+                state.kind = "users"
+                state.rows = [CountsRow(user.user_id, user.login, *counts)]
+        elif unobserved_by:
+            if place:
+                state.place_id = kwargs["place_id"] = place.place_id
+            counts = await get_taxon_counts(
+                self,
+                unobserved_by_user_id=unobserved_by.user_id,
+                lrank="species",
+                **kwargs,
+            )
+            if counts:
+                state.kind = "not_by"
+                state.rows = [
+                    CountsRow(unobserved_by.user_id, unobserved_by.login, *counts)
+                ]
+        elif place:
+            counts = await get_taxon_counts(
+                self, place_id=place.place_id, verifiable="true", **kwargs
+            )
+            if counts:
+                state.kind = "places"
+                state.rows = [CountsRow(place.place_id, place.display_name, *counts)]
+        return state
+
+    async def make_obs_counts_embed(self, arg, state: EmbedState = None):
         """Return embed for observation counts from place or by user."""
         title_params = {}
-        formatted_counts = ""
         (taxon, user, place, unobserved_by) = arg
+        if state is None:
+            state = await self.make_counts_state(arg)
 
         if taxon:
             title = format_taxon_title(taxon)
             full_title = f"Observations of {title}"
         else:
             full_title = "Observations"
-        description = ""
-        if user:
-            if place:
-                full_title += f" from {place.display_name}"
-                title_params["place_id"] = place.place_id
-                formatted_counts = await format_user_taxon_counts(
-                    self, user, taxon, place.place_id
-                )
-                header = TAXON_COUNTS_HEADER
-            elif unobserved_by:
-                raise BadArgument("I can't tabulate that yet.")
-            else:
-                formatted_counts = await format_user_taxon_counts(self, user, taxon)
-                header = TAXON_COUNTS_HEADER
-        elif place:
-            if unobserved_by:
-                full_title = f"Observations of {title} from {place.display_name}"
-                title_params["place_id"] = place.place_id
-                formatted_counts = await format_user_taxon_counts(
-                    self, unobserved_by, taxon, place.place_id, unobserved=True,
-                )
-                header = TAXON_NOTBY_HEADER
-            else:
-                formatted_counts = await format_place_taxon_counts(self, place, taxon)
-                header = TAXON_PLACES_HEADER
-        elif unobserved_by:
-            formatted_counts = await format_user_taxon_counts(
-                self, unobserved_by, taxon, None, unobserved=True,
-            )
-            header = TAXON_NOTBY_HEADER
-        if formatted_counts:
-            description = f"\n{header}\n{formatted_counts}"
+        if user and place:
+            full_title += f" from {place.display_name}"
+        elif place and unobserved_by:
+            full_title = f"Observations of {title} from {place.display_name}"
+        if state.place_id:
+            title_params["place_id"] = state.place_id
+        description = format_counts_description("", state, taxon)
 
         url = f"{WWW_BASE_URL}/observations"
         if taxon:
@@ -342,6 +441,69 @@ class INatEmbeds(MixinMeta):
         embed = make_embed(url=url, title=full_title, description=description,)
         return embed
 
+    async def make_obs_per_rank_embeds(self, arg: FilteredTaxon, per: str):
+        """Return pages of embeds for observation counts per taxon at a rank."""
+        (taxon, user, place, unobserved_by) = arg
+        rank = RANK_EQUIVALENTS.get(per) or per
+        if rank not in RANK_LEVELS:
+            raise BadArgument(f"Not a rank: `{per}`")
+        if taxon and RANK_LEVELS[rank] >= RANK_LEVELS[taxon.rank]:
+            raise BadArgument(f"Rank `{rank}` must be below `{taxon.rank}`")
+
+        kwargs = {}
+        full_title = "Observations"
+        if taxon:
+            kwargs["taxon_id"] = taxon.taxon_id
+            full_title += f" of {format_taxon_title(taxon)}"
+        if place:
+            kwargs["place_id"] = place.place_id
+            full_title += f" from {place.display_name}"
+        if user:
+            kwargs["user_id"] = user.user_id
+            full_title += f" by {user.login}"
+        if unobserved_by:
+            kwargs["unobserved_by_user_id"] = unobserved_by.user_id
+            kwargs["lrank"] = "species"
+            full_title += f" unobserved by {unobserved_by.login}"
+        full_title += f" per {rank}"
+
+        rank_counts = await get_rank_counts(self, rank, **kwargs)
+        if not rank_counts.counts:
+            raise LookupError(f"No observations identified to {rank} found")
+        url = f"{WWW_BASE_URL}/observations?{urlencode(kwargs)}"
+        rows = [
+            f"[{format_taxon_counts(counts, rank_counts.taxa[group_id])}]"
+            f"({WWW_BASE_URL}/observations?"
+            f"{urlencode({**kwargs, 'taxon_id': group_id})}) "
+            f"{format_taxon_name(rank_counts.taxa[group_id])}"
+            for (group_id, counts) in sorted(
+                rank_counts.counts.items(),
+                key=lambda item: (-item[1].observations, -item[1].species),
+            )
+        ]
+        footer = f"{len(rows)} {rank} groups"
+        if rank_counts.ungrouped.observations:
+            footer += (
+                f"; {rank_counts.ungrouped.observations} observations"
+                f" not identified to {rank}"
+            )
+        if not rank_counts.complete:
+            footer += "; only the most observed species were counted"
+        header = f"__obs# (spp#) per {rank}:__"
+        pages = paginate(
+            rows, max_items=20, max_len=MAX_EMBED_DESCRIPTION_LEN - len(header) - 1
+        )
+        embeds = []
+        for index, page in enumerate(pages, start=1):
+            embed = make_embed(
+                url=url,
+                title=f"{full_title} (page {index} of {len(pages)})",
+                description="\n".join([header, *page]),
+            )
+            embed.set_footer(text=footer)
+            embeds.append(embed)
+        return embeds
+
     async def format_obs(
         self, obs, with_description=True, with_link=False, compact=False
     ):
@@ -396,8 +558,7 @@ class INatEmbeds(MixinMeta):
                 description = "\n> %s" % "\n> ".join(lines[:10])
                 if len(lines) > 10:
                     description += "\n> …"
-                if len(description) > 500:
-                    description = description[:498] + "…"
+                description = truncate_text(description, 500)
                 summary += description + "\n"
             return summary
 
@@ -446,7 +607,7 @@ class INatEmbeds(MixinMeta):
             taxon_summary_raw = await self.api.get_obs_taxon_summary(
                 obs.obs_id, **kwargs
             )
-            taxon_summary = TaxonSummary.from_dict(taxon_summary_raw)
+            taxon_summary = TaxonSummary.from_record(taxon_summary_raw)
             means = None
             status = None
             if taxon_summary:
@@ -535,13 +696,13 @@ class INatEmbeds(MixinMeta):
                     summary += "\n" + error
                 embed.description = summary
         else:
-            mat = re.search(PAT_OBS_LINK, url)
-            if mat:
-                obs_id = int(mat["obs_id"])
+            link = find_link(url, "obs")
+            if link:
+                obs_id = link.id
                 LOG.info("Observation not found for: %s", obs_id)
                 embed.title = "No observation found for id: %s (deleted?)" % obs_id
             else:
-                # If this happens, it's a bug (i.e. PAT_OBS_LINK should already match)
+                # If this happens, it's a bug (i.e. an obs link should already match)
                 LOG.info("Not an observation: %s", url)
                 embed.title = "Not an observation:"
                 embed.description = url
@@ -640,7 +801,9 @@ class INatEmbeds(MixinMeta):
 
         return embed
 
-    async def make_taxa_embed(self, ctx, arg, include_ancestors=True):
+    async def make_taxa_embed(
+        self, ctx, arg, include_ancestors=True, state: EmbedState = None
+    ):
         """Make embed describing taxa record."""
         if isinstance(arg, FilteredTaxon):
             (taxon, user, place, _unobserved_by) = arg  # noqa: F841
@@ -717,14 +880,9 @@ class INatEmbeds(MixinMeta):
             ancestors = full_record.get("ancestors")
             description = await format_ancestors(description, ancestors)
 
-        if place:
-            formatted_counts = await format_place_taxon_counts(self, place, taxon)
-            if formatted_counts:
-                description += f"\n{TAXON_PLACES_HEADER}\n{formatted_counts}"
-        if user:
-            formatted_counts = await format_user_taxon_counts(self, user, taxon)
-            if formatted_counts:
-                description += f"\n{TAXON_COUNTS_HEADER}\n{formatted_counts}"
+        if state is None:
+            state = await self.make_taxon_state(arg)
+        description = format_counts_description(description, state, taxon)
 
         embed.title = title
         embed.description = description
@@ -880,6 +1038,57 @@ class INatEmbeds(MixinMeta):
             reaction_emojis = NO_PARENT_TAXON_REACTION_EMOJIS
         start_adding_reactions(msg, reaction_emojis)
 
+    async def make_taxon_state(self, arg: Union[FilteredTaxon, Taxon]) -> EmbedState:
+        """Return state of a taxon embed with counts from place or by user."""
+        if not isinstance(arg, FilteredTaxon):
+            return EmbedState(taxon_id=arg.taxon_id)
+        (taxon, user, place, _unobserved_by) = arg  # noqa: F841
+        # Counts by the user aren't filtered by the place, nor vice versa:
+        if user:
+            return await self.make_counts_state(FilteredTaxon(taxon, user, None, None))
+        return await self.make_counts_state(FilteredTaxon(taxon, None, place, None))
+
+    async def get_embed_state(self, msg: discord.Message) -> EmbedState:
+        """Get state of the message's embed, parsing it if not stored."""
+        state = await self.embed_states.get(msg.id)
+        if state is None:
+            state = INatEmbed.from_discord_embed(msg.embeds[0]).embed_state()
+        return state
+
+    def get_seen_message(self, message_id: int) -> Optional[discord.Message]:
+        """Get the bot's own cached copy of a message, if it has one.
+
+        The bot keeps its copies current as messages are edited, so unlike our
+        message cache, it also sees edits made elsewhere (e.g. by another cog).
+        Only look for messages known to be ours, as its copies aren't indexed
+        by id; they are searched from the newest, which ours usually are.
+        """
+        # pylint: disable=protected-access
+        return self.bot._connection._get_message(message_id)
+
+    async def get_current_message(self, msg: discord.Message) -> discord.Message:
+        """Get the current version of one of our messages, fetching it if needed.
+
+        The newer of the bot's copy and ours (as we last sent or edited it) is
+        current. If the bot has no copy, ours is assumed to be current, else
+        the message is fetched. The bot's copy is only looked for if the
+        message is in our index, i.e. cached or with a stored state.
+        """
+        cached = self.message_cache.get(msg.id)
+        if cached is None and not await self.embed_states.get(msg.id):
+            return await msg.channel.fetch_message(msg.id)
+        seen = self.get_seen_message(msg.id)
+        if seen is not None:
+            return self.message_cache.get_current(seen) or seen
+        if cached is not None:
+            return cached
+        return await msg.channel.fetch_message(msg.id)
+
+    async def forget_message(self, message_id: int):
+        """Forget a message of ours that has been deleted."""
+        self.message_cache.remove(message_id)
+        await self.embed_states.remove(message_id)
+
     async def send_embed_for_taxon_image(
         self, ctx, filtered_taxon: Union[FilteredTaxon, Taxon], index=1
     ):
@@ -888,29 +1097,44 @@ class INatEmbeds(MixinMeta):
             embed=await self.make_image_embed(ctx, filtered_taxon, index)
         )
         self.add_taxon_reaction_emojis(msg, filtered_taxon)
+        # The taxon of an image embed is parsed from its url, so there's no
+        # state to store:
+        self.message_cache.add(msg)
 
     async def send_embed_for_taxon(self, ctx, filtered_taxon, include_ancestors=True):
         """Make embed for taxon & send."""
+        state = await self.make_taxon_state(filtered_taxon)
         msg = await ctx.send(
             embed=await self.make_taxa_embed(
-                ctx, filtered_taxon, include_ancestors=include_ancestors
+                ctx, filtered_taxon, include_ancestors=include_ancestors, state=state
             )
         )
         self.add_taxon_reaction_emojis(msg, filtered_taxon)
+        self.message_cache.add(msg)
+        await self.embed_states.set(msg.id, state)
+
+    async def send_obs_counts_embed(self, ctx, filtered_taxon: FilteredTaxon):
+        """Make embed for observation counts & send."""
+        state = await self.make_counts_state(filtered_taxon)
+        msg = await ctx.send(
+            embed=await self.make_obs_counts_embed(filtered_taxon, state)
+        )
+        self.add_obs_reaction_emojis(msg)
+        self.message_cache.add(msg)
+        await self.embed_states.set(msg.id, state)
 
     def get_inat_url_ids(self, url):
         """Match taxon_id & optional place_id/user_id from an iNat taxon or obs URL."""
         taxon_id = None
         place_id = None
         inat_user_id = None
-        mat = re.match(PAT_TAXON_LINK, url)
-        if not mat:
-            mat = re.match(PAT_OBS_TAXON_LINK, url)
-            if mat:
-                place_id = mat["place_id"]
-                inat_user_id = mat["user_id"]
-        if mat:
-            taxon_id = mat["taxon_id"]
+        link = match_link(url, "taxon", "obs_query")
+        if link and link.kind == "taxon":
+            taxon_id = str(link.id)
+        elif link and link.params.keys() <= OBS_TAXON_PARAMS:
+            taxon_id = link.params.get("taxon_id")
+            place_id = link.params.get("place_id")
+            inat_user_id = link.params.get("user_id")
         return (taxon_id, place_id, inat_user_id)
 
     async def maybe_update_member(
@@ -919,14 +1143,13 @@ class INatEmbeds(MixinMeta):
         """Add or remove member count in the embed if valid."""
         try:
             inat_user = await self.user_table.get_user(member)
-            counts_pat = r"(\n|^)\[[0-9 \(\)]+\]\(.*?\) " + inat_user.login
         except LookupError:
             return
 
-        inat_embed = msg.embeds[0]
-        taxon = await get_taxon(self, inat_embed.taxon_id(), refresh_cache=False)
+        state = await self.get_embed_state(msg)
+        taxon = await get_taxon(self, state.taxon_id, refresh_cache=False)
         # Observed by count add/remove for taxon:
-        await self.edit_totals_locked(msg, taxon, inat_user, action, counts_pat)
+        await self.edit_totals_locked(msg, taxon, inat_user, action)
 
     async def maybe_update_place(
         self,
@@ -955,14 +1178,9 @@ class INatEmbeds(MixinMeta):
         else:
             update_place = place
 
-        inat_embed = msg.embeds[0]
-        place_counts_pat = r"(\n|^)\[[0-9 \(\)]+\]\(.*?\) " + re.escape(
-            update_place.display_name
-        )
-        taxon = await get_taxon(self, inat_embed.taxon_id(), refresh_cache=False)
-        await self.edit_place_totals_locked(
-            msg, taxon, update_place, action, place_counts_pat
-        )
+        state = await self.get_embed_state(msg)
+        taxon = await get_taxon(self, state.taxon_id, refresh_cache=False)
+        await self.edit_place_totals_locked(msg, taxon, update_place, action)
 
     async def query_locked(self, msg, user, prompt, timeout):
         """Query member with user lock."""
@@ -981,16 +1199,14 @@ class INatEmbeds(MixinMeta):
             return not re.match(prefix_pat, response.content)
 
         response = None
-        if user.id not in self.predicate_locks:
-            self.predicate_locks[user.id] = asyncio.Lock()
-        lock = self.predicate_locks[user.id]
+        lock = self.predicate_locks.get(user.id)
         if lock.locked():
             # An outstanding query for this user hasn't been answered.
             # They must answer it or the timeout must expire before they
             # can start another interaction.
             return
 
-        async with self.predicate_locks[user.id]:
+        async with lock:
             query = await msg.channel.send(prompt)
             try:
                 response = await self.bot.wait_for(
@@ -1077,9 +1293,8 @@ class INatEmbeds(MixinMeta):
         description = inat_embed.description or ""
         new_description = re.sub(TAXONOMY_PAT, "", description)
         if new_description == description:
-            response = await self.api.get_taxa(
-                inat_embed.taxon_id(), refresh_cache=False
-            )
+            state = await self.get_embed_state(message)
+            response = await self.api.get_taxa(state.taxon_id, refresh_cache=False)
             full_taxon_raw = response["results"][0]
             if full_taxon_raw:
                 ancestors_raw = full_taxon_raw.get("ancestors")
@@ -1095,166 +1310,271 @@ class INatEmbeds(MixinMeta):
                 return
         inat_embed.description = new_description
         await message.edit(embed=inat_embed)
-
-    async def update_totals(
-        self, description, taxon, inat_user, action, inat_embed, counts_pat,
-    ):
-        """Update the totals for the embed."""
-        unobserved = inat_embed.has_not_by_users()
-        place_id = inat_embed.place_id()
-        if not unobserved:
-            # Add/remove always results in a change to totals, so remove:
-            description = re.sub(
-                r"\n\[[0-9 \(\)]+?\]\(.*?\) \*total\*", "", description
+        self.message_cache.add(message)
+
+    async def update_totals(self, state: EmbedState, taxon, changes) -> EmbedState:
+        """Return the state with users' counts added or removed.
+
+        Parameters
+        ----------
+        state: EmbedState
+            The state of the embed.
+        taxon: Taxon
+            The taxon counted.
+        changes: list
+            Each (user_id, login, action) in the order made, where action
+            is `add`, `remove` or `toggle`.
+
+        Returns
+        -------
+        EmbedState
+            The new state, or the same one if nothing changed.
+        """
+        (rows, added) = apply_row_changes(state.rows, changes)
+        if rows == state.rows:
+            return state
+        kwargs = {}
+        if taxon:
+            kwargs["taxon_id"] = taxon.taxon_id
+        if state.place_id:
+            kwargs["place_id"] = state.place_id
+
+        if state.kind == "not_by":
+            # Each added user's counts are independent, so are fetched
+            # concurrently:
+            added_counts = await asyncio.gather(
+                *(
+                    get_taxon_counts(
+                        self, unobserved_by_user_id=row.id, lrank="species", **kwargs
+                    )
+                    for row in added
+                )
             )
+            if None in added_counts:
+                raise LookupError("User counts not found.")
+            counts_by_id = {
+                row.id: counts for (row, counts) in zip(added, added_counts)
+            }
+            rows = [
+                CountsRow(row.id, row.name, *counts_by_id[row.id])
+                if row.id in counts_by_id
+                else row
+                for row in rows
+            ]
+            return replace(state, kind="not_by" if rows else None, rows=rows)
 
-        matches = re.findall(
-            r"\n\[[0-9 \(\)]+\]\(.*?\) (?P<user_id>[-_a-z0-9]+)", description
-        )
-        if action == "remove":
-            # Remove the header if last one and the user's count:
-            if len(matches) == 1:
-                if unobserved:
-                    description = re.sub(TAXON_NOTBY_HEADER_PAT, "", description)
-                else:
-                    description = re.sub(TAXON_COUNTS_HEADER_PAT, "", description)
-            description = re.sub(counts_pat + r".*?((?=\n)|$)", "", description)
-        else:
-            # Add the header if first one and the user's count:
-            if not matches:
-                if unobserved:
-                    # not currently possible (new :hash: reaction starts 'by' embed)
-                    description += "\n" + TAXON_NOTBY_HEADER
-                else:
-                    description += "\n" + TAXON_COUNTS_HEADER
-            formatted_counts = await format_user_taxon_counts(
-                self, inat_user, taxon, place_id, unobserved
+        if not rows:
+            return replace(
+                state, kind=None, rows=[], total_observations=None, total_species=None
             )
-            description += "\n" + formatted_counts
-
-        if not unobserved:
-            matches = re.findall(
-                r"\n\[[0-9 \(\)]+\]\(.*?\) (?P<user_id>[-_a-z0-9]+)", description
+        # Observation counts of distinct users add up, so only the counts of
+        # users added are fetched (in one query) and the total is the sum of
+        # the rows. Species counts don't add up, so the total is fetched, but
+        # only if more than one user is listed and species are shown at all.
+        queries = []
+        if added:
+            queries.append(
+                get_observers_counts(self, [row.name for row in added], **kwargs)
             )
-            # Total added only if more than one user:
-            if len(matches) > 1:
-                formatted_counts = await format_user_taxon_counts(
-                    self, ",".join(matches), taxon, place_id
-                )
-                description += f"\n{formatted_counts}"
-                return description
-        return description
-
-    async def edit_totals_locked(
-        self, msg, taxon, inat_user, action, counts_pat,
-    ):
-        """Update totals for message locked."""
-        if msg.id not in self.reaction_locks:
-            self.reaction_locks[msg.id] = asyncio.Lock()
-        async with self.reaction_locks[msg.id]:
-            # Refetch the message because it may have changed prior to
-            # acquiring lock
-            try:
-                msg = await msg.channel.fetch_message(msg.id)
-            except discord.errors.NotFound:
-                return  # message has been deleted, nothing left to do
-            embeds = msg.embeds
-            inat_embed = INatEmbed.from_discord_embed(embeds[0])
-            description = inat_embed.description or ""
-            mat = re.search(counts_pat, description)
-            if action == "toggle":
-                action = "remove" if mat else "add"
-
-            if (mat and (action == "remove")) or (not mat and (action == "add")):
-                description = await self.update_totals(
-                    description, taxon, inat_user, action, inat_embed, counts_pat,
+        fetch_species = len(rows) > 1 and has_species_counts(taxon)
+        if fetch_species:
+            queries.append(
+                self.api.get_observations(
+                    "species_counts",
+                    user_id=",".join(row.name for row in rows),
+                    per_page=0,
+                    **kwargs,
                 )
-                if len(description) > MAX_EMBED_DESCRIPTION_LEN:
-                    raise NoRoomInDisplay(
-                        "No more room for additional users in this display."
-                    )
-                inat_embed.description = description
-                if not inat_embed.has_not_by_users() and re.search(
-                    r"\*total\*", inat_embed.description
-                ):
-                    inat_embed.set_footer(
-                        text="User counts may not add up to "
-                        "the total if they changed since they were added. "
-                        "Remove, then add them again to update their counts."
-                    )
-                else:
-                    inat_embed.set_footer(text="")
-                await msg.edit(embed=inat_embed)
+            )
+        results = await asyncio.gather(*queries)
+        if None in results:
+            raise LookupError("User counts not found.")
+        if added:
+            observers_counts = results.pop(0)
+            no_counts = TaxonCounts(0, 0)
+            rows = [
+                CountsRow(row.id, row.name, *observers_counts.get(row.name, no_counts))
+                if row in added
+                else row
+                for row in rows
+            ]
+        total_observations = None
+        if len(rows) > 1:
+            total_observations = sum(row.observations for row in rows)
+        total_species = results[0]["total_results"] if fetch_species else None
+        return replace(
+            state,
+            kind="users",
+            rows=rows,
+            total_observations=total_observations,
+            total_species=total_species,
+        )
 
     async def update_place_totals(
-        self, description, taxon, place, action, inat_embed, place_counts_pat
-    ):
-        """Update the place totals for the embed."""
-        # Add/remove always results in a change to totals, so remove:
-        description = re.sub(r"\n\[[0-9 \(\)]+?\]\(.*?\) \*total\*", "", description)
-
-        matches = re.findall(r"\n\[[0-9 \(\)]+\]\(.*?\) (.*?)(?=\n|$)", description)
-        if action == "remove":
-            # Remove the header if last one and the place's count:
-            if len(matches) == 1:
-                description = re.sub(TAXON_PLACES_HEADER_PAT, "", description)
-            description = re.sub(place_counts_pat + r".*?((?=\n)|$)", "", description)
-        else:
-            # Add the header if first one and the place's count:
-            if not matches:
-                description += "\n" + TAXON_PLACES_HEADER
-            formatted_counts = await format_place_taxon_counts(
-                self, place, taxon, inat_embed.user_id()
+        self, state: EmbedState, taxon, changes
+    ) -> EmbedState:
+        """Return the state with places' counts added or removed.
+
+        Parameters
+        ----------
+        state: EmbedState
+            The state of the embed.
+        taxon: Taxon
+            The taxon counted.
+        changes: list
+            Each (place_id, display_name, action) in the order made, where
+            action is `add`, `remove` or `toggle`.
+
+        Returns
+        -------
+        EmbedState
+            The new state, or the same one if nothing changed.
+        """
+        (rows, added) = apply_row_changes(state.rows, changes)
+        if rows == state.rows:
+            return state
+        kwargs = {"verifiable": "true"}
+        if taxon:
+            kwargs["taxon_id"] = taxon.taxon_id
+        if state.user_id:
+            kwargs["user_id"] = state.user_id
+
+        # The added places' counts and the new total are independent, so are
+        # fetched concurrently:
+        queries = [get_taxon_counts(self, place_id=row.id, **kwargs) for row in added]
+        # Total added only if more than one place. Places may overlap, so
+        # unlike users' counts, the places' observation counts are not added
+        # up locally:
+        if len(rows) > 1:
+            place_ids = ",".join(str(row.id) for row in rows)
+            queries.append(
+                get_taxon_counts(
+                    self, species=has_species_counts(taxon), place_id=place_ids, **kwargs
+                )
             )
-            description += "\n" + formatted_counts
+        results = await asyncio.gather(*queries)
+        counts_by_id = {
+            row.id: counts for (row, counts) in zip(added, results) if counts
+        }
+        rows = [
+            CountsRow(row.id, row.name, *counts_by_id[row.id])
+            if row.id in counts_by_id
+            else row
+            for row in rows
+            if row not in added or row.id in counts_by_id
+        ]
+        total = results[len(added)] if len(results) > len(added) else None
+        return replace(
+            state,
+            kind="places" if rows else None,
+            rows=rows,
+            total_observations=total.observations if total else None,
+            total_species=total.species if total else None,
+        )
 
-        matches = re.findall(
-            r"\n\[[0-9 \(\)]+\]\(.*?\?place_id=(?P<place_id>\d+)&.*?\)", description,
+    async def edit_totals_locked(self, msg, taxon, inat_user, action):
+        """Add, remove or toggle user counts in the message's embed."""
+        await self.edit_counts_coalesced(
+            msg, taxon, "users", (inat_user.user_id, inat_user.login, action)
         )
-        # Total added only if more than one place:
-        if len(matches) > 1:
-            formatted_counts = await format_place_taxon_counts(
-                self, ",".join(matches), taxon, inat_embed.user_id()
-            )
-            description += f"\n{formatted_counts}"
-            return description
-        return description
 
-    async def edit_place_totals_locked(
-        self, msg, taxon, place, action, place_counts_pat
-    ):
-        """Update place totals for message locked."""
-        if msg.id not in self.reaction_locks:
-            self.reaction_locks[msg.id] = asyncio.Lock()
-        async with self.reaction_locks[msg.id]:
-            # Refetch the message because it may have changed prior to
-            # acquiring lock
-            try:
-                msg = await msg.channel.fetch_message(msg.id)
-            except discord.errors.NotFound:
-                return  # message has been deleted, nothing left to do
-            embeds = msg.embeds
-            inat_embed = INatEmbed.from_discord_embed(embeds[0])
-            description = inat_embed.description or ""
-            mat = re.search(place_counts_pat, description)
-            if action == "toggle":
-                action = "remove" if mat else "add"
-
-            if (mat and (action == "remove")) or (not mat and (action == "add")):
-                description = await self.update_place_totals(
-                    description, taxon, place, action, inat_embed, place_counts_pat
-                )
-                if len(description) > MAX_EMBED_DESCRIPTION_LEN:
-                    raise NoRoomInDisplay(
-                        "No more room for additional places in this display."
-                    )
-                inat_embed.description = description
-                if re.search(r"\*total\*", inat_embed.description):
-                    inat_embed.set_footer(
-                        text="Non-overlapping place counts may not add up to "
-                        "the total if they changed since they were added. "
-                        "Remove, then add them again to update their counts."
-                    )
-                else:
-                    inat_embed.set_footer(text="")
-                await msg.edit(embed=inat_embed)
+    async def edit_place_totals_locked(self, msg, taxon, place, action):
+        """Add, remove or toggle place counts in the message's embed."""
+        await self.edit_counts_coalesced(
+            msg, taxon, "places", (place.place_id, place.display_name, action)
+        )
+
+    async def edit_counts_coalesced(self, msg, taxon, kind, change):
+        """Apply a change to the counts in the message's embed.
+
+        A change is applied at once unless an edit of the message is already
+        under way, or was made less than EDIT_WINDOW_SECONDS ago. Changes made
+        until then are applied together, with their counts fetched in one
+        batch and a single edit. The first of them makes the edit, and every
+        caller waits for it, so any error is raised to each of them.
+        """
+        pending = self.pending_edits.get(msg.id)
+        if pending is not None:
+            waiter = asyncio.get_running_loop().create_future()
+            pending.changes.append((kind, change))
+            pending.waiters.append(waiter)
+            await waiter
+            return
+        pending = self.pending_edits[msg.id] = PendingEdit([(kind, change)], [])
+        try:
+            last_edit = self.recent_edits.get(msg.id)
+            if last_edit is not None:
+                await asyncio.sleep(EDIT_WINDOW_SECONDS - (monotonic() - last_edit))
+            async with self.reaction_locks.get(msg.id):
+                # Changes from now on are applied by the next edit:
+                del self.pending_edits[msg.id]
+                await self.edit_counts(msg, taxon, pending.changes)
+                self.recent_edits.set(msg.id, monotonic())
+        except asyncio.CancelledError:
+            for waiter in pending.waiters:
+                waiter.cancel()
+            raise
+        except Exception as err:  # pylint: disable=broad-except
+            for waiter in pending.waiters:
+                if not waiter.done():
+                    waiter.set_exception(err)
+            raise
+        finally:
+            if self.pending_edits.get(msg.id) is pending:
+                del self.pending_edits[msg.id]
+            for waiter in pending.waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+
+    async def edit_counts(self, msg, taxon, changes):
+        """Apply (kind, change) changes to the counts in the message's embed.
+
+        The caller must hold the message's reaction lock.
+        """
+        # The message may have changed prior to acquiring lock:
+        try:
+            msg = await self.get_current_message(msg)
+        except discord.errors.NotFound:
+            await self.forget_message(msg.id)
+            return
+        state = await self.get_embed_state(msg)
+        user_changes = [change for (kind, change) in changes if kind == "users"]
+        place_changes = [change for (kind, change) in changes if kind == "places"]
+        # A table of users or of places is shown, not both, so the other
+        # kind of changes are ignored, as they are for single reactions:
+        new_state = state
+        if user_changes and new_state.kind != "places":
+            new_state = await self.update_totals(new_state, taxon, user_changes)
+        if place_changes and new_state.kind not in ("users", "not_by"):
+            new_state = await self.update_place_totals(new_state, taxon, place_changes)
+        if new_state == state:
+            return
+
+        inat_embed = INatEmbed.from_discord_embed(msg.embeds[0])
+        description = format_counts_description(
+            inat_embed.description or "", new_state, taxon
+        )
+        if len(description) > MAX_EMBED_DESCRIPTION_LEN:
+            raise NoRoomInDisplay(
+                "No more room for additional "
+                + ("places" if place_changes else "users")
+                + " in this display."
+            )
+        inat_embed.description = description
+        if new_state.kind == "places" and new_state.total:
+            inat_embed.set_footer(
+                text="Non-overlapping place counts may not add up to "
+                "the total if they changed since they were added. "
+                "Remove, then add them again to update their counts."
+            )
+        elif new_state.kind == "users" and new_state.total_species is not None:
+            inat_embed.set_footer(text=USER_SPECIES_FOOTER)
+        else:
+            inat_embed.set_footer(text="")
+        try:
+            await msg.edit(embed=inat_embed)
+        except discord.errors.NotFound:
+            await self.forget_message(msg.id)
+            return
+        self.message_cache.add(msg)
+        await self.embed_states.set(msg.id, new_state)
@@ -5,6 +5,7 @@ import asyncio
 import inflect
 from redbot.core import commands, Config
 from .api import INatAPI
+from .codes import INatCodeTable
 from .commands.inat import CommandsInat
 from .commands.last import CommandsLast
 from .commands.obs import CommandsObs
@@ -13,12 +14,18 @@ from .commands.project import CommandsProject
 from .commands.search import CommandsSearch
 from .commands.taxon import CommandsTaxon
 from .commands.user import CommandsUser
+from .common import ExpiringCache, LockRegistry
+from .embed_state import EMBED_STATE_GROUP, INatEmbedStateStore
+from .inat_embeds import EDIT_WINDOW_SECONDS
+from .listener_settings import INatListenerSettings
+from .message_cache import MAX_CACHED_MESSAGES, INatMessageCache
 from .obs_query import INatObsQuery
 from .places import INatPlaceTable
 from .projects import INatProjectTable
 from .listeners import Listeners
 from .search import INatSiteSearch
 from .taxon_query import INatTaxonQuery
+from .taxon_store import INatTaxonStore
 from .users import INatUserTable
 
 _SCHEMA_VERSION = 2
@@ -56,18 +63,29 @@ class INatCog(
         self.bot = bot
         self.config = Config.get_conf(self, identifier=1607)
         self.api = INatAPI()
+        self.code_table = INatCodeTable(self)
+        self.embed_states = INatEmbedStateStore(self)
+        self.listener_settings = INatListenerSettings(self)
+        self.message_cache = INatMessageCache()
         self.p = inflect.engine()  # pylint: disable=invalid-name
         self.obs_query = INatObsQuery(self)
         self.taxon_query = INatTaxonQuery(self)
+        self.taxon_store = INatTaxonStore(self)
         self.user_table = INatUserTable(self)
         self.place_table = INatPlaceTable(self)
         self.project_table = INatProjectTable(self)
         self.site_search = INatSiteSearch(self)
         self.user_cache_init = {}
-        self.reaction_locks = {}
-        self.predicate_locks = {}
+        self.reaction_locks = LockRegistry()
+        self.pending_edits = {}
+        self.recent_edits = ExpiringCache(MAX_CACHED_MESSAGES, EDIT_WINDOW_SECONDS)
+        self.predicate_locks = LockRegistry()
 
-        self.config.register_global(home=97394, schema_version=1)  # North America
+        self.config.register_global(
+            home=97394,  # North America
+            schema_version=1,
+            bird_codes={},
+        )
         self.config.register_guild(
             autoobs=False,
             dot_taxon=False,
@@ -81,6 +99,8 @@ class INatCog(
             project_emojis={},
         )
         self.config.register_channel(autoobs=None, dot_taxon=None)
+        self.config.init_custom(EMBED_STATE_GROUP, 1)
+        self.config.register_custom(EMBED_STATE_GROUP, state=None)
         self.config.register_user(
             home=None, inat_user_id=None, known_in=[], known_all=False
         )
@@ -120,6 +140,7 @@ class INatCog(
         """Cleanup when the cog unloads."""
         if not self._cleaned_up:
             self.api.session.detach()
+            self.taxon_store.close()
             if self._init_task:
                 self._init_task.cancel()
             self._cleaned_up = True
@@ -6,11 +6,17 @@ from inflect import engine
 from redbot.core import Config
 from redbot.core.bot import Red
 from .api import INatAPI
+from .codes import INatCodeTable
+from .common import ExpiringCache, LockRegistry
+from .embed_state import INatEmbedStateStore
+from .listener_settings import INatListenerSettings
+from .message_cache import INatMessageCache
 from .obs_query import INatObsQuery
 from .places import INatPlaceTable
 from .projects import INatProjectTable
 from .search import INatSiteSearch
 from .taxon_query import INatTaxonQuery
+from .taxon_store import INatTaxonStore
 from .users import INatUserTable
 
 
@@ -24,15 +30,22 @@ class MixinMeta(ABC):
     def __init__(self, *_args):
         self.config: Config
         self.api: INatAPI
+        self.code_table: INatCodeTable
+        self.embed_states: INatEmbedStateStore
+        self.listener_settings: INatListenerSettings
+        self.message_cache: INatMessageCache
         self.bot: Red
         self.p: engine  # pylint: disable=invalid-name
         self.user_table: INatUserTable
-        self.reaction_locks: dict
-        self.predicate_locks: dict
+        self.reaction_locks: LockRegistry
+        self.pending_edits: dict
+        self.recent_edits: ExpiringCache
+        self.predicate_locks: LockRegistry
         self.obs_query: INatObsQuery
         self.place_table: INatPlaceTable
         self.project_table: INatProjectTable
         self.site_search: INatSiteSearch
         self.taxon_query: INatTaxonQuery
+        self.taxon_store: INatTaxonStore
         self.user_cache_init: dict
         self._ready_event: Event
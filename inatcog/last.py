@@ -1,14 +1,13 @@
 """Module for handling recent history."""
 from typing import NamedTuple
 from datetime import datetime
-import re
 from discord import User
 
 import timeago
 
-from .base_classes import WWW_BASE_URL, PAT_OBS_LINK
+from .links import find_link
 from .obs import get_obs_fields
-from .taxa import get_taxon, PAT_TAXON_LINK
+from .taxa import get_taxon
 
 
 class ObsLinkMsg(NamedTuple):
@@ -37,10 +36,10 @@ class INatLinkMsg:
         """Find recent observation link."""
 
         def match_obs_link(message):
-            return re.search(PAT_OBS_LINK, message.content) or (
+            return find_link(message.content, "obs") or (
                 message.embeds
                 and message.embeds[0].url
-                and re.search(PAT_OBS_LINK, message.embeds[0].url)
+                and find_link(message.embeds[0].url, "obs")
             )
 
         try:
@@ -48,9 +47,9 @@ class INatLinkMsg:
         except StopIteration:
             return None
 
-        mat = match_obs_link(found)
-        obs_id = int(mat["obs_id"])
-        url = mat["url"] or WWW_BASE_URL + "/observations/" + str(obs_id)
+        link = match_obs_link(found)
+        obs_id = link.id
+        url = link.url
         ago = timeago.format(found.created_at, datetime.utcnow())
         if found.author.bot:
             name = None
@@ -76,10 +75,10 @@ class INatLinkMsg:
         """Find recent taxon link."""
 
         def match_taxon_link(message):
-            return re.search(PAT_TAXON_LINK, message.content) or (
+            return find_link(message.content, "taxon") or (
                 message.embeds
                 and message.embeds[0].url
-                and re.search(PAT_TAXON_LINK, message.embeds[0].url)
+                and find_link(message.embeds[0].url, "taxon")
             )
 
         # - Include bot msgs because that's mostly how users share these links,
@@ -91,9 +90,9 @@ class INatLinkMsg:
         except StopIteration:
             return None
 
-        mat = match_taxon_link(found)
-        taxon_id = int(mat["taxon_id"])
-        url = mat["url"] or WWW_BASE_URL + "/taxa/" + str(taxon_id)
+        link = match_taxon_link(found)
+        taxon_id = link.id
+        url = link.url
         home = await self.cog.get_home(ctx)
         taxon = await get_taxon(self.cog, taxon_id, preferred_place_id=home)
 
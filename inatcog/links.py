@@ -0,0 +1,101 @@
+"""Module to find links to iNat partner sites in text."""
+import re
+from typing import Dict, Iterator, NamedTuple, Optional
+from urllib.parse import parse_qsl
+from .base_classes import WWW_URL_PAT
+
+# Every partner site domain contains one of these, so text without any of
+# them has no links and needn't be scanned.
+# See https://www.inaturalist.org/pages/network
+PARTNER_DOMAIN_PARTS = (
+    "inaturalist.",
+    "naturalista.",
+    "biodiversity4all.",
+    "argentinat.",
+)
+
+SLUG_PAT = r"[a-z][-_a-z0-9]{2,39}"
+# Match a link of any kind from any partner site.
+PAT_INAT_LINK = re.compile(
+    r"\b(?P<url>" + WWW_URL_PAT + r"/("
+    r"observations/(?P<obs_id>\d+)\b"
+    r"|taxa/(?P<taxon_id>\d+)\b"
+    r"|(people|users)/((?P<user_id>\d+)|(?P<login>" + SLUG_PAT + r"))\b"
+    r"|places/((?P<place_id>\d+)|(?P<place_slug>" + SLUG_PAT + r"))\b"
+    r"|projects/((?P<project_id>\d+)|(?P<project_slug>" + SLUG_PAT + r"))\b"
+    r"|observations(?P<query>\?[^\s<>()]*)?(?![/\w])"
+    r"))",
+    re.I,
+)
+
+# Kinds of links with an id or slug, and the groups they're matched by.
+LINK_GROUPS = (
+    ("obs", "obs_id", None),
+    ("taxon", "taxon_id", None),
+    ("user", "user_id", "login"),
+    ("place", "place_id", "place_slug"),
+    ("project", "project_id", "project_slug"),
+)
+
+
+class INatLink(NamedTuple):
+    """A link to an iNat partner site.
+
+    `kind` is one of `obs`, `taxon`, `user`, `place`, `project` or
+    `obs_query` (i.e. observations matching the query `params`). Users,
+    places & projects are linked to by either `id` or `slug`.
+    """
+
+    kind: str
+    url: str
+    id: Optional[int] = None
+    slug: Optional[str] = None
+    params: Optional[Dict[str, str]] = None
+
+    @property
+    def id_or_slug(self) -> str:
+        """The id of the link as a string, or else its slug."""
+        return self.slug if self.id is None else str(self.id)
+
+
+def _make_link(mat) -> INatLink:
+    for (kind, id_group, slug_group) in LINK_GROUPS:
+        if mat[id_group]:
+            return INatLink(kind, mat["url"], id=int(mat[id_group]))
+        if slug_group and mat[slug_group]:
+            return INatLink(kind, mat["url"], slug=mat[slug_group])
+    query = mat["query"] or ""
+    return INatLink("obs_query", mat["url"], params=dict(parse_qsl(query[1:])))
+
+
+def has_partner_domain(content: str) -> bool:
+    """Whether the content might have a link to a partner site."""
+    lowered = content.lower()
+    return any(part in lowered for part in PARTNER_DOMAIN_PARTS)
+
+
+def scan_links(content: str) -> Iterator[INatLink]:
+    """Scan content for links to partner sites in one pass, in order."""
+    if not content or not has_partner_domain(content):
+        return
+    for mat in PAT_INAT_LINK.finditer(content):
+        yield _make_link(mat)
+
+
+def find_link(content: str, *kinds: str) -> Optional[INatLink]:
+    """Find the first link in the content, of one of the kinds if given."""
+    return next(
+        (link for link in scan_links(content) if not kinds or link.kind in kinds),
+        None,
+    )
+
+
+def match_link(url: str, *kinds: str) -> Optional[INatLink]:
+    """Match a link at the start of the url, of one of the kinds if given."""
+    if not url or not has_partner_domain(url):
+        return None
+    mat = PAT_INAT_LINK.match(url)
+    if not mat:
+        return None
+    link = _make_link(mat)
+    return link if not kinds or link.kind in kinds else None
@@ -0,0 +1,83 @@
+"""Module for the settings of the message listener, by channel."""
+import re
+from typing import Iterable, NamedTuple, Optional, Pattern
+import discord
+
+
+def make_prefix_pattern(prefixes: Iterable[str]) -> Optional[Pattern]:
+    """Compile a pattern matching messages starting with any of the prefixes."""
+    prefixes = r"|".join(re.escape(prefix) for prefix in prefixes)
+    if not prefixes:
+        return None
+    return re.compile(r"^({prefixes})".format(prefixes=prefixes))
+
+
+class ListenerSettings(NamedTuple):
+    """Effective settings of the message listener for a channel."""
+
+    prefix_pattern: Optional[Pattern] = None
+    autoobs: bool = False
+    dot_taxon: bool = False
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any feature of the listener is on."""
+        return self.autoobs or self.dot_taxon
+
+    def is_ignored(self, content: str) -> bool:
+        """Whether the message starts with one of the other bot prefixes."""
+        return bool(self.prefix_pattern and self.prefix_pattern.match(content))
+
+
+class INatListenerSettings:
+    """Snapshot of the listener settings, by (guild, channel).
+
+    Settings are read from config once per channel, instead of for every
+    message, and reloaded after they're changed by `[p]inat set` or
+    `[p]inat clear`.
+
+    Each invalidation of a guild's settings counts a new generation of
+    them, so settings loaded while they were being changed aren't kept.
+    """
+
+    def __init__(self, cog):
+        self.cog = cog
+        self._settings = {}
+        self._generations = {}
+
+    async def get(self, channel: discord.TextChannel) -> ListenerSettings:
+        """Get the effective settings for the channel."""
+        key = (channel.guild.id, channel.id)
+        settings = self._settings.get(key)
+        if settings is None:
+            generation = self._generations.get(channel.guild.id, 0)
+            settings = await self._load(channel)
+            if self._generations.get(channel.guild.id, 0) == generation:
+                self._settings[key] = settings
+        return settings
+
+    async def _load(self, channel: discord.TextChannel) -> ListenerSettings:
+        guild_config = self.cog.config.guild(channel.guild)
+        channel_config = self.cog.config.channel(channel)
+        autoobs = await channel_config.autoobs()
+        if autoobs is None:
+            autoobs = await guild_config.autoobs()
+        dot_taxon = await channel_config.dot_taxon()
+        if dot_taxon is None:
+            dot_taxon = await guild_config.dot_taxon()
+        return ListenerSettings(
+            prefix_pattern=make_prefix_pattern(await guild_config.bot_prefixes()),
+            autoobs=bool(autoobs),
+            dot_taxon=bool(dot_taxon),
+        )
+
+    def invalidate(
+        self, guild: discord.Guild, channel: Optional[discord.TextChannel] = None
+    ):
+        """Reload the settings for the channel, or all in the guild, on next use."""
+        self._generations[guild.id] = self._generations.get(guild.id, 0) + 1
+        if channel:
+            self._settings.pop((guild.id, channel.id), None)
+            return
+        for key in [key for key in self._settings if key[0] == guild.id]:
+            del self._settings[key]
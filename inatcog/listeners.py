@@ -2,7 +2,6 @@
 from typing import NamedTuple, Union
 import asyncio
 import contextlib
-from copy import copy
 import re
 import discord
 from redbot.core import commands
@@ -11,7 +10,7 @@ from redbot.core.commands import BadArgument
 from .common import LOG
 from .converters import NaturalCompoundQueryConverter
 from .embeds import NoRoomInDisplay
-from .inat_embeds import INatEmbed, INatEmbeds, REACTION_EMOJI
+from .inat_embeds import INatEmbeds, REACTION_EMOJI
 from .interfaces import MixinMeta
 from .obs import maybe_match_obs
 
@@ -44,6 +43,10 @@ class PartialContext(NamedTuple):
     command: str = ""
     assume_yes: bool = True
 
+    async def send(self, *args, **kwargs):
+        """Send to the channel, like Context.send."""
+        return await self.channel.send(*args, **kwargs)
+
 
 class Listeners(INatEmbeds, MixinMeta):
     """Listeners mixin for inatcog."""
@@ -58,29 +61,21 @@ class Listeners(INatEmbeds, MixinMeta):
         guild = message.guild
         channel = message.channel
 
+        settings = await self.listener_settings.get(channel)
+        if not settings.enabled:
+            return
+
         # Autoobs and dot_taxon features both need embed_links:
         if not channel.permissions_for(guild.me).embed_links:
             return
-        guild_config = self.config.guild(guild)
 
         # - on_message_without_command only ignores bot prefixes for this instance
         # - implementation as suggested by Trusty:
         #   - https://cogboard.red/t/approved-dronefly/541/5?u=syntheticbee
-        bot_prefixes = await guild_config.bot_prefixes()
-
-        if bot_prefixes:
-            prefixes = r"|".join(re.escape(bot_prefix) for bot_prefix in bot_prefixes)
-            prefix_pattern = re.compile(r"^({prefixes})".format(prefixes=prefixes))
-            if re.match(prefix_pattern, message.content):
-                return
-
-        channel_autoobs = await self.config.channel(channel).autoobs()
-        if channel_autoobs is None:
-            autoobs = await guild_config.autoobs()
-        else:
-            autoobs = channel_autoobs
+        if settings.is_ignored(message.content):
+            return
 
-        if autoobs:
+        if settings.autoobs:
             ctx = PartialContext(
                 self.bot, guild, channel, message.author, message, "msg autoobs"
             )
@@ -94,16 +89,9 @@ class Listeners(INatEmbeds, MixinMeta):
                     await self.maybe_send_sound_url(channel, obs.sounds[0])
                 self.bot.dispatch("commandstats_action", ctx)
 
-        channel_dot_taxon = await self.config.channel(channel).dot_taxon()
-        if channel_dot_taxon is None:
-            dot_taxon = await guild_config.dot_taxon()
-        else:
-            dot_taxon = channel_dot_taxon
-
-        if dot_taxon:
+        if settings.dot_taxon:
             mat = re.search(DOT_TAXON_PAT, message.content)
             if mat:
-                msg = None
                 ctx = PartialContext(
                     self.bot, guild, channel, message.author, message, "msg dot_taxon"
                 )
@@ -117,15 +105,9 @@ class Listeners(INatEmbeds, MixinMeta):
                 except (BadArgument, LookupError):
                     return
                 if query.user or query.place:
-                    msg = await channel.send(
-                        embed=await self.make_obs_counts_embed(filtered_taxon)
-                    )
-                    self.add_obs_reaction_emojis(msg)
+                    await self.send_obs_counts_embed(ctx, filtered_taxon)
                 else:
-                    msg = await channel.send(
-                        embed=await self.make_taxa_embed(ctx, filtered_taxon)
-                    )
-                    self.add_taxon_reaction_emojis(msg, filtered_taxon)
+                    await self.send_embed_for_taxon(ctx, filtered_taxon)
                 self.bot.dispatch("commandstats_action", ctx)
 
     async def handle_member_reaction(
@@ -152,37 +134,35 @@ class Listeners(INatEmbeds, MixinMeta):
 
         if not message.embeds:
             return
-        inat_embed = INatEmbed.from_discord_embed(message.embeds[0])
-        if not inat_embed.taxon_id():
+        state = await self.get_embed_state(message)
+        if not state.taxon_id:
             return
-        msg = copy(message)
-        msg.embeds[0] = inat_embed
 
         try:
             if str(emoji) == REACTION_EMOJI["taxonomy"]:
-                await self.maybe_update_taxonomy(msg)
+                await self.maybe_update_taxonomy(message)
                 dispatch_commandstats(message, "react taxonomy")
-            elif not inat_embed.has_places():
+            elif state.kind != "places":
                 if str(emoji) == REACTION_EMOJI["self"]:
-                    await self.maybe_update_member(msg, member, action)
+                    await self.maybe_update_member(message, member, action)
                     dispatch_commandstats(message, "react self")
                 elif str(emoji) == REACTION_EMOJI["user"]:
                     ctx = PartialContext(
                         self.bot, message.guild, message.channel, member
                     )
-                    await self.maybe_update_member_by_name(ctx, msg=msg, user=member)
+                    await self.maybe_update_member_by_name(
+                        ctx, msg=message, user=member
+                    )
                     dispatch_commandstats(message, "react user")
-            if not (inat_embed.has_users() or inat_embed.has_not_by_users()):
+            if state.kind not in ("users", "not_by"):
                 if str(emoji) == REACTION_EMOJI["home"]:
-                    await self.maybe_update_place(msg, member, action)
+                    await self.maybe_update_place(message, member, action)
                     dispatch_commandstats(message, "react home")
                 elif str(emoji) == REACTION_EMOJI["place"]:
-                    await self.maybe_update_place_by_name(msg, member)
+                    await self.maybe_update_place_by_name(message, member)
                     dispatch_commandstats(message, "react place")
         except NoRoomInDisplay as err:
-            if message.id not in self.predicate_locks:
-                self.predicate_locks[message.id] = asyncio.Lock()
-            async with self.predicate_locks[message.id]:
+            async with self.predicate_locks.get(message.id):
                 error_message = await message.channel.send(err.args[0])
                 await asyncio.sleep(15)
                 with contextlib.suppress(discord.HTTPException):
@@ -204,22 +184,33 @@ class Listeners(INatEmbeds, MixinMeta):
         await self._ready_event.wait()
         if not payload.guild_id:
             raise ValueError("Reaction is not on a guild channel.")
+        # Only our own recent messages with reactions are handled, i.e. those
+        # cached by us, or with a stored embed state (which outlive restarts).
+        # Both are looked up by id, so any other reaction is rejected before
+        # looking for the bot's copy of the message, or fetching it:
+        message = self.message_cache.get(payload.message_id)
+        if message is None:
+            if not await self.embed_states.get(payload.message_id):
+                raise ValueError("Reaction is not to our own recent message.")
         guild = self.bot.get_guild(payload.guild_id)
         member = guild.get_member(payload.user_id)
         if member is None or member.bot:
             raise ValueError("User is not a guild member.")
-        channel = self.bot.get_channel(payload.channel_id)
-        try:
-            message = next(
-                msg for msg in self.bot.cached_messages if msg.id == payload.message_id
-            )
-        except StopIteration:  # too old; have to fetch it
+        seen = self.get_seen_message(payload.message_id)
+        if seen is not None:
+            if seen.author != self.bot.user:
+                raise ValueError("Reaction is not to our own message.")
+            message = self.message_cache.get_current(seen) or seen
+        elif message is None:  # not cached since a restart; have to fetch it
+            channel = self.bot.get_channel(payload.channel_id)
             try:
                 message = await channel.fetch_message(payload.message_id)
             except discord.errors.NotFound:
+                await self.forget_message(payload.message_id)
                 raise ValueError("Message was deleted before reaction handled.")
-        if message.author != self.bot.user:
-            raise ValueError("Reaction is not to our own message.")
+            if message.author != self.bot.user:
+                raise ValueError("Reaction is not to our own message.")
+            self.message_cache.add(message)
         return (member, message)
 
     @commands.Cog.listener()
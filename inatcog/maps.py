@@ -6,14 +6,55 @@ from .base_classes import WWW_BASE_URL
 MapCoords = namedtuple("MapCoords", "zoom_level, center_lat, center_lon")
 MapLink = namedtuple("MapLink", "title, url")
 
-
-def normalize_longitude(deg):
-    """Account for wrap around the globe."""
-    while deg < 0:
-        deg += 360
-    while deg > 360:
-        deg -= 360
-    return deg
+# Observation bounds of taxa change slowly, so are kept for a day.
+BOUNDS_TTL = 24 * 60 * 60
+# Most bounds kept; the least recently used are forgotten first.
+MAX_CACHED_BOUNDS = 1000
+
+
+def get_longitude_arc(bounds):
+    """Get west longitude & width of bounds, which may cross the antimeridian."""
+    west = bounds["swlng"]
+    east = bounds["nelng"]
+    if east < west:
+        east += 360
+    return (west, east - west)
+
+
+def union_bounds(bounds_list):
+    """Get the smallest bounds enclosing all of the bounds.
+
+    Parameters
+    ----------
+    bounds_list: list of dict
+        The bounds, as from get_observation_bounds(); any None are skipped.
+
+    Returns
+    -------
+    dict
+        The bounds, or None if there are none. If they cross the
+        antimeridian, `nelng` is east of 180.
+    """
+    bounds_list = [bounds for bounds in bounds_list if bounds]
+    if not bounds_list:
+        return None
+    arcs = [get_longitude_arc(bounds) for bounds in bounds_list]
+    # The smallest arc enclosing all of them starts where one of them starts:
+    (west, width) = (None, None)
+    for (start, _width) in arcs:
+        start_width = max(
+            (arc_west - start) % 360 + arc_width for (arc_west, arc_width) in arcs
+        )
+        if width is None or start_width < width:
+            (west, width) = (start, start_width)
+    if width >= 360:
+        (west, width) = (-180, 360)
+    return {
+        "swlat": min(min(bounds["swlat"], bounds["nelat"]) for bounds in bounds_list),
+        "swlng": west,
+        "nelat": max(max(bounds["swlat"], bounds["nelat"]) for bounds in bounds_list),
+        "nelng": west + width,
+    }
 
 
 def get_zoom_level(swlat, swlng, nelat, nelng):
@@ -51,22 +92,61 @@ class INatMapURL:
     def __init__(self, api):
         self.api = api
 
+    def _get_cached_bounds(self, taxon_ids):
+        """Get (True, bounds) for the set of taxa if cached, else (False, None)."""
+        # Taxa without observations have no bounds, so they're cached as (None,):
+        cached = self.api.bounds_cache.get(frozenset(taxon_ids))
+        if cached is None:
+            return (False, None)
+        return (True, cached[0])
+
+    def _set_cached_bounds(self, taxon_ids, bounds):
+        self.api.bounds_cache.set(frozenset(taxon_ids), (bounds,))
+
+    async def get_bounds_for_taxon_ids(self, taxon_ids):
+        """Get bounds of observations of the taxa, cached regardless of order.
+
+        Bounds of each taxon are combined locally. Only those not cached
+        already are fetched, in one request. Those are only separately
+        cached if just one taxon is fetched, as bounds of several taxa from
+        the API are combined already.
+        """
+        if not taxon_ids:
+            return await self.api.get_observation_bounds(taxon_ids)
+        (cached, bounds) = self._get_cached_bounds(taxon_ids)
+        if cached:
+            return bounds
+        bounds_list = []
+        missing = []
+        for taxon_id in dict.fromkeys(taxon_ids):
+            (cached, taxon_bounds) = self._get_cached_bounds([taxon_id])
+            if cached:
+                bounds_list.append(taxon_bounds)
+            else:
+                missing.append(taxon_id)
+        if missing:
+            missing_bounds = await self.api.get_observation_bounds(missing)
+            self._set_cached_bounds(missing, missing_bounds)
+            bounds_list.append(missing_bounds)
+        bounds = union_bounds(bounds_list)
+        self._set_cached_bounds(taxon_ids, bounds)
+        return bounds
+
     async def get_map_coords_for_taxon_ids(self, taxon_ids):
         """Get map coordinates encompassing taxa ranges/observations."""
-        bounds = await self.api.get_observation_bounds(taxon_ids)
+        bounds = await self.get_bounds_for_taxon_ids(taxon_ids)
         if not bounds:
             center_lat = 0
             center_lon = 0
             zoom_level = 2
         else:
             swlat = bounds["swlat"]
-            swlng = normalize_longitude(bounds["swlng"])
             nelat = bounds["nelat"]
-            nelng = normalize_longitude(bounds["nelng"])
+            (west, width) = get_longitude_arc(bounds)
             center_lat = (swlat + nelat) / 2
-            center_lon = (swlng + nelng) / 2
+            center_lon = west + width / 2
 
-            zoom_level = get_zoom_level(swlat, swlng, nelat, nelng)
+            zoom_level = get_zoom_level(swlat, west, nelat, west + width)
 
         return MapCoords(zoom_level, center_lat, center_lon)
 
@@ -0,0 +1,71 @@
+"""Module for the cache of our own recent messages."""
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+import discord
+
+# Most messages kept; the least recently used are forgotten first.
+MAX_CACHED_MESSAGES = 1000
+
+
+def message_version(message: discord.Message) -> datetime:
+    """Version of a message, i.e. when it was last edited, or else sent."""
+    return message.edited_at or message.created_at
+
+
+class INatMessageCache:
+    """Cache of messages as we last sent or edited them, by id.
+
+    Only the bot can edit its own messages, so the cached copy is current
+    unless the message was edited since elsewhere (e.g. by another cog).
+    That is told by comparing it with the bot's own copy of the message, if
+    any; see `get_current()`.
+    """
+
+    def __init__(self, max_messages: int = MAX_CACHED_MESSAGES):
+        self.max_messages = max_messages
+        self._messages = OrderedDict()
+
+    def __contains__(self, message_id: int):
+        return message_id in self._messages
+
+    def __len__(self):
+        return len(self._messages)
+
+    def add(self, message: discord.Message):
+        """Add a message as just sent or edited."""
+        self._messages[message.id] = message
+        self._messages.move_to_end(message.id)
+        while len(self._messages) > self.max_messages:
+            self._messages.popitem(last=False)
+
+    def get(self, message_id: int) -> Optional[discord.Message]:
+        """Get a message as we last sent or edited it, if cached."""
+        message = self._messages.get(message_id)
+        if message is not None:
+            self._messages.move_to_end(message_id)
+        return message
+
+    def get_current(self, message: discord.Message) -> Optional[discord.Message]:
+        """Get the cached copy of a message if at least as new as the one given.
+
+        Parameters
+        ----------
+        message: discord.Message
+            The message as last seen, e.g. the bot's own copy, which is
+            updated when the message is edited.
+
+        Returns
+        -------
+        discord.Message
+            The cached copy, or None if not cached or older, in which case
+            the message needs to be fetched.
+        """
+        cached = self.get(message.id)
+        if cached is None or message_version(message) > message_version(cached):
+            return None
+        return cached
+
+    def remove(self, message_id: int):
+        """Forget a message, e.g. if it was deleted."""
+        self._messages.pop(message_id, None)
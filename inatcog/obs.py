@@ -1,13 +1,154 @@
 """Module to work with iNat observations."""
 
-import re
+from functools import cached_property
 
-from .base_classes import WWW_BASE_URL, Obs, PAT_OBS_LINK, User
+from .base_classes import WWW_BASE_URL, Obs, User
+from .links import find_link
 from .photos import Photo
 from .sounds import Sound
 from .taxa import get_taxon_fields
 
 
+def count_community_id(obs, community_taxon):
+    """Count identifications agreeing with the community taxon.
+
+    Parameters
+    ----------
+    obs: dict
+        A JSON observation record.
+    community_taxon: dict
+        The JSON community taxon record of the observation.
+
+    Returns
+    -------
+    tuple
+        Count of identifications counted towards or against the
+        community taxon, and of those agreeing with it.
+    """
+    idents_count = 0
+    idents_agree = 0
+
+    ident_taxon_ids = obs["ident_taxon_ids"]
+
+    for identification in obs["identifications"]:
+        if identification["current"]:
+            user_taxon_id = identification["taxon"]["id"]
+            user_taxon_ids = identification["taxon"]["ancestor_ids"]
+            if (
+                community_taxon["id"] == user_taxon_id
+                or community_taxon["id"] in user_taxon_ids
+            ):
+                if user_taxon_id in ident_taxon_ids:
+                    # Count towards total & agree:
+                    idents_count += 1
+                    idents_agree += 1
+                else:
+                    # Neither counts for nor against
+                    pass
+            else:
+                # Maverick counts against:
+                idents_count += 1
+
+    return (idents_count, idents_agree)
+
+
+class LazyObs:
+    """An observation with fields parsed from its JSON record on first access.
+
+    It has the same fields as Obs. Nested fields (taxa, user, photos,
+    sounds, community id counts) are only parsed if used and then cached,
+    so compact listings of many observations don't pay for fields they
+    never show.
+
+    Parameters
+    ----------
+    record: dict
+        A JSON observation record from /v1/observations or other endpoint
+        returning observations.
+    """
+
+    def __init__(self, record):
+        self.record = record
+        self.obs_id = record["id"]
+        self.obs_on = record["observed_on_string"]
+        self.obs_at = record["place_guess"]
+        self.quality_grade = record["quality_grade"]
+        self.faves_count = record["faves_count"]
+        self.comments_count = record["comments_count"]
+        self.description = record["description"]
+
+    @cached_property
+    def taxon(self):
+        """Taxon of the observation, if any."""
+        obs_taxon = self.record.get("taxon")
+        return get_taxon_fields(obs_taxon) if obs_taxon else None
+
+    @cached_property
+    def community_taxon(self):
+        """Community taxon of the observation, if any."""
+        obs_community_taxon = self.record.get("community_taxon")
+        return get_taxon_fields(obs_community_taxon) if obs_community_taxon else None
+
+    @cached_property
+    def _community_id_counts(self):
+        obs_community_taxon = self.record.get("community_taxon")
+        if obs_community_taxon:
+            return count_community_id(self.record, obs_community_taxon)
+        return (0, 0)
+
+    @property
+    def idents_count(self):
+        """Count of identifications counted towards the community id."""
+        return self._community_id_counts[0]
+
+    @property
+    def idents_agree(self):
+        """Count of identifications agreeing with the community id."""
+        return self._community_id_counts[1]
+
+    @cached_property
+    def user(self):
+        """User who made the observation."""
+        return User.from_record(self.record["user"])
+
+    @cached_property
+    def thumbnail(self):
+        """Thumbnail url of the first photo, if any."""
+        photos = self.record.get("photos")
+        return photos[0].get("url") if photos else ""
+
+    @cached_property
+    def images(self):
+        """Original size photos."""
+        return [
+            Photo(
+                photo.get("url").replace("/square", "/original"),
+                photo.get("attribution"),
+            )
+            for photo in self.record.get("photos") or []
+        ]
+
+    @cached_property
+    def sounds(self):
+        """Sounds."""
+        return [
+            Sound(sound.get("file_url"), sound.get("attribution"))
+            for sound in self.record.get("sounds") or []
+        ]
+
+    @cached_property
+    def project_ids(self):
+        """Ids of traditional and non-traditional projects including the obs."""
+        non_traditional_projects = self.record.get("non_traditional_projects") or []
+        return self.record["project_ids"] + [
+            project["project_id"] for project in non_traditional_projects
+        ]
+
+    def to_obs(self):
+        """Parse all fields into an Obs."""
+        return Obs(*(getattr(self, field) for field in Obs._fields))
+
+
 def get_obs_fields(obs):
     """Get an Obs from get_observations JSON record.
 
@@ -22,99 +163,16 @@ def get_obs_fields(obs):
     Obs
         An Obs object from the JSON results.
     """
-
-    def count_community_id(obs, community_taxon):
-        idents_count = 0
-        idents_agree = 0
-
-        ident_taxon_ids = obs["ident_taxon_ids"]
-
-        for identification in obs["identifications"]:
-            if identification["current"]:
-                user_taxon_id = identification["taxon"]["id"]
-                user_taxon_ids = identification["taxon"]["ancestor_ids"]
-                user_taxon_ids.append(user_taxon_id)
-                if community_taxon["id"] in user_taxon_ids:
-                    if user_taxon_id in ident_taxon_ids:
-                        # Count towards total & agree:
-                        idents_count += 1
-                        idents_agree += 1
-                    else:
-                        # Neither counts for nor against
-                        pass
-                else:
-                    # Maverick counts against:
-                    idents_count += 1
-
-        return (idents_count, idents_agree)
-
-    obs_taxon = obs.get("taxon")
-    if obs_taxon:
-        taxon = get_taxon_fields(obs_taxon)
-    else:
-        taxon = None
-    obs_community_taxon = obs.get("community_taxon")
-    idents_count = idents_agree = 0
-    if obs_community_taxon:
-        (idents_count, idents_agree) = count_community_id(obs, obs_community_taxon)
-        community_taxon = get_taxon_fields(obs_community_taxon)
-    else:
-        community_taxon = None
-
-    user = User.from_dict(obs["user"])
-
-    photos = obs.get("photos") or []
-    images = [
-        Photo(
-            re.sub("/square", "/original", photo.get("url")), photo.get("attribution")
-        )
-        for photo in photos
-    ]
-    if photos:
-        thumbnail = photos[0].get("url")
-    else:
-        thumbnail = ""
-
-    sound_recs = obs.get("sounds")
-    if sound_recs:
-        sounds = [
-            Sound(sound.get("file_url"), sound.get("attribution"))
-            for sound in sound_recs
-        ]
-    else:
-        sounds = []
-    project_ids = obs["project_ids"]
-    non_traditional_projects = obs.get("non_traditional_projects")
-    if non_traditional_projects:
-        project_ids += [project["project_id"] for project in non_traditional_projects]
-
-    return Obs(
-        taxon,
-        community_taxon,
-        obs["id"],
-        obs["observed_on_string"],
-        obs["place_guess"],
-        user,
-        thumbnail,
-        images,
-        obs["quality_grade"],
-        idents_agree,
-        idents_count,
-        obs["faves_count"],
-        obs["comments_count"],
-        obs["description"],
-        obs["project_ids"],
-        sounds,
-    )
+    return LazyObs(obs).to_obs()
 
 
 async def maybe_match_obs(cog, ctx, content, id_permitted=False):
     """Maybe retrieve an observation from content."""
-    mat = re.search(PAT_OBS_LINK, content)
+    link = find_link(content, "obs")
     obs = url = obs_id = None
-    if mat:
-        obs_id = int(mat["obs_id"])
-        url = mat["url"] or WWW_BASE_URL + "/observations/" + str(obs_id)
+    if link:
+        obs_id = link.id
+        url = link.url
 
     if id_permitted:
         try:
@@ -128,7 +186,7 @@ async def maybe_match_obs(cog, ctx, content, id_permitted=False):
                 obs_id, include_new_projects=1, preferred_place_id=home
             )
         )["results"]
-        obs = get_obs_fields(results[0]) if results else None
+        obs = LazyObs(results[0]) if results else None
     if obs_id and not url:
         url = WWW_BASE_URL + "/observations/" + str(obs_id)
     return (obs, url)
@@ -1,15 +1,36 @@
 """Module to query iNat observations."""
+from time import time
 from .base_classes import CompoundQuery
-from .controlled_terms import ControlledTerm, match_controlled_term
-from .obs import get_obs_fields
+from .controlled_terms import ControlledTerm, ControlledTermIndex
+from .obs import get_obs_fields, LazyObs
 from .taxa import format_taxon_name
 
+# Controlled terms almost never change, so are only fetched again after a day.
+CONTROLLED_TERMS_TTL = 24 * 60 * 60
+
 
 class INatObsQuery:
     """Query iNat for one or more observation."""
 
     def __init__(self, cog):
         self.cog = cog
+        self._controlled_term_index = None
+        self._controlled_terms_time = 0
+
+    async def get_controlled_term_index(self):
+        """Get indexed controlled terms, fetching them again only when stale."""
+        if (
+            not self._controlled_term_index
+            or time() - self._controlled_terms_time > CONTROLLED_TERMS_TTL
+        ):
+            controlled_terms_dict = await self.cog.api.get_controlled_terms()
+            controlled_terms = [
+                ControlledTerm.from_dict(term, infer_missing=True)
+                for term in controlled_terms_dict["results"]
+            ]
+            self._controlled_term_index = ControlledTermIndex(controlled_terms)
+            self._controlled_terms_time = time()
+        return self._controlled_term_index
 
     def format_query_args(self, filtered_taxon, term, value):
         """Format query into a human-readable string"""
@@ -47,13 +68,9 @@ class INatObsQuery:
                 kwargs["lrank"] = "species"
         if query.controlled_term:
             query_term, query_value = query.controlled_term
-            controlled_terms_dict = await self.cog.api.get_controlled_terms()
-            controlled_terms = [
-                ControlledTerm.from_dict(term, infer_missing=True)
-                for term in controlled_terms_dict["results"]
-            ]
-            (term, value) = match_controlled_term(
-                controlled_terms, query_term, query_value
+            controlled_term_index = await self.get_controlled_term_index()
+            (term, value) = controlled_term_index.match(
+                query_term, query_value, filtered_taxon.taxon
             )
             kwargs["term_id"] = term.id
             kwargs["term_value_id"] = value.id
@@ -90,7 +107,7 @@ class INatObsQuery:
             )
 
         return (
-            [get_obs_fields(result) for result in response["results"]],
+            [LazyObs(result) for result in response["results"]],
             response["total_results"],
             response["per_page"],
         )
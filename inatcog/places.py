@@ -1,18 +1,13 @@
 """Module to handle users."""
-import re
-from typing import Union
-from .base_classes import Place, WWW_URL_PAT
+from typing import Dict, Union
+from .base_classes import Place
+from .common import AbbrevIndex, ExpiringCache
 from .converters import QuotedContextMemberConverter
 
-# Match place link from any partner site.
-PAT_PLACE_LINK = re.compile(
-    r"\b(?P<url>" + WWW_URL_PAT + r"/places"
-    r"/((?P<place_id>\d+)|(?P<place_slug>[a-z][-_a-z0-9]{2,39}))"
-    r")\b",
-    re.I,
-)
-
 RESERVED_PLACES = ["home", "none", "clear", "all", "any"]
+# Most places kept, and for how long, so edits on iNat are seen eventually.
+MAX_CACHED_PLACES = 1000
+PLACE_CACHE_TTL = 60 * 60
 
 
 class INatPlaceTable:
@@ -20,6 +15,50 @@ class INatPlaceTable:
 
     def __init__(self, cog):
         self.cog = cog
+        # Each guild's place abbreviations, written through to config:
+        self._abbrevs: Dict[int, AbbrevIndex] = {}
+        self._places = ExpiringCache(MAX_CACHED_PLACES, PLACE_CACHE_TTL)
+
+    async def get_abbrevs(self, guild) -> AbbrevIndex:
+        """Get the guild's place abbreviations, loaded from config on first use."""
+        abbrevs = self._abbrevs.get(guild.id)
+        if abbrevs is None:
+            abbrevs = AbbrevIndex(await self.cog.config.guild(guild).places())
+            self._abbrevs[guild.id] = abbrevs
+        return abbrevs
+
+    async def add_abbrev(self, guild, abbrev: str, place_id: int):
+        """Add place abbreviation for the guild."""
+        abbrevs = await self.get_abbrevs(guild)
+        abbrevs.set(abbrev, place_id)
+        await self.cog.config.guild(guild).places.set(abbrevs.abbrevs)
+
+    async def remove_abbrev(self, guild, abbrev: str):
+        """Remove place abbreviation for the guild."""
+        abbrevs = await self.get_abbrevs(guild)
+        abbrevs.remove(abbrev)
+        await self.cog.config.guild(guild).places.set(abbrevs.abbrevs)
+
+    async def get_place_id(
+        self, guild, query: Union[int, str], user: QuotedContextMemberConverter = None
+    ):
+        """Get place id by guild abbr (or unique prefix of one), `home`, or id#.
+
+        Returns None if not known without the API.
+        """
+        if isinstance(query, int) or query.isnumeric():
+            return int(query)
+        abbrev = query.lower()
+        if abbrev == "home" and user:
+            user_config = self.cog.config.user(user)
+            home_id = await user_config.home()
+            if home_id:
+                return int(home_id)
+        if guild:
+            place_id = (await self.get_abbrevs(guild)).match(abbrev)
+            if place_id:
+                return int(place_id)
+        return None
 
     async def get_place(
         self, guild, query: Union[int, str], user: QuotedContextMemberConverter = None
@@ -27,21 +66,13 @@ class INatPlaceTable:
         """Get place by guild abbr or via id#/keyword lookup in API."""
         place = None
         response = None
-        home_id = None
-
-        if isinstance(query, str):
-            abbrev = query.lower()
-            if abbrev == "home" and user:
-                user_config = self.cog.config.user(user)
-                home_id = await user_config.home()
-        if home_id or isinstance(query, int) or query.isnumeric():
-            place_id = home_id or query
-            response = await self.cog.api.get_places(int(place_id))
-        elif guild:
-            guild_config = self.cog.config.guild(guild)
-            places = await guild_config.places()
-            if abbrev in places:
-                response = await self.cog.api.get_places(places[abbrev])
+
+        place_id = await self.get_place_id(guild, query, user)
+        if place_id:
+            place = self._places.get(place_id)
+            if place:
+                return place
+            response = await self.cog.api.get_places(place_id)
 
         if not response:
             response = await self.cog.api.get_places(
@@ -54,6 +85,9 @@ class INatPlaceTable:
                 place = results[0]
 
         if place:
-            return Place.from_dict(place)
+            place = Place.from_dict(place)
+            if place_id == place.place_id:
+                self._places.set(place_id, place)
+            return place
 
         raise LookupError("iNat place not known.")
@@ -1,9 +1,13 @@
 """Module to handle projects."""
 from dataclasses import dataclass, field
-import re
-from typing import List, Union
+from typing import Dict, List, Union
 from dataclasses_json import config, DataClassJsonMixin
-from .base_classes import WWW_BASE_URL, WWW_URL_PAT
+from .base_classes import WWW_BASE_URL
+from .common import AbbrevIndex, ExpiringCache
+
+# Most projects kept, and for how long, so edits on iNat are seen eventually.
+MAX_CACHED_PROJECTS = 1000
+PROJECT_CACHE_TTL = 60 * 60
 
 
 @dataclass
@@ -19,15 +23,6 @@ class Project(DataClassJsonMixin):
         self.url = f"{WWW_BASE_URL}/projects/{self.project_id}"
 
 
-# Match project link from any partner site.
-PAT_PROJECT_LINK = re.compile(
-    r"\b(?P<url>" + WWW_URL_PAT + r"/projects"
-    r"/((?P<project_id>\d+)|(?P<project_slug>[a-z][-_a-z0-9]{2,39}))"
-    r")\b",
-    re.I,
-)
-
-
 @dataclass
 class UserProject(DataClassJsonMixin):
     """A collection project for observations by specific users."""
@@ -65,23 +60,46 @@ class INatProjectTable:
 
     def __init__(self, cog):
         self.cog = cog
+        # Each guild's project abbreviations, written through to config:
+        self._abbrevs: Dict[int, AbbrevIndex] = {}
+        self._projects = ExpiringCache(MAX_CACHED_PROJECTS, PROJECT_CACHE_TTL)
+
+    async def get_abbrevs(self, guild) -> AbbrevIndex:
+        """Get the guild's project abbreviations, loaded from config on first use."""
+        abbrevs = self._abbrevs.get(guild.id)
+        if abbrevs is None:
+            abbrevs = AbbrevIndex(await self.cog.config.guild(guild).projects())
+            self._abbrevs[guild.id] = abbrevs
+        return abbrevs
+
+    async def add_abbrev(self, guild, abbrev: str, project_id: int):
+        """Add project abbreviation for the guild."""
+        abbrevs = await self.get_abbrevs(guild)
+        abbrevs.set(abbrev, project_id)
+        await self.cog.config.guild(guild).projects.set(abbrevs.abbrevs)
+
+    async def remove_abbrev(self, guild, abbrev: str):
+        """Remove project abbreviation for the guild."""
+        abbrevs = await self.get_abbrevs(guild)
+        abbrevs.remove(abbrev)
+        await self.cog.config.guild(guild).projects.set(abbrevs.abbrevs)
 
     async def get_project(self, guild, query: Union[int, str]):
         """Get project by guild abbr or via id#/keyword lookup in API."""
         project = None
         response = None
-        abbrev = None
+        project_id = None
 
-        if isinstance(query, str):
-            abbrev = query.lower()
         if isinstance(query, int) or query.isnumeric():
-            project_id = query
-            response = await self.cog.api.get_projects(int(project_id))
-        if guild and abbrev:
-            guild_config = self.cog.config.guild(guild)
-            projects = await guild_config.projects()
-            if abbrev in projects:
-                response = await self.cog.api.get_projects(projects[abbrev])
+            project_id = int(query)
+        elif guild:
+            project_id = (await self.get_abbrevs(guild)).match(query)
+        if project_id:
+            project_id = int(project_id)
+            project = self._projects.get(project_id)
+            if project:
+                return project
+            response = await self.cog.api.get_projects(project_id)
 
         if not response:
             response = await self.cog.api.get_projects("autocomplete", q=query)
@@ -92,6 +110,9 @@ class INatProjectTable:
                 project = results[0]
 
         if project:
-            return Project.from_dict(project)
+            project = Project.from_dict(project)
+            if project_id == project.project_id:
+                self._projects.set(project_id, project)
+            return project
 
         raise LookupError("iNat project not known.")
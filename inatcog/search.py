@@ -7,7 +7,7 @@ from .taxa import format_taxon_name, get_taxon_fields
 
 def get_place(result):
     """Get place result."""
-    place = Place.from_dict(result.get("record"))
+    place = Place.from_record(result.get("record"))
     return f":round_pushpin: [{place.display_name}]({place.url})"
 
 
@@ -21,7 +21,7 @@ def get_project(result):
 
 def get_user(result):
     """Get user result."""
-    user = User.from_dict(result.get("record"))
+    user = User.from_record(result.get("record"))
     return f":bust_in_silhouette: {user.profile_link()}"
 
 
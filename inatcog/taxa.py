@@ -1,5 +1,6 @@
 """Module to work with iNat taxa."""
 import re
+from functools import lru_cache
 from typing import NamedTuple, Optional, Union
 from .base_classes import (
     WWW_BASE_URL,
@@ -12,6 +13,8 @@ from .base_classes import (
     Place,
 )
 from .common import LOG
+from .counts import TaxonCounts, get_observers_counts, get_taxon_counts
+from .embeds import fit_items
 
 
 TAXON_ID_LIFE = 48460
@@ -24,8 +27,12 @@ TAXON_NOTBY_HEADER_PAT = re.compile(re.escape(TAXON_NOTBY_HEADER) + "\n")
 TAXON_LIST_DELIMITER = [", ", " > "]
 TAXON_PRIMARY_RANKS = ["kingdom", "phylum", "class", "order", "family"]
 
+# Most distinct taxon names kept formatted; see format_taxon_name().
+TAXON_NAME_CACHE_SIZE = 4096
+
 TRINOMIAL_ABBR = {"variety": "var.", "subspecies": "ssp.", "form": "f."}
 
+PAT_STATIC_URL = re.compile(r"https?://static\.inaturalist\.org")
 PAT_TAXON_LINK = re.compile(
     r"\b(?P<url>https?://(www\.)?inaturalist\.(org|ca)/taxa/(?P<taxon_id>\d+))\b", re.I
 )
@@ -65,34 +72,9 @@ def format_taxon_names(
         for taxon in taxa
     ]
 
-    def fit_names(names):
-        names_fit = []
-        # Account for space already used by format string (minus 2 for %s)
-        available_len = max_len - (len(names_format) - 2)
-
-        def more(count):
-            return "and %d more" % count
-
-        def formatted_len(name):
-            return sum(len(item) + len(delimiter) for item in names_fit) + len(name)
-
-        def overflow(name):
-            return formatted_len(name) > available_len
-
-        for name in names:
-            if overflow(name):
-                unprocessed = len(names) - len(names_fit)
-                while overflow(more(unprocessed)):
-                    unprocessed += 1
-                    del names_fit[-1]
-                names_fit.append(more(unprocessed))
-                break
-            else:
-                names_fit.append(name)
-        return names_fit
-
     if max_len:
-        names = fit_names(names)
+        # Account for space already used by format string (minus 2 for %s)
+        names = fit_items(names, max_len - (len(names_format) - 2), delimiter)
 
     return names_format % delimiter.join(names)
 
@@ -123,16 +105,29 @@ def format_taxon_name(rec, with_term=False, hierarchy=False):
           insert the appropriate abbreviation, unitalicized, between the 2nd and 3rd
           name (e.g. "Anser anser domesticus" -> "*Anser anser* var. *domesticus*")
     """
+    return _format_taxon_name(
+        rec.name,
+        rec.common,
+        rec.term if with_term else None,
+        rec.rank,
+        rec.active,
+        bool(with_term),
+        bool(hierarchy),
+    )
+
+
+# Taxon names are formatted over and over again (e.g. the same ancestors in the
+# hierarchy of every taxon), and the result depends only on these fields of the
+# immutable Taxon, so a bounded memo makes repeats just a lookup.
+@lru_cache(maxsize=TAXON_NAME_CACHE_SIZE)
+def _format_taxon_name(name, common, term, rank, active, with_term, hierarchy):
+    """Format taxon name from Taxon fields; see format_taxon_name()."""
     if with_term:
-        common = rec.term if rec.term not in (rec.name, rec.common) else rec.common
+        common = term if term not in (name, common) else common
     else:
         if hierarchy:
             common = None
-        else:
-            common = rec.common
-    name = rec.name
 
-    rank = rec.rank
     rank_level = RANK_LEVELS[rank]
 
     if rank_level <= RANK_LEVELS["genus"]:
@@ -151,7 +146,7 @@ def format_taxon_name(rec, with_term=False, hierarchy=False):
                 # Note: name already italicized, so close/reopen italics around insertion.
                 name = f"{tri[0]} {tri[1]}* {TRINOMIAL_ABBR[rank]} *{tri[2]}"
     full_name = f"{name} ({common})" if common else name
-    if not rec.active:
+    if not active:
         full_name += " :exclamation: Inactive Taxon"
     return full_name
 
@@ -192,13 +187,13 @@ def get_taxon_fields(record):
 
     def make_means(means):
         try:
-            return EstablishmentMeans.from_dict(means)
+            return EstablishmentMeans.from_record(means)
         except KeyError:
             pass
 
     def make_means_partial(means):
         try:
-            return EstablishmentMeansPartial.from_dict(means)
+            return EstablishmentMeansPartial.from_record(means)
         except KeyError:
             pass
 
@@ -209,8 +204,8 @@ def get_taxon_fields(record):
         # Though default_photo only contains small versions of the image,
         # the original can be obtained for self-hosted images via this
         # transform on the thumbnail image:
-        if re.search(r"https?://static\.inaturalist\.org", thumbnail):
-            image = re.sub("/square", "/original", thumbnail)
+        if re.search(PAT_STATIC_URL, thumbnail):
+            image = thumbnail.replace("/square", "/original")
             attribution = photo.get("attribution")
         else:
             # For externally hosted default images (e.g. Flickr), only full records
@@ -248,7 +243,7 @@ def get_taxon_fields(record):
     conservation_status_raw = record.get("conservation_status")
     if conservation_status_raw:
         LOG.info(conservation_status_raw)
-        conservation_status = ConservationStatus.from_dict(conservation_status_raw)
+        conservation_status = ConservationStatus.from_record(conservation_status_raw)
     else:
         conservation_status = None
     taxon = Taxon(
@@ -418,42 +413,67 @@ async def format_place_taxon_counts(
     else:
         place_id = place.place_id
         name = place.display_name
-    obs_opt = {
-        "place_id": place_id,
-        "per_page": 0,
-        "verifiable": "true",
-    }
-    species_opt = {
-        "place_id": place_id,
-        "per_page": 0,
-        "verifiable": "true",
-    }
+    obs_opt = {"place_id": place_id, "verifiable": "true"}
     if taxon:
-        taxon_id = taxon.taxon_id
-        obs_opt["taxon_id"] = taxon_id
-        species_opt["taxon_id"] = taxon_id
+        obs_opt["taxon_id"] = taxon.taxon_id
     if user_id:
         obs_opt["user_id"] = user_id
-        species_opt["user_id"] = user_id
-    observations = await cog.api.get_observations(**obs_opt)
-    species = await cog.api.get_observations("species_counts", **species_opt)
-    if observations:
-        observations_count = observations["total_results"]
-        species_count = species["total_results"]
-        url = WWW_BASE_URL + f"/observations?place_id={place_id}&verifiable=true"
-        if taxon:
-            url += f"&taxon_id={taxon_id}"
-        if user_id:
-            url += f"&user_id={user_id}"
-        if taxon and RANK_LEVELS[taxon.rank] <= RANK_LEVELS["species"]:
-            link = f"[{observations_count}]({url}) {name}"
-        else:
-            link = f"[{observations_count} ({species_count})]({url}) {name}"
-        return f"{link} "
+    counts = await get_taxon_counts(cog, **obs_opt)
+    if counts:
+        return format_place_counts_link(counts, place_id, name, taxon, user_id)
 
     return ""
 
 
+def format_place_counts_link(
+    counts: TaxonCounts,
+    place_id: Union[int, str],
+    name: str,
+    taxon: Taxon = None,
+    user_id: int = None,
+):
+    """Format place observation & species counts linked to the observations."""
+    url = WWW_BASE_URL + f"/observations?place_id={place_id}&verifiable=true"
+    if taxon:
+        url += f"&taxon_id={taxon.taxon_id}"
+    if user_id:
+        url += f"&user_id={user_id}"
+    return f"[{format_taxon_counts(counts, taxon)}]({url}) {name} "
+
+
+def has_species_counts(taxon: Taxon = None):
+    """Species counts are shown for the taxon, i.e. it is above species rank."""
+    return not taxon or RANK_LEVELS[taxon.rank] > RANK_LEVELS["species"]
+
+
+def format_taxon_counts(counts: TaxonCounts, taxon: Taxon = None):
+    """Format observation & species counts, omitting species below species rank."""
+    if not has_species_counts(taxon):
+        return str(counts.observations)
+    return f"{counts.observations} ({counts.species})"
+
+
+def format_user_counts_link(
+    counts: TaxonCounts,
+    user_id: Union[int, str],
+    login: str,
+    taxon: Taxon = None,
+    place_id: int = None,
+    unobserved: bool = False,
+):
+    """Format user observation & species counts linked to the observations."""
+    url = WWW_BASE_URL + "/observations?verifiable=any"
+    if taxon:
+        url += f"&taxon_id={taxon.taxon_id}"
+    if unobserved:
+        url += f"&unobserved_by_user_id={user_id}&lrank=species"
+    else:
+        url += f"&user_id={user_id}"
+    if place_id:
+        url += f"&place_id={place_id}"
+    return f"[{format_taxon_counts(counts, taxon)}]({url}) {login} "
+
+
 async def format_user_taxon_counts(
     cog,
     user: Union[User, str],
@@ -469,45 +489,28 @@ async def format_user_taxon_counts(
         user_id = user.user_id
         login = user.login
     if unobserved:
-        obs_opt = {
-            "unobserved_by_user_id": user_id,
-            "lrank": "species",
-            "per_page": 0,
-        }
-        species_opt = {
-            "unobserved_by_user_id": user_id,
-            "lrank": "species",
-            "per_page": 0,
-        }
+        obs_opt = {"unobserved_by_user_id": user_id, "lrank": "species"}
     else:
-        obs_opt = {"user_id": user_id, "per_page": 0}
-        species_opt = {"user_id": user_id, "per_page": 0}
+        obs_opt = {"user_id": user_id}
     if taxon:
-        taxon_id = taxon.taxon_id
-        obs_opt["taxon_id"] = taxon_id
-        species_opt["taxon_id"] = taxon_id
+        obs_opt["taxon_id"] = taxon.taxon_id
     if place_id:
         obs_opt["place_id"] = place_id
-        species_opt["place_id"] = place_id
-    observations = await cog.api.get_observations(**obs_opt)
-    species = await cog.api.get_observations("species_counts", **species_opt)
-    if observations:
-        observations_count = observations["total_results"]
-        species_count = species["total_results"]
-        url = WWW_BASE_URL + "/observations?verifiable=any"
-        if taxon:
-            url += f"&taxon_id={taxon_id}"
-        if unobserved:
-            url += f"&unobserved_by_user_id={user_id}&lrank=species"
-        else:
-            url += f"&user_id={user_id}"
-        if place_id:
-            url += f"&place_id={place_id}"
-        if taxon and RANK_LEVELS[taxon.rank] <= RANK_LEVELS["species"]:
-            link = f"[{observations_count}]({url}) {login}"
-        else:
-            link = f"[{observations_count} ({species_count})]({url}) {login}"
-        return f"{link} "
+    if isinstance(user, str) or unobserved:
+        counts = await get_taxon_counts(cog, **obs_opt)
+    else:
+        # A single user's counts are had in one query instead of two:
+        del obs_opt["user_id"]
+        observers_counts = await get_observers_counts(cog, [user_id], **obs_opt)
+        counts = (
+            observers_counts.get(login, TaxonCounts(0, 0))
+            if observers_counts is not None
+            else None
+        )
+    if counts:
+        return format_user_counts_link(
+            counts, user_id, login, taxon, place_id, unobserved
+        )
 
     return ""
 
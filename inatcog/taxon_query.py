@@ -1,4 +1,6 @@
 """Module to query iNat taxa."""
+import asyncio
+from math import ceil
 import re
 from redbot.core.commands import BadArgument
 from .common import DEQUOTE
@@ -6,6 +8,24 @@ from .converters import ContextMemberConverter, NaturalCompoundQueryConverter
 from .taxa import get_taxon, get_taxon_fields, match_taxon
 from .base_classes import CompoundQuery, FilteredTaxon, RANK_EQUIVALENTS, RANK_LEVELS
 
+# Most taxa looked up by id per /v1/taxa query, keeping the url a modest length.
+MAX_TAXON_IDS_PER_QUERY = 200
+# Most terms of a list of taxa looked up at once.
+MAX_CONCURRENT_TAXON_QUERIES = 5
+# Most taxa per page of /v1/taxa results.
+TAXA_PER_PAGE = 200
+# Most /v1/taxa results the API lets us page through.
+MAX_TAXA_RESULTS = 10000
+# Most pages of taxa at a rank fetched up front instead of by ancestor ids.
+MAX_RANK_TAXA_PAGES = 5
+
+
+def format_failed_terms(failed):
+    """Format terms of a list of taxa that failed, with the reasons."""
+    return "Not found: " + ", ".join(
+        f"`{term}` ({reason})" for (term, reason) in failed
+    )
+
 
 class INatTaxonQuery:
     """Query iNat for one or more taxa."""
@@ -35,11 +55,195 @@ class INatTaxonQuery:
             return ancestor
         return None
 
-    async def maybe_match_taxon(self, query, ancestor_id=None, preferred_place_id=None):
-        """Get taxon and return a match, if any."""
-        kwargs = {}
-        if preferred_place_id:
-            kwargs["preferred_place_id"] = int(preferred_place_id)
+    async def get_taxa_at_rank(self, taxon_ids, rank):
+        """Get those of the taxa that are at the rank.
+
+        Parameters
+        ----------
+        taxon_ids: iterable of int
+            The ids of the taxa, e.g. all ancestors of some other taxa.
+        rank: str
+            The rank.
+
+        Returns
+        -------
+        dict
+            taxon_id -> Taxon for each of the taxa at the rank.
+        """
+        taxon_ids = list(taxon_ids)
+        taxon_store = self.cog.taxon_store
+        if taxon_store.available():
+            records = await taxon_store.run(
+                taxon_store.get_records_by_id, taxon_ids, rank
+            )
+        else:
+            batches = [
+                taxon_ids[i : i + MAX_TAXON_IDS_PER_QUERY]
+                for i in range(0, len(taxon_ids), MAX_TAXON_IDS_PER_QUERY)
+            ]
+            responses = await asyncio.gather(
+                *(
+                    self.cog.api.get_taxa(
+                        id=",".join(map(str, batch)), rank=rank, per_page=len(batch)
+                    )
+                    for batch in batches
+                )
+            )
+            records = [
+                record for response in responses for record in response["results"]
+            ]
+        return {taxon.taxon_id: taxon for taxon in map(get_taxon_fields, records)}
+
+    async def get_taxa_at_rank_up_front(self, rank, ancestors_count, taxon_id=None):
+        """Get all taxa at the rank in a taxon, if fewer queries than by ancestors.
+
+        Getting which of some taxa's ancestors are at the rank takes a query
+        per batch of ancestor ids. Only if that's more queries than the most
+        pages of taxa at the rank allowed are those fetched instead. They
+        aren't filtered by user or place, so can be many more than needed.
+
+        Parameters
+        ----------
+        rank: str
+            The rank.
+        ancestors_count: int
+            The (estimated) number of ancestor ids that would be looked up.
+        taxon_id: int or str, optional
+            The taxon the taxa are in; without one, all taxa at the rank
+            would be fetched, so they never are.
+
+        Returns
+        -------
+        dict
+            taxon_id -> Taxon for each of the taxa at the rank, or None if
+            they should be got by ancestor ids instead.
+        """
+        ancestor_queries = ceil(ancestors_count / MAX_TAXON_IDS_PER_QUERY)
+        if not taxon_id or ancestor_queries <= MAX_RANK_TAXA_PAGES:
+            return None
+        return await self.get_taxa_at_rank_in(rank, taxon_id, MAX_RANK_TAXA_PAGES)
+
+    async def get_taxa_at_rank_in(
+        self, rank, taxon_id=None, max_pages=MAX_TAXA_RESULTS // TAXA_PER_PAGE
+    ):
+        """Get all taxa at the rank in a taxon, if few enough to page through.
+
+        Parameters
+        ----------
+        rank: str
+            The rank.
+        taxon_id: int or str, optional
+            The taxon (or comma-separated taxa) the taxa are in, else all
+            taxa at the rank are got.
+        max_pages: int, optional
+            The most pages to get; by default, as many as the API allows.
+
+        Returns
+        -------
+        dict
+            taxon_id -> Taxon for each of the taxa at the rank, or None if
+            there are more than fit in `max_pages`.
+        """
+        kwargs = {"rank": rank, "per_page": TAXA_PER_PAGE, "order_by": "id"}
+        if taxon_id:
+            kwargs["taxon_id"] = taxon_id
+        response = await self.cog.api.get_taxa(page=1, **kwargs)
+        max_results = min(max_pages * TAXA_PER_PAGE, MAX_TAXA_RESULTS)
+        if not response or response["total_results"] > max_results:
+            return None
+        pages = ceil(response["total_results"] / TAXA_PER_PAGE)
+        responses = [response] + list(
+            await asyncio.gather(
+                *(
+                    self.cog.api.get_taxa(page=page, **kwargs)
+                    for page in range(2, pages + 1)
+                )
+            )
+        )
+        if not all(responses):
+            return None
+        records = [record for response in responses for record in response["results"]]
+        return {taxon.taxon_id: taxon for taxon in map(get_taxon_fields, records)}
+
+    async def maybe_match_taxon_locally(self, query, ancestor_id=None, **kwargs):
+        """Match taxon by name in the local taxonomy store, if unambiguous.
+
+        Only a single candidate named exactly as the query is accepted.
+        Otherwise, the API's ranking (e.g. by popularity) is needed to
+        choose between candidates, so None is returned. Live fields
+        (counts, photos, etc.) and those for the preferred place (common name,
+        establishment means) are then fetched by id from the API.
+        """
+        taxon_store = self.cog.taxon_store
+        if query.taxon_id or not taxon_store.available():
+            return None
+        records = await taxon_store.run(taxon_store.get_records, query, ancestor_id)
+        whole_query = " ".join(query.terms).lower()
+        exact = [
+            taxon
+            for taxon in map(get_taxon_fields, records)
+            if taxon.term.lower() == whole_query
+        ]
+        if len(exact) != 1:
+            return None
+        taxon = match_taxon(query, exact)
+        if not taxon:
+            return None
+
+        response = await self.cog.api.get_taxa(taxon.taxon_id, **kwargs)
+        records = response["results"] if response else None
+        if not records:
+            return None
+        return get_taxon_fields(dict(records[0], matched_term=taxon.term))
+
+    async def get_code_taxon_id(self, code):
+        """Get taxon_id for a 4-letter bird code from the local code table.
+
+        Codes imported without a taxon_id are resolved by scientific name,
+        then written back to the table so they are only resolved once. A
+        name that can't be resolved is recorded as taxon_id 0, so it isn't
+        looked up again.
+        """
+        entry = await self.cog.code_table.get_code(code)
+        if not entry:
+            return None
+        taxon_id = entry.get("taxon_id")
+        name = entry.get("name")
+        if taxon_id is None and name:
+            taxon_store = self.cog.taxon_store
+            taxon_id = await taxon_store.run(taxon_store.get_taxon_id, name)
+            if not taxon_id:
+                records = (await self.cog.api.get_taxa(q=name))["results"]
+                taxon_id = next(
+                    (record["id"] for record in records if record["name"] == name),
+                    None,
+                )
+            await self.cog.code_table.set_code(code, taxon_id or 0)
+        return taxon_id or None
+
+    async def maybe_match_taxon_by_code(self, query, ancestor_id=None, **kwargs):
+        """Match taxon for 4-letter bird code via the local code table, if known.
+
+        The code's taxon is fetched by id, saving the autocomplete query.
+        """
+        if not query.code:
+            return None
+        taxon_id = await self.get_code_taxon_id(query.code)
+        if not taxon_id:
+            return None
+        response = await self.cog.api.get_taxa(taxon_id, **kwargs)
+        records = response["results"] if response else None
+        if not records:
+            return None
+        taxon = get_taxon_fields(dict(records[0], matched_term=query.code))
+        if query.ranks and taxon.rank not in query.ranks:
+            return None
+        if ancestor_id and ancestor_id not in taxon.ancestor_ids:
+            return None
+        return taxon
+
+    async def query_taxon_candidates(self, query, ancestor_id=None, **kwargs):
+        """Get candidate taxa for the query from the API."""
         if query.taxon_id:
             records = (await self.cog.api.get_taxa(query.taxon_id, **kwargs))["results"]
         else:
@@ -49,17 +253,75 @@ class INatTaxonQuery:
             if ancestor_id:
                 kwargs["taxon_id"] = ancestor_id
             records = (await self.cog.api.get_taxa(**kwargs))["results"]
+        return list(map(get_taxon_fields, records))
 
-        if not records:
+    async def match_taxon_candidates(self, query, candidates):
+        """Match taxon for the query from the candidates, or raise LookupError."""
+        if not candidates:
             raise LookupError("No matching taxon found")
 
-        taxon = match_taxon(query, list(map(get_taxon_fields, records)))
+        taxon = match_taxon(query, candidates)
 
         if not taxon:
             raise LookupError("No exact match")
 
+        if query.code and taxon.term == query.code:
+            # Learn the code so next time it's resolved without autocomplete:
+            await self.cog.code_table.set_code(query.code, taxon.taxon_id, taxon.name)
+
         return taxon
 
+    async def maybe_match_taxon(self, query, ancestor_id=None, preferred_place_id=None):
+        """Get taxon and return a match, if any."""
+        kwargs = {}
+        if preferred_place_id:
+            kwargs["preferred_place_id"] = int(preferred_place_id)
+        taxon = await self.maybe_match_taxon_by_code(query, ancestor_id, **kwargs)
+        if taxon:
+            return taxon
+        taxon = await self.maybe_match_taxon_locally(query, ancestor_id, **kwargs)
+        if taxon:
+            return taxon
+        candidates = await self.query_taxon_candidates(query, ancestor_id, **kwargs)
+        return await self.match_taxon_candidates(query, candidates)
+
+    async def get_unfiltered_match(self, query, **kwargs):
+        """Match taxon locally, else get candidates for it from the API.
+
+        Returns
+        -------
+        tuple
+            (taxon, candidates) where taxon is the local match, if any, else
+            candidates are those the API returned for the query.
+        """
+        taxon = await self.maybe_match_taxon_by_code(query, **kwargs)
+        if not taxon:
+            taxon = await self.maybe_match_taxon_locally(query, **kwargs)
+        if taxon:
+            return (taxon, None)
+        return (None, await self.query_taxon_candidates(query, **kwargs))
+
+    async def maybe_match_taxon_in_candidates(self, query, ancestor, unfiltered):
+        """Match taxon from the unfiltered match in the ancestor, if any.
+
+        Returns None if none match, including if getting the match failed
+        (i.e. `unfiltered` is the exception raised).
+        """
+        if isinstance(unfiltered, BaseException):
+            return None
+        (taxon, candidates) = unfiltered
+        if taxon:
+            return taxon if ancestor.taxon_id in taxon.ancestor_ids else None
+        candidates = [
+            candidate
+            for candidate in candidates
+            if ancestor.taxon_id in candidate.ancestor_ids
+        ]
+        try:
+            return await self.match_taxon_candidates(query, candidates)
+        except LookupError:
+            return None
+
     async def maybe_match_taxon_compound(self, compound_query, preferred_place_id=None):
         """Get one or more taxa and return a match, if any.
 
@@ -69,9 +331,23 @@ class INatTaxonQuery:
         query_main = compound_query.main
         query_ancestor = compound_query.ancestor
         if query_ancestor:
-            ancestor = await self.maybe_match_taxon(
-                query_ancestor, preferred_place_id=preferred_place_id
+            # Optimistically look up the main taxon unfiltered at the same time
+            # as the ancestor. If it matches locally, or a candidate from the
+            # API is in the ancestor, that saves looking it up again filtered
+            # by the ancestor afterwards. The API is only queried if it isn't
+            # matched locally.
+            kwargs = {}
+            if preferred_place_id:
+                kwargs["preferred_place_id"] = int(preferred_place_id)
+            (ancestor, unfiltered) = await asyncio.gather(
+                self.maybe_match_taxon(
+                    query_ancestor, preferred_place_id=preferred_place_id
+                ),
+                self.get_unfiltered_match(query_main, **kwargs),
+                return_exceptions=True,
             )
+            if isinstance(ancestor, BaseException):
+                raise ancestor
             if ancestor:
                 if query_main.ranks:
                     max_query_rank_level = max(
@@ -87,11 +363,15 @@ class INatTaxonQuery:
                                 ancestor.rank,
                             )
                         )
-                taxon = await self.maybe_match_taxon(
-                    query_main,
-                    ancestor_id=ancestor.taxon_id,
-                    preferred_place_id=preferred_place_id,
+                taxon = await self.maybe_match_taxon_in_candidates(
+                    query_main, ancestor, unfiltered
                 )
+                if not taxon:
+                    taxon = await self.maybe_match_taxon(
+                        query_main,
+                        ancestor_id=ancestor.taxon_id,
+                        preferred_place_id=preferred_place_id,
+                    )
         else:
             taxon = await self.maybe_match_taxon(
                 query_main, preferred_place_id=preferred_place_id
@@ -99,59 +379,111 @@ class INatTaxonQuery:
 
         return taxon
 
+    async def query_user(self, ctx, user_query):
+        """Get iNat user for a member query, e.g. for `by` or `not by`."""
+        try:
+            who = await ContextMemberConverter.convert(
+                ctx, re.sub(DEQUOTE, r"\1", user_query)
+            )
+        except BadArgument as err:
+            raise LookupError(str(err))
+        return await self.cog.user_table.get_user(who.member)
+
     async def query_taxon(self, ctx, query: CompoundQuery):
-        """Query for taxon and return single taxon if found."""
-        taxon = None
-        place = None
-        user = None
-        unobserved_by = None
+        """Query for taxon and return single taxon if found.
+
+        The place, taxon, and users are independent lookups, so they are all
+        made at once. Only the taxon depends on the place, which is its
+        preferred place. If that isn't known without looking up the place,
+        the taxon is looked up for the home place, and again afterwards only
+        if the place could change the taxon returned.
+        """
+
+        async def nothing():
+            return None
+
         preferred_place_id = await self.cog.get_home(ctx)
         if query.place:
-            place = await self.cog.place_table.get_place(
+            place_id = await self.cog.place_table.get_place_id(
                 ctx.guild, query.place, ctx.author
             )
-        if place:
-            preferred_place_id = place.place_id
-        if query.main:
-            taxon = await self.maybe_match_taxon_compound(
+            if place_id:
+                preferred_place_id = place_id
+        lookups = [
+            self.cog.place_table.get_place(ctx.guild, query.place, ctx.author)
+            if query.place
+            else nothing(),
+            self.maybe_match_taxon_compound(
                 query, preferred_place_id=preferred_place_id
             )
-        if query.user:
-            try:
-                who = await ContextMemberConverter.convert(
-                    ctx, re.sub(DEQUOTE, r"\1", query.user)
-                )
-            except BadArgument as err:
-                raise LookupError(str(err))
-            user = await self.cog.user_table.get_user(who.member)
-        if query.unobserved_by:
-            try:
-                who = await ContextMemberConverter.convert(
-                    ctx, re.sub(DEQUOTE, r"\1", query.unobserved_by)
-                )
-            except BadArgument as err:
-                raise LookupError(str(err))
-            unobserved_by = await self.cog.user_table.get_user(who.member)
+            if query.main
+            else nothing(),
+            self.query_user(ctx, query.user) if query.user else nothing(),
+            self.query_user(ctx, query.unobserved_by)
+            if query.unobserved_by
+            else nothing(),
+        ]
+        results = await asyncio.gather(*lookups, return_exceptions=True)
+        # Report the first failure in the order the lookups used to be made:
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        (place, taxon, user, unobserved_by) = results
+
+        if (
+            place
+            and taxon
+            and place.place_id != int(preferred_place_id or 0)
+            and (taxon.common or taxon.term != taxon.name)
+        ):
+            # Common names (which may be matched, and are shown) vary by place:
+            taxon = await self.maybe_match_taxon_compound(
+                query, preferred_place_id=place.place_id
+            )
         return FilteredTaxon(taxon, user, place, unobserved_by)
 
     async def query_taxa(self, ctx, query):
-        """Query for one or more taxa and return list of matching taxa, if any."""
-        queries = query.split(",")
+        """Query for one or more taxa and return list of matching taxa, if any.
+
+        The comma-separated terms are looked up concurrently, at most
+        MAX_CONCURRENT_TAXON_QUERIES at a time.
+
+        Returns
+        -------
+        tuple
+            The distinct taxa matched, in the order of the terms, and a list
+            of (term, reason) for each term that failed; see
+            `format_failed_terms()`.
+        """
+        terms = [term.strip() for term in query.split(",") if term.strip()]
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_TAXON_QUERIES)
+
+        async def query_term(term):
+            async with semaphore:
+                query = await NaturalCompoundQueryConverter.convert(ctx, term)
+                filtered_taxon = await self.query_taxon(ctx, query)
+                if not filtered_taxon.taxon:
+                    raise LookupError("No taxon in query")
+                return filtered_taxon.taxon
+
+        results = await asyncio.gather(
+            *(query_term(term) for term in terms), return_exceptions=True
+        )
 
         # De-duplicate the query via dict:
         taxa = {}
-        for query_str in queries:
-            try:
-                query = await NaturalCompoundQueryConverter.convert(ctx, query_str)
-                filtered_taxon = await self.cog.taxon_query.query_taxon(ctx, query)
-                if filtered_taxon.taxon:
-                    taxon = filtered_taxon.taxon
-                    taxa[str(taxon.taxon_id)] = taxon
-            except (BadArgument, LookupError):
-                pass
-
-        result = taxa.values()
-        if not result:
+        failed = []
+        for (term, result) in zip(terms, results):
+            if isinstance(result, (BadArgument, LookupError)):
+                failed.append((term, str(result)))
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                taxa.setdefault(result.taxon_id, result)
+
+        if not taxa:
+            if failed:
+                raise LookupError(format_failed_terms(failed))
             raise LookupError("No taxon found")
 
-        return result
+        return (list(taxa.values()), failed)
@@ -0,0 +1,394 @@
+"""Module for the offline taxonomy store."""
+import asyncio
+import csv
+import io
+import os
+import re
+import sqlite3
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from .base_classes import RANK_LEVELS, SimpleQuery
+from .common import LOG
+
+# The published archive of the whole iNat taxonomy (Darwin Core Archive):
+# - https://www.inaturalist.org/pages/developers
+TAXONOMY_DWCA_URL = "https://www.inaturalist.org/taxa/inaturalist-taxonomy.dwca.zip"
+TAXONOMY_DB_FILENAME = "taxonomy.db"
+
+# Rows are inserted in batches of this size so the archive is never held in
+# memory all at once.
+IMPORT_BATCH_SIZE = 10000
+# Most candidates considered for a single name lookup.
+MAX_CANDIDATES = 50
+# Most ids looked up per query (SQLite allows 999 parameters by default).
+MAX_IDS_PER_QUERY = 500
+
+PAT_TAXON_ID_URL = re.compile(r"/taxa/(?P<taxon_id>\d+)$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS taxa (
+    id INTEGER PRIMARY KEY,
+    parent_id INTEGER,
+    name TEXT NOT NULL,
+    rank TEXT NOT NULL,
+    common TEXT,
+    ancestry TEXT
+);
+CREATE INDEX IF NOT EXISTS taxa_parent_id ON taxa (parent_id);
+CREATE INDEX IF NOT EXISTS taxa_name ON taxa (name);
+CREATE VIRTUAL TABLE IF NOT EXISTS names USING fts5(
+    name, taxon_id UNINDEXED, prefix='2 3 4'
+);
+"""
+
+
+def _taxon_id_from_url(url: str) -> Optional[int]:
+    """Taxon id from a DwC-A taxon URL, e.g. parentNameUsageID."""
+    mat = re.search(PAT_TAXON_ID_URL, url or "")
+    return int(mat["taxon_id"]) if mat else None
+
+
+def _read_csv(archive: zipfile.ZipFile, member: str) -> Iterator[dict]:
+    """Stream rows of a CSV file in the archive."""
+    with archive.open(member) as raw:
+        text = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+        yield from csv.DictReader(text)
+
+
+def _batched(rows, size=IMPORT_BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_taxonomy_dwca(archive_path, db_path):
+    """Import the iNat taxonomy Darwin Core Archive into a SQLite database.
+
+    Parameters
+    ----------
+    archive_path: str or Path
+        The path of the DwC-A zip file.
+    db_path: str or Path
+        The path of the database to create. An existing database at this
+        path is replaced.
+
+    Returns
+    -------
+    int
+        The number of taxa imported.
+
+    Notes
+    -----
+    This is blocking, so from the bot it should be run in an executor.
+    """
+    db_path = Path(db_path)
+    tmp_path = db_path.with_suffix(".tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+    conn = sqlite3.connect(str(tmp_path))
+    try:
+        conn.executescript(SCHEMA)
+        with zipfile.ZipFile(archive_path) as archive:
+            members = archive.namelist()
+            taxa_rows = (
+                (
+                    int(row["id"]),
+                    _taxon_id_from_url(row["parentNameUsageID"]),
+                    row["scientificName"],
+                    (row["taxonRank"] or "unranked").lower(),
+                )
+                for row in _read_csv(archive, "taxa.csv")
+            )
+            count = 0
+            for batch in _batched(taxa_rows):
+                conn.executemany(
+                    "INSERT OR REPLACE INTO taxa (id, parent_id, name, rank) "
+                    "VALUES (?, ?, ?, ?)",
+                    batch,
+                )
+                conn.executemany(
+                    "INSERT INTO names (name, taxon_id) VALUES (?, ?)",
+                    ((name, taxon_id) for (taxon_id, _parent, name, _rank) in batch),
+                )
+                count += len(batch)
+            conn.commit()
+
+            # Either a single file of all vernacular names, or one per lexicon:
+            if "VernacularNames.csv" in members:
+                vernacular_members = ["VernacularNames.csv"]
+            else:
+                vernacular_members = [
+                    member
+                    for member in members
+                    if re.match(r"VernacularNames.*\.csv$", member)
+                ]
+            for member in vernacular_members:
+                names_rows = (
+                    (row["vernacularName"], int(row["id"]), row.get("language"))
+                    for row in _read_csv(archive, member)
+                    if row.get("vernacularName")
+                )
+                for batch in _batched(names_rows):
+                    conn.executemany(
+                        "INSERT INTO names (name, taxon_id) VALUES (?, ?)",
+                        ((name, taxon_id) for (name, taxon_id, _lang) in batch),
+                    )
+                    # First English name is taken as the preferred common name:
+                    conn.executemany(
+                        "UPDATE taxa SET common = ? WHERE id = ? AND common IS NULL",
+                        (
+                            (name, taxon_id)
+                            for (name, taxon_id, lang) in batch
+                            if lang == "en"
+                        ),
+                    )
+                conn.commit()
+
+        _build_ancestry(conn)
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('taxa_count', ?)",
+            (str(count),),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(str(tmp_path), str(db_path))
+    return count
+
+
+def _build_ancestry(conn):
+    """Compute the ancestry of every taxon, one level of the tree at a time."""
+    # Roots are taxa whose parent is absent from the archive (i.e. Life).
+    conn.execute(
+        "UPDATE taxa SET ancestry = COALESCE(CAST(parent_id AS TEXT), '') "
+        "WHERE parent_id IS NULL OR parent_id NOT IN (SELECT id FROM taxa)"
+    )
+    while True:
+        cursor = conn.execute(
+            "UPDATE taxa SET ancestry = ("
+            "  SELECT CASE p.ancestry WHEN '' THEN CAST(p.id AS TEXT)"
+            "  ELSE p.ancestry || '/' || p.id END"
+            "  FROM taxa p WHERE p.id = taxa.parent_id"
+            ") WHERE ancestry IS NULL AND parent_id IN ("
+            "  SELECT id FROM taxa WHERE ancestry IS NOT NULL"
+            ")"
+        )
+        conn.commit()
+        if cursor.rowcount <= 0:
+            break
+
+
+def _fts_query(terms: List[str]):
+    """Make an FTS5 prefix query matching all terms."""
+    return " AND ".join('"%s"*' % term.replace('"', '""') for term in terms)
+
+
+class INatTaxonStore:
+    """Local store of the iNat taxonomy for name lookups without the API."""
+
+    def __init__(self, cog, path: Optional[Path] = None):
+        self.cog = cog
+        self._path = path
+        self._conn = None
+        self._executor = None
+        self._closing = None
+
+    @property
+    def path(self) -> Path:
+        """Path of the taxonomy database."""
+        if not self._path:
+            # pylint: disable=import-outside-toplevel
+            from redbot.core.data_manager import cog_data_path
+
+            self._path = cog_data_path(self.cog) / TAXONOMY_DB_FILENAME
+        return self._path
+
+    def connection(self):
+        """Open connection to the database, or None if not imported yet."""
+        if self._conn is None:
+            if not self.path.exists():
+                return None
+            # Lookups are run on the executor thread; see run().
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        return self._conn
+
+    def _close_connection(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def close(self):
+        """Close the connection, e.g. so a fresh import is picked up.
+
+        If lookups have been run, it is closed on their thread after those
+        still in progress.
+        """
+        if self._executor is None:
+            self._close_connection()
+            return
+        self._closing = self._executor.submit(self._close_connection)
+        self._executor.shutdown(wait=False)
+        self._executor = None
+
+    async def run(self, lookup, *args):
+        """Run a blocking lookup (e.g. `get_records`) off the event loop.
+
+        Lookups are run one at a time on a single thread, so the connection
+        is never used by two threads at once.
+        """
+        if self._executor is None:
+            closing = self._closing
+            if closing is not None:
+                # The previous thread is done with the connection once closed:
+                await asyncio.wrap_future(closing)
+                if self._closing is closing:
+                    self._closing = None
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="taxon_store"
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lookup, *args)
+
+    def available(self) -> bool:
+        """Store has been imported.
+
+        Only the file is checked, so this can be called on the event loop;
+        the connection is opened by the first lookup.
+        """
+        return self.path.exists()
+
+    def taxa_count(self) -> int:
+        """Number of taxa in the store."""
+        conn = self.connection()
+        if not conn:
+            return 0
+        row = conn.execute("SELECT value FROM meta WHERE key = 'taxa_count'").fetchone()
+        return int(row[0]) if row else 0
+
+    def get_taxon_id(self, name: str) -> Optional[int]:
+        """Get id of the taxon with exactly this scientific name, if unique."""
+        conn = self.connection()
+        if not conn:
+            return None
+        rows = conn.execute("SELECT id FROM taxa WHERE name = ?", (name,)).fetchall()
+        return rows[0][0] if len(rows) == 1 else None
+
+    def get_taxon_ids(self, names: List[str]) -> Dict[str, int]:
+        """Get ids of the taxa with exactly these scientific names, if unique."""
+        taxon_ids = {}
+        for name in names:
+            taxon_id = self.get_taxon_id(name)
+            if taxon_id:
+                taxon_ids[name] = taxon_id
+        return taxon_ids
+
+    def _record(self, row, matched_term):
+        """Make a taxon record shaped like a /v1/taxa/autocomplete result."""
+        (taxon_id, name, rank, common, ancestry) = row
+        ancestor_ids = [int(id) for id in ancestry.split("/") if id] if ancestry else []
+        return {
+            "id": taxon_id,
+            "name": name,
+            "rank": rank if rank in RANK_LEVELS else "unranked",
+            "preferred_common_name": common,
+            "matched_term": matched_term,
+            "ancestor_ids": ancestor_ids + [taxon_id],
+            "observations_count": 0,
+            "is_active": True,
+        }
+
+    def get_records_by_id(self, taxon_ids: List[int], rank: str = None):
+        """Get taxon records by id.
+
+        Parameters
+        ----------
+        taxon_ids: list of int
+            The ids of the taxa.
+        rank: str, optional
+            Only return records of taxa at this rank.
+
+        Returns
+        -------
+        list
+            Records shaped like /v1/taxa results, suitable for
+            get_taxon_fields.
+        """
+        conn = self.connection()
+        if not conn:
+            return []
+        taxon_ids = list(taxon_ids)
+        records = []
+        for i in range(0, len(taxon_ids), MAX_IDS_PER_QUERY):
+            batch = taxon_ids[i : i + MAX_IDS_PER_QUERY]
+            sql = (
+                "SELECT id, name, rank, common, ancestry FROM taxa "
+                "WHERE id IN (%s)" % ",".join("?" * len(batch))
+            )
+            params = batch
+            if rank:
+                sql += " AND rank = ?"
+                params = batch + [rank]
+            records += [
+                self._record(row, row[1]) for row in conn.execute(sql, params)
+            ]
+        return records
+
+    def get_records(self, query: SimpleQuery, ancestor_id: int = None):
+        """Get taxon records matching the query terms.
+
+        Parameters
+        ----------
+        query: SimpleQuery
+            The query; its terms are matched as prefixes of words in the
+            scientific and common names.
+        ancestor_id: int, optional
+            Only return records descended from this taxon.
+
+        Returns
+        -------
+        list
+            Records shaped like /v1/taxa/autocomplete results, suitable
+            for get_taxon_fields.
+        """
+        conn = self.connection()
+        if not conn or not query.terms:
+            return []
+        sql = (
+            "SELECT t.id, t.name, t.rank, t.common, t.ancestry, names.name "
+            "FROM names JOIN taxa t ON t.id = names.taxon_id "
+            "WHERE names MATCH ?"
+        )
+        params = [_fts_query(query.terms)]
+        if query.ranks:
+            sql += " AND t.rank IN (%s)" % ",".join("?" * len(query.ranks))
+            params += query.ranks
+        sql += " ORDER BY names.rank LIMIT ?"
+        params.append(MAX_CANDIDATES)
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        except sqlite3.Error as err:
+            LOG.error("Taxonomy store lookup failed: %s", err)
+            return []
+        whole_query = " ".join(query.terms).lower()
+        records = {}
+        for (*row, matched_term) in rows:
+            taxon_id = row[0]
+            if taxon_id in records:
+                # Prefer reporting the name that matches the whole query:
+                if matched_term.lower() == whole_query:
+                    records[taxon_id]["matched_term"] = matched_term
+                continue
+            record = self._record(row, matched_term)
+            if ancestor_id and ancestor_id not in record["ancestor_ids"]:
+                continue
+            records[taxon_id] = record
+        return list(records.values())
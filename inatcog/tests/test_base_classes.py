@@ -0,0 +1,74 @@
+"""Test inatcog.base_classes."""
+import unittest
+
+from inatcog.base_classes import (
+    ConservationStatus,
+    EstablishmentMeans,
+    EstablishmentMeansPartial,
+    Place,
+    TaxonSummary,
+    User,
+)
+
+PLACE = {"id": 6712, "name": "Canada", "display_name": "Canada"}
+MEANS = {
+    "id": 4185,
+    "taxon_id": 9100,
+    "establishment_means": "native",
+    "place": PLACE,
+    "list": {"id": 7161, "title": "Canada Check List"},
+}
+MEANS_PARTIAL = {
+    "id": 4185,
+    "establishment_means": "native",
+    "place": {"id": 6712, "display_name": "Canada", "admin_level": 0},
+}
+STATUS = {
+    "authority": "IUCN Red List",
+    "status": "LC",
+    "status_name": "least concern",
+    "place": None,
+}
+SUMMARY = {
+    "conservation_status": STATUS,
+    "listed_taxon": {
+        "id": 4185,
+        "establishment_means": "native",
+        "list_id": 7161,
+        "taxon_id": 9100,
+        "place": {"id": 6712, "display_name": "Canada"},
+    },
+    "wikipedia_summary": "",
+}
+USER = {
+    "id": 545640,
+    "login": "benarmstrong",
+    "name": "Ben Armstrong",
+    "observations_count": 1000,
+    "identifications_count": 2000,
+    "icon_url": None,
+}
+
+
+class TestFromRecord(unittest.TestCase):
+    def test_equivalent_to_from_dict(self):
+        """Test from_record makes the same objects as from_dict."""
+        for (cls, record) in (
+            (EstablishmentMeans, MEANS),
+            (EstablishmentMeansPartial, MEANS_PARTIAL),
+            (ConservationStatus, STATUS),
+            (ConservationStatus, {"authority": "NatureServe", "status": "G5"}),
+            (TaxonSummary, SUMMARY),
+            (TaxonSummary, {}),
+            (User, USER),
+            (Place, PLACE),
+        ):
+            with self.subTest(cls=cls.__name__, record=record):
+                self.assertEqual(cls.from_record(record), cls.from_dict(record))
+
+    def test_missing_field(self):
+        """Test from_record raises KeyError for a missing required field."""
+        record = dict(MEANS)
+        del record["list"]
+        with self.assertRaises(KeyError):
+            EstablishmentMeans.from_record(record)
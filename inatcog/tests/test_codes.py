@@ -0,0 +1,27 @@
+"""Test inatcog.codes."""
+import unittest
+
+from inatcog.codes import parse_code_list
+
+CODE_LIST = """SP,B4,SPEC,CONF,COMMONNAME,SCINAME
++,,WTSP,,White-throated Sparrow,Zonotrichia albicollis
++,,wcsp,,White-crowned Sparrow,Zonotrichia leucophrys
+,,,,Unidentified sparrow,
+"""
+
+
+class TestCodes(unittest.TestCase):
+    def test_parse_code_list(self):
+        """Test parse_code_list."""
+        self.assertListEqual(
+            list(parse_code_list(CODE_LIST)),
+            [
+                ("WTSP", "Zonotrichia albicollis"),
+                ("WCSP", "Zonotrichia leucophrys"),
+            ],
+        )
+
+    def test_parse_code_list_missing_columns(self):
+        """Test parse_code_list without the required columns."""
+        with self.assertRaises(ValueError):
+            list(parse_code_list("CODE,NAME\nWTSP,Zonotrichia albicollis\n"))
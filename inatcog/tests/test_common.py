@@ -0,0 +1,90 @@
+"""Test inatcog.common."""
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from inatcog.common import AbbrevIndex, ExpiringCache, LockRegistry
+
+
+class TestAbbrevIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = AbbrevIndex({"ns": 6865, "nb": 6864, "nl": 6866, "nfld": 6866})
+
+    def test_match(self):
+        """Test abbreviation is matched exactly or by unique prefix."""
+        self.assertEqual(self.index.match("NS"), 6865)
+        self.assertEqual(self.index.match("nf"), 6866)
+        self.assertIsNone(self.index.match("n"))
+        self.assertIsNone(self.index.match("pei"))
+
+    def test_set_and_remove(self):
+        """Test index is updated by adding and removing abbreviations."""
+        self.index.set("PEI", 6863)
+        self.assertEqual(self.index.match("pe"), 6863)
+        self.index.remove("nl")
+        self.assertIsNone(self.index.match("nl"))
+        self.assertNotIn("nl", self.index.abbrevs)
+
+
+class TestExpiringCache(unittest.TestCase):
+    def test_get(self):
+        """Test least recently used and expired values are forgotten."""
+        cache = ExpiringCache(max_items=2, ttl=10)
+        with patch("inatcog.common.monotonic", return_value=0):
+            cache.set(1, "one")
+            cache.set(2, "two")
+            self.assertEqual(cache.get(1), "one")
+            cache.set(3, "three")
+            self.assertIsNone(cache.get(2))
+            self.assertEqual(len(cache), 2)
+        with patch("inatcog.common.monotonic", return_value=11):
+            self.assertIsNone(cache.get(1))
+            self.assertEqual(len(cache), 1)
+            cache.set(4, "four")
+            self.assertEqual(len(cache), 1)
+            self.assertEqual(cache.get(4), "four")
+
+
+class TestLockRegistry(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.locks = LockRegistry(max_locks=2)
+
+    async def test_get(self):
+        """Test the same lock is got for a key, and contention is counted."""
+        lock = self.locks.get(1)
+        self.assertIs(self.locks.get(1), lock)
+        async with lock:
+            self.locks.get(1)
+        self.assertEqual(
+            self.locks.stats(),
+            {"locks": 1, "held": 0, "created": 1, "contended": 1, "evicted": 0},
+        )
+
+    async def test_evict(self):
+        """Test the least recently used idle locks are evicted."""
+        async with self.locks.get(1):
+            self.locks.get(2)
+            self.locks.get(3)
+            self.assertIn(1, self.locks)
+            self.assertNotIn(2, self.locks)
+            self.locks.get(4)
+            self.assertEqual(len(self.locks), 2)
+            self.assertEqual(self.locks.held(), 1)
+        self.assertEqual(self.locks.evicted, 2)
+
+    async def test_evict_waited_for(self):
+        """Test a lock released to a waiter that isn't awake yet isn't evicted."""
+        lock = self.locks.get(1)
+        await lock.acquire()
+        waiter = asyncio.create_task(lock.acquire())
+        await asyncio.sleep(0)
+        lock.release()
+        self.assertFalse(lock.locked())
+        self.locks.get(2)
+        self.locks.get(3)
+        self.assertIn(1, self.locks)
+        self.assertIn(3, self.locks)
+        self.assertNotIn(2, self.locks)
+        await waiter
+        self.assertIs(self.locks.get(1), lock)
+        lock.release()
@@ -0,0 +1,73 @@
+"""Test inatcog.controlled_terms."""
+import unittest
+from types import SimpleNamespace
+
+from inatcog.controlled_terms import (
+    ControlledTerm,
+    ControlledTermIndex,
+    match_controlled_term,
+)
+
+CONTROLLED_TERMS = [
+    ControlledTerm.from_dict(term, infer_missing=True)
+    for term in [
+        {
+            "id": 1,
+            "label": "Life Stage",
+            "values": [
+                {"id": 2, "label": "Adult"},
+                {"id": 5, "label": "Teneral", "taxon_ids": [47158]},
+                {"id": 6, "label": "Pupa", "taxon_ids": [47158]},
+                {"id": 7, "label": "Nymph", "taxon_ids": [47158]},
+                {"id": 8, "label": "Larva", "taxon_ids": [47158, 20978]},
+                {"id": 4, "label": "Juvenile"},
+            ],
+        },
+        {
+            "id": 12,
+            "label": "Plant Phenology",
+            "values": [
+                {
+                    "id": 15,
+                    "label": "Flower Budding",
+                    "taxon_ids": [47126],
+                    "excepted_taxon_ids": [47163],
+                },
+                {"id": 13, "label": "Flowering", "taxon_ids": [47126]},
+                {"id": 14, "label": "Fruiting", "taxon_ids": [47126]},
+            ],
+        },
+    ]
+]
+PLANT = SimpleNamespace(ancestor_ids=[48460, 47126, 211194])
+GRASS = SimpleNamespace(ancestor_ids=[48460, 47126, 47163])
+
+
+class TestControlledTerms(unittest.TestCase):
+    def setUp(self):
+        self.index = ControlledTermIndex(CONTROLLED_TERMS)
+
+    def test_match(self):
+        """Test term and value are matched by prefix, ignoring case."""
+        (term, value) = self.index.match("PLANT PHENOLOGY", "flowering")
+        self.assertEqual((term.id, value.id), (12, 13))
+        (term, value) = self.index.match("life", "ju")
+        self.assertEqual((term.id, value.id), (1, 4))
+        self.assertEqual(
+            match_controlled_term(CONTROLLED_TERMS, "life", "ju"), (term, value)
+        )
+
+    def test_match_failed(self):
+        """Test unmatched term or value is reported."""
+        with self.assertRaisesRegex(LookupError, "No controlled term"):
+            self.index.match("sex", "female")
+        with self.assertRaisesRegex(LookupError, "No value.*`Life Stage`"):
+            self.index.match("life", "egg")
+
+    def test_match_for_taxon(self):
+        """Test a value applying to the taxon is preferred."""
+        self.assertEqual(self.index.match("plant", "flower")[1].id, 15)
+        self.assertEqual(self.index.match("plant", "flower", PLANT)[1].id, 15)
+        self.assertEqual(self.index.match("plant", "flower", GRASS)[1].id, 13)
+        self.assertEqual(self.index.match("life", "l", GRASS)[1].id, 8)
+        self.assertTrue(self.index.applies_to(self.index.match("life", "a")[1], GRASS))
@@ -0,0 +1,92 @@
+"""Test inatcog.converters."""
+import re
+from unittest import IsolatedAsyncioTestCase
+
+from redbot.core.commands import BadArgument
+
+from inatcog.base_classes import SimpleQuery
+from inatcog.converters import (
+    CompoundQueryConverter,
+    NaturalCompoundQueryConverter,
+    parse_compound_query,
+)
+
+
+def simple_query(terms, phrases=None, ranks=None, code=None, taxon_id=None):
+    return SimpleQuery(
+        taxon_id=taxon_id,
+        terms=terms,
+        phrases=phrases or [],
+        ranks=ranks or [],
+        code=code,
+    )
+
+
+class TestConverters(IsolatedAsyncioTestCase):
+    async def convert(self, argument):
+        return await NaturalCompoundQueryConverter.convert(None, argument)
+
+    async def test_natural_query(self):
+        """Test natural language query with all of the filters."""
+        query = await self.convert(
+            'sp "red fox" in animals by me not by ben from canada with life stage'
+            " adult per genus"
+        )
+        self.assertIsInstance(query, NaturalCompoundQueryConverter)
+        self.assertEqual(
+            query.main,
+            simple_query(["red fox"], phrases=[["red", "fox"]], ranks=["species"]),
+        )
+        self.assertEqual(query.ancestor, simple_query(["animals"]))
+        self.assertEqual(query.user, "me")
+        self.assertEqual(query.unobserved_by, "ben")
+        self.assertEqual(query.place, "canada")
+        self.assertEqual(query.controlled_term, ["life", "stage adult"])
+        self.assertEqual(query.per, "genus")
+
+    async def test_code_and_id(self):
+        """Test 4-letter code and taxon id are detected."""
+        self.assertEqual((await self.convert("wtsp")).main.code, "WTSP")
+        self.assertEqual((await self.convert("12345")).main.taxon_id, "12345")
+
+    async def test_ranks(self):
+        """Test ranks are filters, except right after `per`."""
+        query = await self.convert("fish ssp genus per family")
+        self.assertEqual(query.main.ranks, ["subspecies", "genus"])
+        self.assertEqual(query.per, "family")
+
+    async def test_obs_link(self):
+        """Test observation link is returned unparsed."""
+        link = "https://www.inaturalist.org/observations/1"
+        self.assertEqual(await self.convert(link), link)
+
+    async def test_flag_query(self):
+        """Test query with `--` options only."""
+        query = await CompoundQueryConverter.convert(None, "--of fish --by me")
+        self.assertEqual(query.main, simple_query(["fish"], code="FISH"))
+        self.assertEqual(query.user, "me")
+        self.assertEqual(await CompoundQueryConverter.convert(None, ""), "")
+
+    async def test_errors(self):
+        """Test errors are reported as before."""
+        for (argument, message) in (
+            ("", "Query not understood"),
+            ("fish by", "Query not understood"),
+            ("by by me", "Query not understood"),
+            ("fish --bogus", "Query not understood"),
+            ('"red fox', "No closing quotation"),
+            ('fox"', "No closing quotation"),
+            ("12345 sp", "Taxon IDs are unique. Retry without any ranks"),
+            ("12345 in animals", "Taxon IDs are unique. Retry without `in"),
+            ("in animals", "Missing `<taxon1>`"),
+        ):
+            with self.subTest(argument=argument):
+                with self.assertRaisesRegex(BadArgument, "^" + re.escape(message)):
+                    await self.convert(argument)
+
+    async def test_results_are_copies(self):
+        """Test modifying a result doesn't affect the memoized parse."""
+        query = await self.convert("fish")
+        query.main.ranks.append("species")
+        self.assertEqual((await self.convert("fish")).main.ranks, [])
+        self.assertGreater(parse_compound_query.cache_info().hits, 0)
@@ -0,0 +1,129 @@
+"""Test inatcog.counts."""
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, MagicMock, call
+
+from inatcog.counts import (
+    TaxonCounts,
+    get_observers_counts,
+    get_rank_counts,
+    get_taxon_counts,
+)
+
+
+class TestCounts(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.cog = MagicMock()
+        self.cog.api.get_observations = AsyncMock(
+            side_effect=lambda *args, **kwargs: {
+                "total_results": 5 if args else 20
+            }
+        )
+
+    async def test_get_taxon_counts(self):
+        """Test get_taxon_counts."""
+        counts = await get_taxon_counts(self.cog, taxon_id=3, user_id=545640)
+        self.assertEqual(counts, TaxonCounts(20, 5))
+        self.cog.api.get_observations.assert_has_calls(
+            [
+                call(per_page=0, taxon_id=3, user_id=545640),
+                call("species_counts", per_page=0, taxon_id=3, user_id=545640),
+            ],
+            any_order=True,
+        )
+
+    async def test_get_taxon_counts_no_species(self):
+        """Test get_taxon_counts without counting species."""
+        counts = await get_taxon_counts(self.cog, species=False, taxon_id=3)
+        self.assertEqual(counts, TaxonCounts(20, 0))
+        self.cog.api.get_observations.assert_awaited_once_with(per_page=0, taxon_id=3)
+
+    async def test_get_taxon_counts_failed(self):
+        """Test get_taxon_counts when a query fails."""
+        self.cog.api.get_observations = AsyncMock(return_value=None)
+        self.assertIsNone(await get_taxon_counts(self.cog, taxon_id=3))
+
+    async def test_get_observers_counts(self):
+        """Test get_observers_counts."""
+        self.cog.api.get_observations = AsyncMock(
+            return_value={
+                "results": [
+                    {
+                        "user_id": 545640,
+                        "observation_count": 20,
+                        "species_count": 5,
+                        "user": {"id": 545640, "login": "benarmstrong"},
+                    }
+                ]
+            }
+        )
+        counts = await get_observers_counts(
+            self.cog, ["benarmstrong", "nobody"], taxon_id=3
+        )
+        self.assertDictEqual(counts, {"benarmstrong": TaxonCounts(20, 5)})
+        self.cog.api.get_observations.assert_called_once_with(
+            "observers", user_id="benarmstrong,nobody", per_page=2, taxon_id=3
+        )
+
+    async def test_get_rank_counts(self):
+        """Test get_rank_counts."""
+
+        def species_count(taxon_id, ancestor_ids, count):
+            return {
+                "count": count,
+                "taxon": {"id": taxon_id, "ancestor_ids": ancestor_ids + [taxon_id]},
+            }
+
+        self.cog.api.get_observations = AsyncMock(
+            return_value={
+                "total_results": 3,
+                "results": [
+                    species_count(9100, [48460, 1, 3, 7251, 9079], 5),
+                    species_count(9101, [48460, 1, 3, 7251, 9079], 2),
+                    species_count(7251, [48460, 1, 3], 1),
+                ],
+            }
+        )
+        family = MagicMock(taxon_id=7251)
+        self.cog.taxon_query.get_taxa_at_rank = AsyncMock(return_value={7251: family})
+        rank_counts = await get_rank_counts(self.cog, "family", taxon_id=3)
+        self.assertDictEqual(rank_counts.taxa, {7251: family})
+        self.assertDictEqual(rank_counts.counts, {7251: TaxonCounts(8, 3)})
+        self.assertEqual(rank_counts.ungrouped, TaxonCounts(0, 0))
+        self.assertTrue(rank_counts.complete)
+        self.cog.taxon_query.get_taxa_at_rank.assert_called_once_with(
+            {48460, 1, 3, 7251, 9079, 9100, 9101}, "family"
+        )
+
+    async def test_get_rank_counts_without_store(self):
+        """Test taxa at the rank may be fetched once without the taxonomy store."""
+        self.cog.taxon_store.available = MagicMock(return_value=False)
+        self.cog.api.get_observations = AsyncMock(
+            return_value={
+                "total_results": 1,
+                "results": [
+                    {"count": 5, "taxon": {"id": 9100, "ancestor_ids": [3, 7251, 9100]}}
+                ],
+            }
+        )
+        family = MagicMock(taxon_id=7251)
+        self.cog.taxon_query.get_taxa_at_rank_up_front = AsyncMock(
+            return_value={7251: family, 7252: MagicMock(taxon_id=7252)}
+        )
+        self.cog.taxon_query.get_taxa_at_rank = AsyncMock()
+        rank_counts = await get_rank_counts(self.cog, "family", taxon_id=3)
+        self.assertDictEqual(rank_counts.taxa, {7251: family})
+        self.assertDictEqual(rank_counts.counts, {7251: TaxonCounts(5, 1)})
+        self.cog.taxon_query.get_taxa_at_rank_up_front.assert_awaited_once_with(
+            "family", 3, 3
+        )
+        self.cog.taxon_query.get_taxa_at_rank.assert_not_awaited()
+
+        # If there are too many, or too few ancestors to be worth it, they're
+        # looked up by ancestor ids instead:
+        self.cog.taxon_query.get_taxa_at_rank_up_front.return_value = None
+        self.cog.taxon_query.get_taxa_at_rank.return_value = {7251: family}
+        rank_counts = await get_rank_counts(self.cog, "family", taxon_id=3)
+        self.assertDictEqual(rank_counts.counts, {7251: TaxonCounts(5, 1)})
+        self.cog.taxon_query.get_taxa_at_rank.assert_awaited_once_with(
+            {3, 7251, 9100}, "family"
+        )
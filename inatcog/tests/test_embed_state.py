@@ -0,0 +1,359 @@
+"""Test inatcog.embed_state."""
+import asyncio
+from dataclasses import replace
+from datetime import datetime
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import AsyncMock, MagicMock, call, patch
+
+from inatcog.base_classes import User
+from inatcog.common import ExpiringCache, LockRegistry
+from inatcog.embed_state import (
+    EMBED_STATE_GROUP,
+    CountsRow,
+    EmbedState,
+    INatEmbedStateStore,
+    apply_row_changes,
+    format_counts_description,
+    strip_counts_table,
+)
+from inatcog.embeds import NoRoomInDisplay
+from inatcog.inat_embeds import (
+    EDIT_WINDOW_SECONDS,
+    USER_SPECIES_FOOTER,
+    INatEmbed,
+    INatEmbeds,
+)
+from inatcog.message_cache import INatMessageCache
+from inatcog.taxa import TAXON_COUNTS_HEADER, get_taxon_fields
+from inatcog.tests.test_taxon_query import taxon_record
+
+TAXON = get_taxon_fields(taxon_record(3, "Aves", "class", [48460, 1, 2, 355675]))
+BASE = "is a class with [1](https://www.inaturalist.org/observations) observation."
+USERS_STATE = EmbedState(
+    taxon_id=3,
+    kind="users",
+    rows=[CountsRow(545640, "benarmstrong", 20, 5), CountsRow(2, "someone", 4, 3)],
+    total_observations=24,
+    total_species=7,
+)
+PLACES_STATE = EmbedState(
+    taxon_id=3, kind="places", rows=[CountsRow(97394, "North America", 100, 50)]
+)
+
+
+def mock_custom_config(cog, states):
+    """Mock the config groups of embed states, returning them by message id."""
+    groups = {}
+
+    def custom(_group_name, *identifiers):
+        if identifiers not in groups:
+            group = groups[identifiers] = MagicMock()
+            group.all = AsyncMock(
+                return_value={
+                    message_id: {"state": state.to_dict()}
+                    for (message_id, state) in states.items()
+                }
+            )
+            group.state.set = AsyncMock()
+            group.clear = AsyncMock()
+        return groups[identifiers]
+
+    cog.config.custom = MagicMock(side_effect=custom)
+    return groups
+
+
+def observer(user_id, login, observations, species):
+    return {
+        "user_id": user_id,
+        "observation_count": observations,
+        "species_count": species,
+        "user": {"id": user_id, "login": login},
+    }
+
+
+class TestEmbedState(TestCase):
+    def test_format_counts_description(self):
+        """Test format_counts_description."""
+        description = format_counts_description(BASE, USERS_STATE, TAXON)
+        lines = description.split("\n")
+        self.assertEqual(lines[:2], [BASE, TAXON_COUNTS_HEADER])
+        self.assertEqual(len(lines), 5)
+        self.assertTrue(lines[2].startswith("[20 (5)]("))
+        self.assertTrue(lines[2].endswith("&user_id=545640) benarmstrong "))
+        self.assertTrue(lines[4].startswith("[24 (7)]("))
+        self.assertTrue(lines[4].endswith("&user_id=benarmstrong,someone) *total* "))
+
+    def test_format_counts_description_replaces_table(self):
+        """Test the table is replaced, or removed if there are no rows."""
+        description = format_counts_description(BASE, USERS_STATE, TAXON)
+        self.assertEqual(strip_counts_table(description), BASE)
+        self.assertEqual(
+            format_counts_description(description, PLACES_STATE, TAXON),
+            format_counts_description(BASE, PLACES_STATE, TAXON),
+        )
+        self.assertEqual(
+            format_counts_description(description, EmbedState(taxon_id=3), TAXON),
+            BASE,
+        )
+
+    def test_embed_state_parsed(self):
+        """Test the state of an embed is parsed back from its content."""
+        for state in (USERS_STATE, PLACES_STATE, EmbedState(taxon_id=3)):
+            with self.subTest(kind=state.kind):
+                embed = INatEmbed(
+                    url="https://www.inaturalist.org/taxa/3",
+                    description=format_counts_description(BASE, state, TAXON),
+                )
+                self.assertEqual(embed.embed_state(), state)
+
+    def test_apply_row_changes(self):
+        """Test applying changes in the order made."""
+        (rows, added) = apply_row_changes(
+            USERS_STATE.rows,
+            [
+                (2, "someone", "toggle"),
+                (3, "another", "add"),
+                (545640, "benarmstrong", "add"),
+                (4, "yetanother", "toggle"),
+                (3, "another", "remove"),
+            ],
+        )
+        self.assertEqual(
+            rows,
+            [
+                CountsRow(545640, "benarmstrong", 20, 5),
+                CountsRow(4, "yetanother", 0, 0),
+            ],
+        )
+        self.assertEqual(added, [CountsRow(4, "yetanother", 0, 0)])
+
+    def test_to_dict(self):
+        """Test a state is the same after converting to & from a dict."""
+        self.assertEqual(EmbedState.from_dict(USERS_STATE.to_dict()), USERS_STATE)
+
+
+class TestEmbedStateStore(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.cog = MagicMock()
+        self.groups = mock_custom_config(self.cog, {"1": PLACES_STATE})
+        self.store = INatEmbedStateStore(self.cog)
+
+    async def test_get(self):
+        """Test states are loaded from config."""
+        self.assertEqual(await self.store.get(1), PLACES_STATE)
+        self.assertIsNone(await self.store.get(2))
+        self.groups[()].all.assert_awaited_once()
+
+    @patch("inatcog.embed_state.MAX_EMBED_STATES", 2)
+    async def test_set(self):
+        """Test the least recently used states are forgotten."""
+        await self.store.set(2, USERS_STATE)
+        await self.store.get(1)
+        await self.store.set(3, USERS_STATE)
+        self.assertIsNone(await self.store.get(2))
+        self.groups[("3",)].state.set.assert_awaited_once_with(USERS_STATE.to_dict())
+        self.groups[("2",)].clear.assert_awaited_once()
+        self.assertNotIn(("1",), self.groups)
+
+    async def test_get_at_once(self):
+        """Test states are loaded once, and set while loading isn't lost."""
+        stored = self.cog.config.custom(EMBED_STATE_GROUP).all.return_value
+
+        async def all_states():
+            await asyncio.sleep(0)
+            return stored
+
+        self.groups[()].all.side_effect = all_states
+        await asyncio.gather(self.store.get(1), self.store.set(2, USERS_STATE))
+        self.assertEqual(await self.store.get(2), USERS_STATE)
+        self.groups[()].all.assert_awaited_once()
+
+    async def test_remove(self):
+        """Test removing a state."""
+        await self.store.remove(1)
+        self.assertIsNone(await self.store.get(1))
+        self.groups[("1",)].clear.assert_awaited_once()
+
+
+class TestUpdateTotals(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.embeds = INatEmbeds()
+        self.embeds.api = MagicMock()
+        self.embeds.bot = MagicMock()
+        self.embeds.bot._connection._get_message.return_value = None
+        self.embeds.embed_states = INatEmbedStateStore(self.embeds)
+        self.embeds.config = MagicMock()
+        mock_custom_config(self.embeds, {})
+        self.embeds.message_cache = INatMessageCache()
+        self.embeds.pending_edits = {}
+        self.embeds.recent_edits = ExpiringCache(10, EDIT_WINDOW_SECONDS)
+        self.embeds.reaction_locks = LockRegistry()
+        self.user = User(2, "Someone", "someone", 4, 0)
+
+    def mock_observers(self):
+        self.embeds.api.get_observations = AsyncMock(
+            side_effect=lambda *args, **kwargs: {
+                "results": [
+                    observer(545640, "benarmstrong", 21, 5),
+                    observer(2, "someone", 4, 3),
+                ]
+            }
+            if args[0] == "observers"
+            else {"total_results": 7}
+        )
+
+    async def test_add_user(self):
+        """Test adding a user fetches only their counts & the species total."""
+        self.mock_observers()
+        state = EmbedState(
+            taxon_id=3, kind="users", rows=[CountsRow(545640, "benarmstrong", 20, 5)]
+        )
+        state = await self.embeds.update_totals(state, TAXON, [(2, "someone", "add")])
+        self.assertEqual(
+            state.rows,
+            [CountsRow(545640, "benarmstrong", 20, 5), CountsRow(2, "someone", 4, 3)],
+        )
+        self.assertEqual((state.total_observations, state.total_species), (24, 7))
+        self.embeds.api.get_observations.assert_has_awaits(
+            [
+                call("observers", user_id="someone", per_page=1, taxon_id=3),
+                call(
+                    "species_counts",
+                    user_id="benarmstrong,someone",
+                    per_page=0,
+                    taxon_id=3,
+                ),
+            ],
+            any_order=True,
+        )
+
+    async def test_remove_user(self):
+        """Test removing a user fetches only the species total."""
+        self.mock_observers()
+        state = replace(USERS_STATE, rows=[*USERS_STATE.rows, CountsRow(3, "c", 1, 1)])
+        state = await self.embeds.update_totals(state, TAXON, [(3, "c", "remove")])
+        self.assertEqual(state, USERS_STATE)
+        self.embeds.api.get_observations.assert_awaited_once_with(
+            "species_counts", user_id="benarmstrong,someone", per_page=0, taxon_id=3
+        )
+        self.embeds.api.get_observations.reset_mock()
+        state = await self.embeds.update_totals(
+            state, TAXON, [(2, "someone", "remove")]
+        )
+        self.assertEqual(state.rows, [CountsRow(545640, "benarmstrong", 20, 5)])
+        self.assertIsNone(state.total)
+        self.embeds.api.get_observations.assert_not_awaited()
+
+    async def test_add_user_species(self):
+        """Test the species total isn't fetched if species aren't shown."""
+        self.mock_observers()
+        species = get_taxon_fields(
+            taxon_record(7089, "Anas platyrhynchos", "species", [48460, 3])
+        )
+        state = await self.embeds.update_totals(
+            replace(USERS_STATE, taxon_id=7089), species, [(3, "c", "add")]
+        )
+        self.assertEqual(state.total_observations, 24)
+        self.assertIsNone(state.total_species)
+        self.embeds.api.get_observations.assert_awaited_once_with(
+            "observers", user_id="c", per_page=1, taxon_id=7089
+        )
+
+    async def test_remove_last_user(self):
+        """Test removing the last user removes the table."""
+        self.embeds.api.get_observations = AsyncMock()
+        state = EmbedState(
+            taxon_id=3, kind="users", rows=[CountsRow(2, "someone", 4, 3)]
+        )
+        state = await self.embeds.update_totals(
+            state, TAXON, [(2, "someone", "remove")]
+        )
+        self.assertEqual(state, EmbedState(taxon_id=3))
+        self.embeds.api.get_observations.assert_not_awaited()
+
+    def mock_message(self):
+        embed = INatEmbed(url="https://www.inaturalist.org/taxa/3", description=BASE)
+        msg = MagicMock(id=1, embeds=[embed], edited_at=None, created_at=datetime.now())
+        msg.channel.fetch_message = AsyncMock(return_value=msg)
+        msg.edit = AsyncMock()
+        return msg
+
+    async def test_edits_coalesced(self):
+        """Test reactions made during an edit are applied in one more edit."""
+        self.mock_observers()
+        msg = self.mock_message()
+        users = [
+            User(545640, None, "benarmstrong", 20, 0),
+            self.user,
+            User(3, None, "another", 1, 0),
+        ]
+        await asyncio.gather(
+            *(self.embeds.edit_totals_locked(msg, TAXON, user, "add") for user in users)
+        )
+        self.assertEqual(msg.edit.await_count, 2)
+        state = await self.embeds.embed_states.get(1)
+        self.assertEqual(
+            [row.name for row in state.rows], ["benarmstrong", "someone", "another"]
+        )
+        self.assertEqual(self.embeds.pending_edits, {})
+        # The species total is shown, so the difference from rows is explained:
+        embed = msg.edit.await_args.kwargs["embed"]
+        self.assertEqual(embed.footer.text, USER_SPECIES_FOOTER)
+
+        # Our own edit is current, so the message isn't fetched again:
+        msg.channel.fetch_message.assert_awaited_once()
+        with patch("inatcog.inat_embeds.asyncio.sleep") as sleep:
+            await self.embeds.edit_totals_locked(msg, TAXON, self.user, "remove")
+        msg.channel.fetch_message.assert_awaited_once()
+        self.assertEqual(msg.edit.await_count, 3)
+        # It was held back until the end of the window since the last edit:
+        self.assertLessEqual(sleep.await_args.args[0], EDIT_WINDOW_SECONDS)
+
+    async def test_edits_in_window_coalesced(self):
+        """Test reactions made soon after an edit are applied in one more edit."""
+        self.mock_observers()
+        msg = self.mock_message()
+        await self.embeds.edit_totals_locked(msg, TAXON, self.user, "add")
+        users = [User(n, None, f"user{n}", 1, 0) for n in range(3, 6)]
+        edits = []
+        for user in users:
+            edits.append(
+                asyncio.ensure_future(
+                    self.embeds.edit_totals_locked(msg, TAXON, user, "add")
+                )
+            )
+            await asyncio.sleep(0)
+        await asyncio.gather(*edits)
+        self.assertEqual(msg.edit.await_count, 2)
+        state = await self.embeds.embed_states.get(1)
+        self.assertEqual(len(state.rows), 4)
+
+    async def test_edited_elsewhere(self):
+        """Test the bot's copy of a message is used if edited since ours."""
+        self.mock_observers()
+        msg = self.mock_message()
+        self.embeds.message_cache.add(msg)
+        seen = self.mock_message()
+        seen.edited_at = datetime.now()
+        self.embeds.bot._connection._get_message.return_value = seen
+        await self.embeds.edit_totals_locked(msg, TAXON, self.user, "add")
+        seen.edit.assert_awaited_once()
+        msg.edit.assert_not_awaited()
+        seen.channel.fetch_message.assert_not_awaited()
+        self.assertIs(self.embeds.message_cache.get(1), seen)
+
+    async def test_edit_error_raised_to_each(self):
+        """Test an error applying coalesced changes is raised to each caller."""
+        self.mock_observers()
+        msg = self.mock_message()
+        users = [User(n, None, f"user{n}", 1, 0) for n in range(3, 6)]
+        with patch("inatcog.inat_embeds.MAX_EMBED_DESCRIPTION_LEN", 0):
+            results = await asyncio.gather(
+                *(
+                    self.embeds.edit_totals_locked(msg, TAXON, user, "add")
+                    for user in users
+                ),
+                return_exceptions=True,
+            )
+        self.assertTrue(all(isinstance(err, NoRoomInDisplay) for err in results))
+        msg.edit.assert_not_awaited()
@@ -23,3 +23,27 @@ class TestEmbeds(unittest.TestCase):
 
         self.assertEqual("Sorry", test_sorry_2.title)
         self.assertEqual("x", test_sorry_2.description)
+
+    def test_fit_items(self):
+        """Test fit_items."""
+        items = ["aaaa", "bbbb", "cccc", "dddd"]
+        self.assertListEqual(items, embeds.fit_items(items, 22))
+        self.assertListEqual(["aaaa", "and 3 more"], embeds.fit_items(items, 21))
+        self.assertListEqual(["and 4 more"], embeds.fit_items(items, 15))
+
+    def test_truncate_text(self):
+        """Test truncate_text."""
+        self.assertEqual("abc", embeds.truncate_text("abc", 3))
+        self.assertEqual("ab…", embeds.truncate_text("abcd", 3))
+
+    def test_paginate(self):
+        """Test paginate."""
+        self.assertListEqual(
+            [["a", "b"], ["c", "d"], ["e"]],
+            embeds.paginate(["a", "b", "c", "d", "e"], max_items=2),
+        )
+        self.assertListEqual(
+            [["aa", "bb"], ["cccccc"], ["d"]],
+            embeds.paginate(["aa", "bb", "cccccc", "d"], max_len=5),
+        )
+        self.assertListEqual([], embeds.paginate([]))
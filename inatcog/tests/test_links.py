@@ -0,0 +1,46 @@
+"""Test inatcog.links."""
+from unittest import TestCase
+
+from inatcog.links import INatLink, find_link, match_link, scan_links
+
+CONTENT = (
+    "See https://www.inaturalist.org/observations/123 of "
+    "<https://inaturalist.ca/taxa/3-Aves> by https://www.naturalista.mx/people/ben_a"
+    " in https://inaturalist.org/places/97394, also "
+    "https://www.inaturalist.org/observations?taxon_id=3&user_id=2 "
+    "https://www.inaturalist.org/observations/12abc"
+)
+
+
+class TestLinks(TestCase):
+    def test_scan_links(self):
+        """Test every kind of link is found in one pass, in order."""
+        self.assertEqual(
+            list(scan_links(CONTENT)),
+            [
+                INatLink("obs", "https://www.inaturalist.org/observations/123", 123),
+                INatLink("taxon", "https://inaturalist.ca/taxa/3", 3),
+                INatLink(
+                    "user", "https://www.naturalista.mx/people/ben_a", slug="ben_a"
+                ),
+                INatLink("place", "https://inaturalist.org/places/97394", 97394),
+                INatLink(
+                    "obs_query",
+                    "https://www.inaturalist.org/observations?taxon_id=3&user_id=2",
+                    params={"taxon_id": "3", "user_id": "2"},
+                ),
+            ],
+        )
+
+    def test_find_link(self):
+        """Test finding the first link of a kind."""
+        self.assertEqual(find_link(CONTENT, "place", "user").id_or_slug, "ben_a")
+        self.assertEqual(find_link(CONTENT, "place").id_or_slug, "97394")
+        self.assertIsNone(find_link(CONTENT, "project"))
+        self.assertIsNone(find_link("observations/123 on no partner site"))
+
+    def test_match_link(self):
+        """Test a link is only matched at the start."""
+        self.assertEqual(match_link(CONTENT[4:], "obs").id, 123)
+        self.assertIsNone(match_link(CONTENT, "obs"))
+        self.assertIsNone(match_link(CONTENT[4:], "taxon"))
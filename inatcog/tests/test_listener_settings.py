@@ -0,0 +1,59 @@
+"""Test inatcog.listener_settings."""
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, MagicMock
+
+from inatcog.listener_settings import INatListenerSettings, ListenerSettings
+
+
+class TestListenerSettings(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.cog = MagicMock()
+        self.guild_config = MagicMock()
+        self.guild_config.bot_prefixes = AsyncMock(return_value=["!", "?"])
+        self.guild_config.autoobs = AsyncMock(return_value=True)
+        self.guild_config.dot_taxon = AsyncMock(return_value=True)
+        self.channel_config = MagicMock()
+        self.channel_config.autoobs = AsyncMock(return_value=None)
+        self.channel_config.dot_taxon = AsyncMock(return_value=False)
+        self.cog.config.guild.return_value = self.guild_config
+        self.cog.config.channel.return_value = self.channel_config
+        self.channel = MagicMock(id=2)
+        self.channel.guild.id = 1
+        self.settings = INatListenerSettings(self.cog)
+
+    async def test_get(self):
+        """Test effective settings are loaded once per channel."""
+        settings = await self.settings.get(self.channel)
+        self.assertEqual((settings.autoobs, settings.dot_taxon), (True, False))
+        self.assertTrue(settings.is_ignored("?help"))
+        self.assertFalse(settings.is_ignored("hello?"))
+        self.assertIs(await self.settings.get(self.channel), settings)
+        self.guild_config.bot_prefixes.assert_awaited_once()
+
+    async def test_invalidate(self):
+        """Test settings are reloaded after they're changed."""
+        await self.settings.get(self.channel)
+        self.guild_config.autoobs.return_value = False
+        self.settings.invalidate(self.channel.guild)
+        settings = await self.settings.get(self.channel)
+        self.assertFalse(settings.enabled)
+        self.assertEqual(self.guild_config.bot_prefixes.await_count, 2)
+
+    async def test_invalidate_during_load(self):
+        """Test settings loaded while being changed aren't kept."""
+
+        async def bot_prefixes():
+            self.settings.invalidate(self.channel.guild, self.channel)
+            return []
+
+        self.guild_config.bot_prefixes.side_effect = bot_prefixes
+        await self.settings.get(self.channel)
+        self.guild_config.bot_prefixes.side_effect = None
+        await self.settings.get(self.channel)
+        await self.settings.get(self.channel)
+        self.assertEqual(self.guild_config.bot_prefixes.await_count, 2)
+
+    def test_nothing_enabled(self):
+        """Test the default settings have nothing enabled or ignored."""
+        self.assertFalse(ListenerSettings().enabled)
+        self.assertFalse(ListenerSettings().is_ignored("!obs"))
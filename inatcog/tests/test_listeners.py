@@ -0,0 +1,84 @@
+"""Test inatcog.listeners."""
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, PropertyMock
+
+from inatcog.embed_state import EmbedState, INatEmbedStateStore
+from inatcog.listeners import Listeners
+from inatcog.message_cache import INatMessageCache
+from inatcog.tests.test_embed_state import mock_custom_config
+
+
+class TestListeners(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.listeners = Listeners()
+        self.listeners._ready_event = asyncio.Event()
+        self.listeners._ready_event.set()
+        self.listeners.bot = MagicMock()
+        self.get_message = self.listeners.bot._connection._get_message
+        self.get_message.return_value = None
+        self.listeners.config = MagicMock()
+        mock_custom_config(self.listeners, {"2": EmbedState(taxon_id=3)})
+        self.listeners.embed_states = INatEmbedStateStore(self.listeners)
+        self.listeners.message_cache = INatMessageCache()
+        self.member = MagicMock(bot=False)
+        self.listeners.bot.get_guild.return_value.get_member.return_value = self.member
+        self.channel = self.listeners.bot.get_channel.return_value
+        self.channel.fetch_message = AsyncMock()
+
+    def payload(self, message_id):
+        return MagicMock(guild_id=1, channel_id=1, user_id=1, message_id=message_id)
+
+    async def test_maybe_get_reaction_cached(self):
+        """Test a reaction to a message we sent is got from the cache."""
+        message = MagicMock(id=1)
+        self.listeners.message_cache.add(message)
+        self.assertEqual(
+            await self.listeners.maybe_get_reaction(self.payload(1)),
+            (self.member, message),
+        )
+        self.channel.fetch_message.assert_not_awaited()
+
+    async def test_maybe_get_reaction_stored(self):
+        """Test a message with a stored state but not cached is fetched."""
+        message = MagicMock(id=2, author=self.listeners.bot.user)
+        self.channel.fetch_message.return_value = message
+        self.assertEqual(
+            await self.listeners.maybe_get_reaction(self.payload(2)),
+            (self.member, message),
+        )
+        self.assertIn(2, self.listeners.message_cache)
+
+    async def test_maybe_get_reaction_seen(self):
+        """Test the bot's copy of one of our messages is used if newer."""
+        sent = datetime.now()
+        ours = MagicMock(id=2, created_at=sent, edited_at=None)
+        seen = MagicMock(id=2, author=self.listeners.bot.user, created_at=sent)
+        seen.edited_at = sent + timedelta(seconds=1)
+        self.get_message.return_value = seen
+        self.assertEqual(
+            await self.listeners.maybe_get_reaction(self.payload(2)),
+            (self.member, seen),
+        )
+        self.channel.fetch_message.assert_not_awaited()
+        self.listeners.message_cache.add(ours)
+        ours.edited_at = seen.edited_at
+        self.assertEqual(
+            await self.listeners.maybe_get_reaction(self.payload(2)),
+            (self.member, ours),
+        )
+        self.get_message.return_value = MagicMock(id=2)
+        with self.assertRaises(ValueError):
+            await self.listeners.maybe_get_reaction(self.payload(2))
+
+    async def test_maybe_get_reaction_other(self):
+        """Test a reaction to any other message is rejected without a fetch."""
+        cached_messages = PropertyMock(return_value=[])
+        type(self.listeners.bot).cached_messages = cached_messages
+        with self.assertRaises(ValueError):
+            await self.listeners.maybe_get_reaction(self.payload(3))
+        self.listeners.bot.get_guild.assert_not_called()
+        self.get_message.assert_not_called()
+        cached_messages.assert_not_called()
+        self.channel.fetch_message.assert_not_awaited()
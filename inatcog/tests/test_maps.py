@@ -1,9 +1,10 @@
 """Test maps module."""
 from unittest import IsolatedAsyncioTestCase
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, call, patch
 
 from inatcog import maps
 from inatcog.api import INatAPI
+from inatcog.common import ExpiringCache
 
 API_REQUESTS_PATCH = patch("inatcog.api.aiohttp.ClientSession.get")
 
@@ -159,3 +160,44 @@ class TestMaps(IsolatedAsyncioTestCase):
                         center_lon=217.94684012420475,
                     ),
                 )
+
+    async def test_union_bounds(self):
+        """Test union_bounds."""
+        self.assertIsNone(maps.union_bounds([None]))
+        # Alaska & Siberia span the antimeridian:
+        alaska = {"swlat": 51, "swlng": 172, "nelat": 71, "nelng": -130}
+        siberia = {"swlat": 50, "swlng": 60, "nelat": 77, "nelng": -170}
+        self.assertEqual(
+            maps.union_bounds([alaska, siberia]),
+            {"swlat": 50, "swlng": 60, "nelat": 77, "nelng": 230},
+        )
+        # Either side of the prime meridian:
+        west = {"swlat": 10, "swlng": -10, "nelat": 20, "nelng": -5}
+        east = {"swlat": -10, "swlng": 5, "nelat": 0, "nelng": 10}
+        self.assertEqual(
+            maps.union_bounds([east, west]),
+            {"swlat": -10, "swlng": -10, "nelat": 20, "nelng": 10},
+        )
+
+    async def test_get_bounds_for_taxon_ids(self):
+        """Test only bounds of uncached taxa are fetched, and in any order."""
+        bounds = {
+            1: {"swlat": 0, "swlng": 0, "nelat": 1, "nelng": 1},
+            2: {"swlat": 2, "swlng": 2, "nelat": 3, "nelng": 3},
+        }
+        api = MagicMock()
+        api.bounds_cache = ExpiringCache(maps.MAX_CACHED_BOUNDS, maps.BOUNDS_TTL)
+
+        async def get_observation_bounds(taxon_ids):
+            return maps.union_bounds([bounds[taxon_id] for taxon_id in taxon_ids])
+
+        api.get_observation_bounds = MagicMock(side_effect=get_observation_bounds)
+        inat_map_url = maps.INatMapURL(api)
+        await inat_map_url.get_bounds_for_taxon_ids([1])
+        self.assertEqual(
+            await inat_map_url.get_bounds_for_taxon_ids([1, 2]),
+            {"swlat": 0, "swlng": 0, "nelat": 3, "nelng": 3},
+        )
+        await inat_map_url.get_bounds_for_taxon_ids([2, 1])
+        api.get_observation_bounds.assert_has_calls([call([1]), call([2])])
+        self.assertEqual(api.get_observation_bounds.call_count, 2)
@@ -0,0 +1,35 @@
+"""Test inatcog.message_cache."""
+from datetime import datetime, timedelta
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from inatcog.message_cache import INatMessageCache
+
+SENT = datetime(2020, 6, 1, 12, 0)
+
+
+def message(message_id, edited_at=None):
+    return MagicMock(id=message_id, created_at=SENT, edited_at=edited_at)
+
+
+class TestMessageCache(TestCase):
+    def test_get(self):
+        """Test the least recently used messages are forgotten."""
+        cache = INatMessageCache(max_messages=2)
+        first = message(1)
+        cache.add(first)
+        cache.add(message(2))
+        self.assertIs(cache.get(1), first)
+        cache.add(message(3))
+        self.assertNotIn(2, cache)
+        self.assertEqual(len(cache), 2)
+
+    def test_get_current(self):
+        """Test the cached copy is only got if not older."""
+        cache = INatMessageCache()
+        edited = message(1, SENT + timedelta(seconds=10))
+        cache.add(edited)
+        self.assertIs(cache.get_current(message(1)), edited)
+        self.assertIs(cache.get_current(edited), edited)
+        self.assertIsNone(cache.get_current(message(1, SENT + timedelta(seconds=20))))
+        self.assertIsNone(cache.get_current(message(2)))
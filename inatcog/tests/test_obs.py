@@ -0,0 +1,73 @@
+"""Test inatcog.obs."""
+import copy
+import unittest
+
+from inatcog.obs import LazyObs, get_obs_fields
+
+TAXON = {
+    "id": 9100,
+    "name": "Zonotrichia albicollis",
+    "rank": "species",
+    "ancestor_ids": [48460, 1, 3, 9079, 9100],
+    "observations_count": 1000,
+    "is_active": True,
+}
+USER = {
+    "id": 545640,
+    "login": "benarmstrong",
+    "name": "Ben Armstrong",
+    "observations_count": 1000,
+    "identifications_count": 2000,
+}
+OBS = {
+    "id": 1,
+    "observed_on_string": "2020-05-25",
+    "place_guess": "Canada",
+    "quality_grade": "research",
+    "faves_count": 0,
+    "comments_count": 0,
+    "description": None,
+    "project_ids": [1],
+    "non_traditional_projects": [{"project_id": 2}],
+    "taxon": TAXON,
+    "community_taxon": TAXON,
+    "ident_taxon_ids": [48460, 1, 3, 9079, 9100],
+    "identifications": [
+        {"current": True, "taxon": {"id": 9100, "ancestor_ids": [48460, 1, 3, 9079]}},
+        {"current": True, "taxon": {"id": 9079, "ancestor_ids": [48460, 1, 3]}},
+        {"current": True, "taxon": {"id": 3, "ancestor_ids": [48460, 1]}},
+        {"current": False, "taxon": {"id": 1, "ancestor_ids": [48460]}},
+    ],
+    "user": USER,
+    "photos": [
+        {
+            "url": "https://static.inaturalist.org/photos/1/square.jpg",
+            "attribution": "(c) Ben Armstrong",
+        }
+    ],
+    "sounds": [],
+}
+
+
+class TestObs(unittest.TestCase):
+    def test_get_obs_fields(self):
+        """Test get_obs_fields parses all fields without changing the record."""
+        record = copy.deepcopy(OBS)
+        obs = get_obs_fields(record)
+        self.assertDictEqual(record, OBS)
+        self.assertEqual(obs.taxon.taxon_id, 9100)
+        self.assertEqual((obs.idents_agree, obs.idents_count), (1, 3))
+        self.assertEqual(obs.user.login, "benarmstrong")
+        self.assertEqual(
+            obs.images[0].url, "https://static.inaturalist.org/photos/1/original.jpg"
+        )
+        self.assertListEqual(obs.project_ids, [1, 2])
+
+    def test_lazy_obs(self):
+        """Test LazyObs only parses fields as they are used."""
+        obs = LazyObs(OBS)
+        self.assertEqual(obs.obs_id, 1)
+        self.assertNotIn("user", vars(obs))
+        self.assertEqual(obs.user.login, "benarmstrong")
+        self.assertIs(obs.user, vars(obs)["user"])
+        self.assertEqual(obs.to_obs(), get_obs_fields(OBS))
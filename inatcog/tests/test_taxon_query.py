@@ -0,0 +1,236 @@
+"""Test inatcog.taxon_query."""
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, MagicMock, call, patch
+
+from inatcog.base_classes import CompoundQuery, Place, SimpleQuery
+from inatcog.taxon_query import INatTaxonQuery
+
+
+def taxon_record(taxon_id, name, rank, ancestor_ids, common=None):
+    return {
+        "id": taxon_id,
+        "name": name,
+        "rank": rank,
+        "preferred_common_name": common,
+        "matched_term": common or name,
+        "ancestor_ids": ancestor_ids + [taxon_id],
+        "observations_count": 0,
+        "is_active": True,
+    }
+
+
+ANIMALIA = taxon_record(1, "Animalia", "kingdom", [48460])
+PLANTAE = taxon_record(47126, "Plantae", "kingdom", [48460])
+# "Pea" is the common name of a plant and a crab:
+PEA_PLANT = taxon_record(64517, "Lathyrus oleraceus", "species", [48460, 47126], "Pea")
+PEA_CRAB = taxon_record(62282, "Pinnotheres pisum", "species", [48460, 1], "Pea")
+
+
+def simple_query(*terms):
+    return SimpleQuery(
+        taxon_id=None, terms=list(terms), phrases=None, ranks=[], code=None
+    )
+
+
+def compound_query(main, ancestor=None, place=None):
+    return CompoundQuery(
+        main=main,
+        ancestor=ancestor,
+        user=None,
+        place=place,
+        controlled_term=None,
+        unobserved_by=None,
+        per=None,
+    )
+
+
+class TestTaxonQuery(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.cog = MagicMock()
+        self.cog.taxon_store.available = MagicMock(return_value=False)
+        self.taxon_query = INatTaxonQuery(self.cog)
+
+        def get_taxa(*args, **kwargs):
+            query = kwargs.get("q")
+            if query == "animals":
+                return {"results": [ANIMALIA]}
+            if query == "pea":
+                results = [PEA_PLANT, PEA_CRAB]
+                if "taxon_id" in kwargs:
+                    results = [
+                        record
+                        for record in results
+                        if kwargs["taxon_id"] in record["ancestor_ids"]
+                    ]
+                return {"results": results}
+            return {"results": []}
+
+        self.cog.api.get_taxa = AsyncMock(side_effect=get_taxa)
+
+    async def test_compound_speculative(self):
+        """Test candidate in the ancestor from the unfiltered query is used."""
+        taxon = await self.taxon_query.maybe_match_taxon_compound(
+            compound_query(simple_query("pea"), simple_query("animals"))
+        )
+        self.assertEqual(taxon.taxon_id, PEA_CRAB["id"])
+        self.assertEqual(self.cog.api.get_taxa.await_count, 2)
+
+    async def test_compound_fallback(self):
+        """Test filtered query is made when no unfiltered candidate qualifies."""
+        self.cog.api.get_taxa.side_effect = [
+            {"results": [ANIMALIA]},
+            {"results": [PEA_PLANT]},
+            {"results": [PEA_CRAB]},
+        ]
+        taxon = await self.taxon_query.maybe_match_taxon_compound(
+            compound_query(simple_query("pea"), simple_query("animals"))
+        )
+        self.assertEqual(taxon.taxon_id, PEA_CRAB["id"])
+        self.assertEqual(self.cog.api.get_taxa.await_count, 3)
+        self.assertEqual(
+            self.cog.api.get_taxa.await_args.kwargs["taxon_id"], ANIMALIA["id"]
+        )
+
+    async def test_compound_local(self):
+        """Test the API isn't queried for the main taxon if matched locally."""
+        self.cog.taxon_store.available.return_value = True
+        self.cog.taxon_store.run = AsyncMock(
+            side_effect=lambda _lookup, query, _ancestor_id: [PEA_CRAB]
+            if query.terms == ["pea"]
+            else []
+        )
+        get_taxa = self.cog.api.get_taxa.side_effect
+        self.cog.api.get_taxa.side_effect = lambda *args, **kwargs: (
+            {"results": [PEA_CRAB]} if args else get_taxa(**kwargs)
+        )
+        taxon = await self.taxon_query.maybe_match_taxon_compound(
+            compound_query(simple_query("pea"), simple_query("animals"))
+        )
+        self.assertEqual(taxon.taxon_id, PEA_CRAB["id"])
+        calls = self.cog.api.get_taxa.await_args_list
+        queries = [taxa_call.kwargs.get("q") for taxa_call in calls]
+        self.assertNotIn("pea", queries)
+        # The live record is fetched fresh, as for any other primary lookup:
+        self.assertIn(call(PEA_CRAB["id"]), calls)
+
+    async def test_compound_ancestor_not_found(self):
+        """Test ancestor lookup failure is raised."""
+        with self.assertRaises(LookupError):
+            await self.taxon_query.maybe_match_taxon_compound(
+                compound_query(simple_query("pea"), simple_query("nothing"))
+            )
+
+    async def test_query_taxon_place_known(self):
+        """Test taxon is looked up once for a place known by abbreviation."""
+        self.cog.get_home = AsyncMock(return_value=1)
+        self.cog.place_table.get_place_id = AsyncMock(return_value=6712)
+        self.cog.place_table.get_place = AsyncMock(
+            return_value=MagicMock(spec=Place, place_id=6712)
+        )
+        filtered_taxon = await self.taxon_query.query_taxon(
+            MagicMock(), compound_query(simple_query("pea"), place="can")
+        )
+        self.assertEqual(filtered_taxon.place.place_id, 6712)
+        self.assertEqual(filtered_taxon.taxon.taxon_id, PEA_PLANT["id"])
+        self.cog.api.get_taxa.assert_awaited_once_with(
+            q="pea", preferred_place_id=6712
+        )
+
+    async def test_query_taxon_place_by_name(self):
+        """Test taxon is looked up again for a place looked up by name."""
+        self.cog.get_home = AsyncMock(return_value=1)
+        self.cog.place_table.get_place_id = AsyncMock(return_value=None)
+        self.cog.place_table.get_place = AsyncMock(
+            return_value=MagicMock(spec=Place, place_id=6712)
+        )
+        filtered_taxon = await self.taxon_query.query_taxon(
+            MagicMock(), compound_query(simple_query("pea"), place="canada")
+        )
+        self.assertEqual(filtered_taxon.taxon.taxon_id, PEA_PLANT["id"])
+        self.assertEqual(self.cog.api.get_taxa.await_count, 2)
+        self.cog.api.get_taxa.assert_awaited_with(q="pea", preferred_place_id=6712)
+
+    async def test_query_taxa(self):
+        """Test terms are looked up concurrently, keeping order and failures."""
+        self.cog.get_home = AsyncMock(return_value=None)
+
+        async def convert(_ctx, term):
+            return compound_query(simple_query(*term.split()))
+
+        with patch(
+            "inatcog.taxon_query.NaturalCompoundQueryConverter.convert",
+            side_effect=convert,
+        ):
+            (taxa, failed) = await self.taxon_query.query_taxa(
+                MagicMock(), "animals, nothing, pea, animals,"
+            )
+        self.assertListEqual(
+            [taxon.taxon_id for taxon in taxa], [ANIMALIA["id"], PEA_PLANT["id"]]
+        )
+        self.assertListEqual(failed, [("nothing", "No matching taxon found")])
+
+    async def test_match_by_code(self):
+        """Test a code's taxon is fetched fresh, for the preferred place."""
+        self.cog.code_table.get_code = AsyncMock(return_value={"taxon_id": 62282})
+        self.cog.api.get_taxa.side_effect = None
+        self.cog.api.get_taxa.return_value = {"results": [PEA_CRAB]}
+        query = SimpleQuery(
+            taxon_id=None, terms=["PECR"], phrases=None, ranks=[], code="PECR"
+        )
+        taxon = await self.taxon_query.maybe_match_taxon(query, preferred_place_id=1)
+        self.assertEqual(taxon.taxon_id, PEA_CRAB["id"])
+        self.cog.api.get_taxa.assert_awaited_once_with(62282, preferred_place_id=1)
+
+    async def test_code_not_resolved(self):
+        """Test a code whose name can't be resolved is only looked up once."""
+        codes = {"XXXX": {"name": "Nothing here"}}
+
+        async def set_code(code, taxon_id):
+            codes[code] = dict(codes[code], taxon_id=taxon_id)
+
+        self.cog.code_table.get_code = AsyncMock(side_effect=codes.get)
+        self.cog.code_table.set_code = AsyncMock(side_effect=set_code)
+        self.cog.taxon_store.run = AsyncMock(return_value=None)
+        self.assertIsNone(await self.taxon_query.get_code_taxon_id("XXXX"))
+        self.assertIsNone(await self.taxon_query.get_code_taxon_id("XXXX"))
+        self.assertEqual(codes["XXXX"]["taxon_id"], 0)
+        self.cog.api.get_taxa.assert_awaited_once_with(q="Nothing here")
+
+    @patch("inatcog.taxon_query.TAXA_PER_PAGE", 1)
+    async def test_get_taxa_at_rank_in(self):
+        """Test all taxa at a rank in a taxon are got a page at a time."""
+        self.cog.api.get_taxa = AsyncMock(
+            side_effect=lambda page, **kwargs: {
+                "total_results": 2,
+                "results": [[ANIMALIA, PLANTAE][page - 1]],
+            }
+        )
+        taxa = await self.taxon_query.get_taxa_at_rank_in("kingdom", 48460)
+        self.assertEqual(list(taxa), [ANIMALIA["id"], PLANTAE["id"]])
+        self.cog.api.get_taxa.assert_awaited_with(
+            page=2, rank="kingdom", per_page=1, order_by="id", taxon_id=48460
+        )
+        self.cog.api.get_taxa.side_effect = None
+        self.cog.api.get_taxa.return_value = {"total_results": 20000, "results": []}
+        self.assertIsNone(await self.taxon_query.get_taxa_at_rank_in("genus"))
+
+    async def test_get_taxa_at_rank_up_front(self):
+        """Test taxa at a rank are only got up front if fewer queries."""
+        self.cog.api.get_taxa = AsyncMock(
+            return_value={"total_results": 1001, "results": []}
+        )
+        self.assertIsNone(
+            await self.taxon_query.get_taxa_at_rank_up_front("genus", 1000, 3)
+        )
+        self.assertIsNone(
+            await self.taxon_query.get_taxa_at_rank_up_front("genus", 5000)
+        )
+        self.cog.api.get_taxa.assert_not_awaited()
+        # Too many to get in the most pages allowed:
+        self.assertIsNone(
+            await self.taxon_query.get_taxa_at_rank_up_front("genus", 5000, 3)
+        )
+        self.cog.api.get_taxa.assert_awaited_once()
+        self.cog.api.get_taxa.return_value = {"total_results": 1, "results": [PLANTAE]}
+        taxa = await self.taxon_query.get_taxa_at_rank_up_front("kingdom", 5000, 48460)
+        self.assertEqual(list(taxa), [PLANTAE["id"]])
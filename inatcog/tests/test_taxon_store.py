@@ -0,0 +1,105 @@
+"""Test inatcog.taxon_store."""
+import asyncio
+import csv
+import io
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+from inatcog.base_classes import SimpleQuery
+from inatcog.taxon_store import INatTaxonStore, import_taxonomy_dwca
+
+TAXA = [
+    ["id", "parentNameUsageID", "scientificName", "taxonRank"],
+    ["1", "https://www.inaturalist.org/taxa/48460", "Animalia", "kingdom"],
+    ["3", "https://www.inaturalist.org/taxa/1", "Aves", "class"],
+    ["9079", "https://www.inaturalist.org/taxa/3", "Zonotrichia", "genus"],
+    ["9100", "https://www.inaturalist.org/taxa/9079", "Zonotrichia albicollis", "species"],
+    ["9101", "https://www.inaturalist.org/taxa/9079", "Zonotrichia leucophrys", "species"],
+]
+NAMES = [
+    ["id", "vernacularName", "language"],
+    ["9100", "White-throated Sparrow", "en"],
+    ["9100", "Bruant à gorge blanche", "fr"],
+    ["9101", "White-crowned Sparrow", "en"],
+]
+
+
+def make_csv(rows):
+    text = io.StringIO()
+    csv.writer(text).writerows(rows)
+    return text.getvalue()
+
+
+def simple_query(terms, ranks=None):
+    return SimpleQuery(
+        taxon_id=None, terms=terms, phrases=[], ranks=ranks or [], code=None
+    )
+
+
+class TestTaxonStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        tmp_path = Path(self.tmp.name)
+        archive_path = tmp_path / "taxonomy.dwca.zip"
+        with zipfile.ZipFile(archive_path, "w") as archive:
+            archive.writestr("taxa.csv", make_csv(TAXA))
+            archive.writestr("VernacularNames.csv", make_csv(NAMES))
+        self.db_path = tmp_path / "taxonomy.db"
+        self.count = import_taxonomy_dwca(archive_path, self.db_path)
+        self.store = INatTaxonStore(None, path=self.db_path)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_import(self):
+        """Test import_taxonomy_dwca."""
+        self.assertEqual(self.count, 5)
+        self.assertTrue(self.store.available())
+        self.assertEqual(self.store.taxa_count(), 5)
+
+    def test_get_records(self):
+        """Test get_records by name prefixes, rank & ancestor."""
+        records = self.store.get_records(simple_query(["white", "thr"]))
+        self.assertEqual(len(records), 1)
+        record = records[0]
+        self.assertEqual(record["id"], 9100)
+        self.assertEqual(record["preferred_common_name"], "White-throated Sparrow")
+        self.assertEqual(record["ancestor_ids"], [48460, 1, 3, 9079, 9100])
+
+        records = self.store.get_records(simple_query(["zono"], ranks=["genus"]))
+        self.assertEqual([record["id"] for record in records], [9079])
+
+        records = self.store.get_records(simple_query(["sparrow"]), ancestor_id=9079)
+        self.assertEqual(len(records), 2)
+        records = self.store.get_records(simple_query(["sparrow"]), ancestor_id=9100)
+        self.assertEqual([record["id"] for record in records], [9100])
+
+    def test_run(self):
+        """Test lookups are run off the event loop on the store's thread."""
+        self.assertTrue(self.store.available())
+        self.assertIsNone(self.store._conn)
+        records = asyncio.run(
+            self.store.run(self.store.get_records, simple_query(["zono"]), 3)
+        )
+        self.assertEqual([record["id"] for record in records], [9079, 9100, 9101])
+
+    def test_close_while_running(self):
+        """Test closing the store waits for lookups in progress."""
+
+        async def lookups():
+            lookup = self.store.run(self.store.get_taxon_ids, ["Zonotrichia"])
+            task = asyncio.ensure_future(lookup)
+            await asyncio.sleep(0)
+            self.store.close()
+            return (await task, await self.store.run(self.store.taxa_count))
+
+        self.assertEqual(asyncio.run(lookups()), ({"Zonotrichia": 9079}, 5))
+
+    def test_not_imported(self):
+        """Test store without an imported database."""
+        store = INatTaxonStore(None, path=Path(self.tmp.name) / "missing.db")
+        self.assertFalse(store.available())
+        self.assertEqual(store.get_records(simple_query(["zono"])), [])
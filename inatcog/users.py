@@ -1,16 +1,7 @@
 """Module to handle users."""
-import re
-from typing import AsyncIterator, Tuple
+from typing import AsyncIterator, Dict, Optional, Tuple
 import discord
-from .base_classes import WWW_URL_PAT, User
-
-# Match user profile link from any partner site.
-PAT_USER_LINK = re.compile(
-    r"\b(?P<url>" + WWW_URL_PAT + r"/(people|users)"
-    r"/((?P<user_id>\d+)|(?P<login>[a-z][-_a-z0-9]{2,39}))"
-    r")\b",
-    re.I,
-)
+from .base_classes import User
 
 
 class INatUserTable:
@@ -41,6 +32,40 @@ class INatUserTable:
 
         return user
 
+    async def get_members_by_inat_user_id(
+        self, guild: discord.Guild, role: Optional[discord.Role] = None
+    ) -> Dict[int, discord.Member]:
+        """Get members known in the guild by their iNat user ids.
+
+        Unlike get_member_pairs(), this uses only the registry, without any
+        API lookups, so it is cheap for all members of even a large guild.
+
+        Parameters
+        ----------
+        guild: discord.Guild
+            The guild whose members are wanted.
+        role: discord.Role, optional
+            Only members with this role are wanted.
+
+        Returns
+        -------
+        dict
+            inat_user_id -> discord.Member mapping
+        """
+        all_users = await self.cog.config.all_users()
+        members = {}
+        for (discord_id, user_config) in all_users.items():
+            inat_user_id = user_config.get("inat_user_id")
+            if not inat_user_id or not (
+                guild.id in (user_config.get("known_in") or [])
+                or user_config.get("known_all")
+            ):
+                continue
+            member = guild.get_member(discord_id)
+            if member and (not role or role in member.roles):
+                members[inat_user_id] = member
+        return members
+
     async def get_member_pairs(
         self, guild: discord.Guild, users
     ) -> AsyncIterator[Tuple[discord.Member, User]]: